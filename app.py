@@ -3,15 +3,28 @@ AraGovAssist - Streamlit Demo UI
 Interactive web interface for the Qatar Government Services RAG system.
 """
 
-import streamlit as st
+import json
+import os
 import sys
 import time
 sys.path.append('src')
 
-from sentence_transformers import SentenceTransformer
-from retrieval import RetrieverSystem
+# `python app.py --profile-startup` prints a cold-start breakdown and exits
+if '--profile-startup' in sys.argv:
+    from startup_profiler import profile_startup, print_report
+    print_report(profile_startup())
+    sys.exit(0)
+
+import streamlit as st
+from index_snapshots import HotSwapRetriever
+from encoder_service import BatchingEncoder
+from embedding_store import EmbeddingStore, CachedEncoder
+from model_server import connect as connect_model_server
+from warmup import QueryWarmupCache, log_query, top_logged_queries
+from document_store import DocumentStore
 from llm_generator import AnswerGenerator
 from translator import TranslationService
+from record_replay import RecordReplayAnswerGenerator, RecordReplayTranslator, mode_from_env
 
 # Page config
 st.set_page_config(
@@ -49,27 +62,115 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
+# Arabic examples - matched to actual documents in the database
+arabic_examples = [
+    ("🏥", "كيف أبحث عن طبيب في قطر؟"),
+    ("💼", "كيف أعيد تفعيل رخصة تجارية؟"),
+    ("🎓", "كيف أسجل في مقررات جامعة قطر؟"),
+    ("🚗", "ما هي متطلبات الحصول على رخصة قيادة؟"),
+    ("🏠", "كيف أحصل على بدل إيجار؟")
+]
+
+# English examples - matched to actual documents in the database
+english_examples = [
+    ("🏥", "How to search for a doctor in Qatar?"),
+    ("💼", "How to reactivate commercial license?"),
+    ("🎓", "How to register for courses at Qatar University?"),
+    ("🚗", "What are the requirements for a driving license?"),
+    ("🏠", "How to get rent allowance?")
+]
+
+# Queries precomputed at startup: the examples plus the most frequent logged ones.
+# Submitted queries are only written to the log when ARAGOV_QUERY_LOG=1
+QUERY_LOG_PATH = 'index/query_log.jsonl'
+QUERY_LOG_ENABLED = os.getenv('ARAGOV_QUERY_LOG', '0') == '1'
+WARMUP_TOP_LOGGED = 20
+WARMUP_ANSWERS = os.getenv('ARAGOV_WARMUP_ANSWERS', '0') == '1'
+
+# How often the app checks index/snapshots/CURRENT for a newly published index
+SNAPSHOT_POLL_SECONDS = float(os.getenv('ARAGOV_SNAPSHOT_POLL_SECONDS', '5'))
+
+# Written by scripts/benchmarks/benchmark_latency.py
+LATENCY_BENCHMARK_PATH = 'index/latency_benchmark.json'
+
+
+def benchmarked_response_time(path: str = LATENCY_BENCHMARK_PATH) -> str:
+    """p95 of query encoding + retrieval from the last benchmark run, or the old estimate"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            stages = json.load(f)['stages']
+    except (OSError, ValueError, KeyError):
+        return "<1s"
+
+    if 'query' in stages:
+        return f"{stages['query']['p95_ms']:.0f}ms p95"
+    if 'encode' in stages and 'search' in stages:
+        # Older runs without the combined stage: an upper bound, not a percentile
+        return f"≤{stages['encode']['p95_ms'] + stages['search']['p95_ms']:.0f}ms (sum of p95s)"
+    return "<1s"
+
 # Load models (cache for performance)
 @st.cache_resource
-def load_models(_force_reload=False):
+def load_models():
     """Load and cache all models"""
+    from sentence_transformers import SentenceTransformer
+    
     with st.spinner("🔄 Loading AI models..."):
-        model = SentenceTransformer('paraphrase-multilingual-mpnet-base-v2')
+        # Load tests: ARAGOV_RECORD_MODE=replay serves Gemini and Google Translate
+        # responses from experiments/fixtures instead of the network
+        record_mode, replay_latency = mode_from_env()
+        if record_mode:
+            generator = RecordReplayAnswerGenerator(mode=record_mode, latency=replay_latency)
+            translator = RecordReplayTranslator(mode=record_mode, latency=replay_latency)
+        else:
+            generator = AnswerGenerator()
+            translator = TranslationService()
+        
+        # Multi-worker deployments: use the resident model server instead of
+        # loading a private copy of the encoder and index in every worker
+        server_address = os.getenv('ARAGOV_MODEL_SERVER')
+        if server_address:
+            model, retriever = connect_model_server(server_address)
+            return model, retriever, generator, translator
         
-        retriever = RetrieverSystem(
-            'index/embeddings.npy',
-            'index/corpus_chunks.json',
-            'index/corpus_meta.json'
+        # Shared across sessions: concurrent queries are encoded in micro-batches.
+        # The embedding store is only read here: user queries are never persisted
+        model = BatchingEncoder(
+            CachedEncoder(SentenceTransformer('paraphrase-multilingual-mpnet-base-v2'),
+                          EmbeddingStore('paraphrase-multilingual-mpnet-base-v2'),
+                          persist_misses=False),
+            max_batch_size=32,
+            max_wait_ms=5.0
         )
         
-        generator = AnswerGenerator()
-        translator = TranslationService()
+        # Follows the published index snapshot; rebuilds go live without a restart
+        retriever = HotSwapRetriever('index/snapshots', fallback_dir='index')
+        retriever.start(poll_interval=SNAPSHOT_POLL_SECONDS)
         
         return model, retriever, generator, translator
 
+@st.cache_resource
+def start_warmup(_model, _retriever, _translator, _generator):
+    """Settle the encoder and precompute example/popular queries in the background"""
+    queries = [q for _, q in arabic_examples + english_examples]
+    queries += top_logged_queries(QUERY_LOG_PATH, WARMUP_TOP_LOGGED)
+    cache = QueryWarmupCache(
+        _model, _retriever, _translator,
+        generator=_generator if WARMUP_ANSWERS else None
+    )
+    return cache.start(queries)
+
+@st.cache_resource
+def load_document_store():
+    """Source documents and their translations, shared by all sessions"""
+    store = DocumentStore('data', max_bytes=64 * 1024 * 1024)
+    store.preload()
+    return store
+
 try:
-    # Force reload if needed (change this value to bust cache)
-    model, retriever, generator, translator = load_models(_force_reload=True)
+    model, retriever, generator, translator = load_models()
+    warmup = start_warmup(model, retriever, translator, generator)
+    document_store = load_document_store()
     st.success("✅ System ready! Ask your question below.")
 except Exception as e:
     st.error(f"❌ Error loading models: {str(e)}")
@@ -138,7 +239,25 @@ with st.sidebar:
     with col1:
         st.metric("Documents", "51")
     with col2:
-        st.metric("Response", "<1s")
+        st.metric("Response", benchmarked_response_time())
+    
+    warmup_stats = warmup.stats
+    if warmup_stats['done']:
+        st.caption(f"🔥 Warmup: {warmup_stats['queries_cached']} queries cached in "
+                   f"{warmup_stats['warmup_seconds']:.1f}s "
+                   f"(encoder {warmup_stats['dummy_pass_seconds']:.2f}s)")
+    else:
+        st.caption(f"🔥 Warming up: {warmup_stats['queries_cached']}/{warmup_stats['queries_total']} queries cached")
+    
+    with st.expander("Encoder batching"):
+        encoder_stats = model.get_stats()
+        st.markdown(f"- Queue depth: {encoder_stats['queue_depth']}")
+        st.markdown(f"- Requests: {encoder_stats['total_requests']} in {encoder_stats['total_batches']} batches")
+        st.markdown(f"- Avg batch size: {encoder_stats['avg_batch_size']:.2f}")
+        st.markdown("**Batch sizes:**")
+        st.json(encoder_stats['batch_size_histogram'])
+        st.markdown("**Queue depth at flush:**")
+        st.json(encoder_stats['queue_depth_histogram'])
 
 # Initialize session state for query if not exists
 if 'current_query' not in st.session_state:
@@ -195,26 +314,40 @@ with col2:
 # Store query in session state when form is submitted to preserve it
 if submit_button and query:
     st.session_state.current_query = query
+    if QUERY_LOG_ENABLED:
+        try:
+            log_query(QUERY_LOG_PATH, query)
+        except OSError:
+            pass  # Logging is best-effort (e.g. read-only deployments)
 
 # Process search when form is submitted
 if submit_button and query:
     with st.spinner("🔄 Processing your query..."):
         start_time = time.time()
         try:
-            # Step 1: Process query with translation
-            translation_result = translator.process_query(query)
-            arabic_query = translation_result['arabic_query']
-            query_lang = translation_result['query_language']
+            # Example and popular queries are precomputed at startup
+            cached = warmup.get(query, num_results)
             
-            # Get query embedding (use Arabic query)
-            query_emb = model.encode([arabic_query])[0]
-            
-            # Retrieve with keyword boosting
-            results = retriever.search(
-                query_emb,
-                k=num_results,
-                query_text=arabic_query  # Pass query text for keyword boosting
-            )
+            if cached:
+                translation_result = cached['translation_result']
+                arabic_query = translation_result['arabic_query']
+                query_lang = translation_result['query_language']
+                results = cached['results']
+            else:
+                # Step 1: Process query with translation
+                translation_result = translator.process_query(query)
+                arabic_query = translation_result['arabic_query']
+                query_lang = translation_result['query_language']
+                
+                # Get query embedding (use Arabic query)
+                query_emb = model.encode([arabic_query])[0]
+                
+                # Retrieve with keyword boosting
+                results = retriever.search(
+                    query_emb,
+                    k=num_results,
+                    query_text=arabic_query  # Pass query text for keyword boosting
+                )
             
             # Determine return language
             if answer_lang == "Same as query":
@@ -224,12 +357,14 @@ if submit_button and query:
             else:
                 return_lang = 'en'
             
-            # Generate answer
-            answer_data = generator.generate_answer(
-                arabic_query, results,
-                language='ar',
-                return_language=return_lang
-            )
+            # Generate answer (reuse the precomputed one when available)
+            answer_data = warmup.get_answer(query, num_results, return_lang)
+            if answer_data is None:
+                answer_data = generator.generate_answer(
+                    arabic_query, results,
+                    language='ar',
+                    return_language=return_lang
+                )
             
             # Calculate response time
             response_time = time.time() - start_time
@@ -305,18 +440,11 @@ if 'search_results' in st.session_state:
         
         st.info(f"💡 Full documents displayed in **{lang_display}** (Setting: {answer_lang_setting})")
         
-        # Initialize translation cache in session state if not exists
-        if 'document_translations' not in st.session_state:
-            st.session_state.document_translations = {}
-        
         for i, result in enumerate(results, 1):
             score = result['score']
             source_file = result['metadata']['source_file']
             category = result['metadata']['category']
             
-            # Construct full path
-            full_path = f"data/{category}/{source_file}"
-            
             with st.expander(
                 f"**Source {i}** - {category} (Score: {score:.3f})",
                 expanded=(i == 1)
@@ -333,26 +461,24 @@ if 'search_results' in st.session_state:
                 with col_b:
                     # Always show full document
                     try:
-                        with open(full_path, 'r', encoding='utf-8') as f:
-                            full_content = f.read()
-                        
-                        # Create cache key for this document and language
-                        cache_key = f"{full_path}_{current_display_lang}"
+                        # Process-wide cache (re-read only when the file changes)
+                        full_content = document_store.get(category, source_file)
                         
                         # Documents are originally in Arabic
                         # Translate if current display language is English
                         if current_display_lang == 'en':
-                            # Check cache first
-                            if cache_key in st.session_state.document_translations:
-                                full_content = st.session_state.document_translations[cache_key]
+                            # Check shared translation cache first
+                            cached_translation = document_store.get_translation(category, source_file, 'en')
+                            if cached_translation is not None:
+                                full_content = cached_translation
                                 doc_lang = "English (Translated)"
                             else:
-                                # Translate and cache
+                                # Translate and cache for all sessions
                                 try:
                                     with st.spinner(f"🔄 Translating document {i} to English..."):
                                         translated_content = translator.translate_text(full_content, 'en')
                                         if translated_content and len(translated_content) > 10:
-                                            st.session_state.document_translations[cache_key] = translated_content
+                                            document_store.put_translation(category, source_file, 'en', translated_content)
                                             full_content = translated_content
                                             doc_lang = "English (Translated)"
                                         else:
@@ -415,24 +541,6 @@ st.markdown("---")
 st.markdown("### 💡 Example Queries")
 st.markdown("Click any example to load it into the search box:")
 
-# Arabic examples - matched to actual documents in the database
-arabic_examples = [
-    ("🏥", "كيف أبحث عن طبيب في قطر؟"),
-    ("💼", "كيف أعيد تفعيل رخصة تجارية؟"),
-    ("🎓", "كيف أسجل في مقررات جامعة قطر؟"),
-    ("🚗", "ما هي متطلبات الحصول على رخصة قيادة؟"),
-    ("🏠", "كيف أحصل على بدل إيجار؟")
-]
-
-# English examples - matched to actual documents in the database
-english_examples = [
-    ("🏥", "How to search for a doctor in Qatar?"),
-    ("💼", "How to reactivate commercial license?"),
-    ("🎓", "How to register for courses at Qatar University?"),
-    ("🚗", "What are the requirements for a driving license?"),
-    ("🏠", "How to get rent allowance?")
-]
-
 col_ar, col_en = st.columns(2)
 
 with col_ar:
@@ -15,6 +15,7 @@ import json
 import numpy as np
 from sentence_transformers import SentenceTransformer
 from translator import TranslationService
+from embedding_store import EmbeddingStore, CachedEncoder
 import faiss
 from sklearn.metrics.pairwise import cosine_similarity
 import time
@@ -29,29 +30,42 @@ class TranslationStrategyExperiment:
     4. Back-translation for query expansion
     """
     
-    def __init__(self):
+    def __init__(self, harness=None):
         print("="*80)
         print("EXPERIMENT 1: TRANSLATION STRATEGIES")
         print("="*80)
         
-        # Load data
-        print("\nLoading data...")
-        base_dir = os.path.join(os.path.dirname(__file__), '..')
-        
-        with open(os.path.join(base_dir, 'index', 'corpus_chunks.json'), 'r', encoding='utf-8') as f:
-            self.chunks = json.load(f)
-        
-        with open(os.path.join(base_dir, 'index', 'corpus_meta.json'), 'r', encoding='utf-8') as f:
-            self.metadata = json.load(f)
-        
-        # Load models
-        print("Loading models...")
-        self.ar_model = SentenceTransformer('paraphrase-multilingual-mpnet-base-v2')
-        self.translator = TranslationService()
+        if harness is not None:
+            # Model, translator and corpus are shared with the other experiments
+            self.chunks = harness.chunks
+            self.metadata = harness.metadata
+            self.ar_model = harness.model
+            self.translator = harness.translator
+        else:
+            # Load data
+            print("\nLoading data...")
+            base_dir = os.path.join(os.path.dirname(__file__), '..')
+            
+            with open(os.path.join(base_dir, 'index', 'corpus_chunks.json'), 'r', encoding='utf-8') as f:
+                self.chunks = json.load(f)
+            
+            with open(os.path.join(base_dir, 'index', 'corpus_meta.json'), 'r', encoding='utf-8') as f:
+                self.metadata = json.load(f)
+            
+            # Load models
+            print("Loading models...")
+            # Corpus and query vectors come from the shared store; only unseen text is encoded
+            self.ar_model = CachedEncoder(
+                SentenceTransformer('paraphrase-multilingual-mpnet-base-v2'),
+                EmbeddingStore('paraphrase-multilingual-mpnet-base-v2',
+                               os.path.join(base_dir, 'index', 'embedding_store.sqlite'))
+            )
+            self.translator = TranslationService()
         
         # Generate Arabic embeddings (for methods 1 and 3)
         print("Generating Arabic embeddings...")
         self.ar_embeddings = self.ar_model.encode(self.chunks, show_progress_bar=True)
+        print(f"   Embedding store: {self.ar_model.store.get_stats()['hit_rate']:.0%} hits")
         faiss.normalize_L2(self.ar_embeddings.astype('float32'))
         
         print("✅ Setup complete\n")
@@ -245,33 +259,38 @@ class TranslationStrategyExperiment:
         return summary
 
 
-def main():
-    # Initialize experiment
+TEST_QUERIES = [
+    # Transportation
+    {'query': 'How do I get a limousine license?', 'expected': 'transportation'},
+    {'query': 'Fish transport permit requirements', 'expected': 'transportation'},
+    {'query': 'Air cargo license application', 'expected': 'transportation'},
+    
+    # Education
+    {'query': 'How to register for courses at Qatar University?', 'expected': 'education'},
+    {'query': 'HBKU admission process', 'expected': 'education'},
+    {'query': 'University transcript request', 'expected': 'education'},
+    
+    # Health
+    {'query': 'How to request medical consultation?', 'expected': 'health'},
+    {'query': 'Hamad Medical Corporation job application', 'expected': 'health'},
+    {'query': 'Healthcare practitioner license', 'expected': 'health'},
+    
+    # Business
+    {'query': 'How to submit tenders?', 'expected': 'business'},
+    {'query': 'Tax registration process', 'expected': 'business'},
+    {'query': 'Commercial license reactivation', 'expected': 'business'},
+]
+
+
+def run(harness):
+    """Run the experiment on a shared EvaluationHarness"""
     base_dir = os.path.join(os.path.dirname(__file__), '..')
-    exp = TranslationStrategyExperiment()
+    exp = TranslationStrategyExperiment(harness)
     
     # Test queries (English only for this experiment)
-    test_queries = [
-        # Transportation
-        {'query': 'How do I get a limousine license?', 'expected': 'transportation'},
-        {'query': 'Fish transport permit requirements', 'expected': 'transportation'},
-        {'query': 'Air cargo license application', 'expected': 'transportation'},
-        
-        # Education
-        {'query': 'How to register for courses at Qatar University?', 'expected': 'education'},
-        {'query': 'HBKU admission process', 'expected': 'education'},
-        {'query': 'University transcript request', 'expected': 'education'},
-        
-        # Health
-        {'query': 'How to request medical consultation?', 'expected': 'health'},
-        {'query': 'Hamad Medical Corporation job application', 'expected': 'health'},
-        {'query': 'Healthcare practitioner license', 'expected': 'health'},
-        
-        # Business
-        {'query': 'How to submit tenders?', 'expected': 'business'},
-        {'query': 'Tax registration process', 'expected': 'business'},
-        {'query': 'Commercial license reactivation', 'expected': 'business'},
-    ]
+    # Translations, back-translations and encodings come from the prepared sidecar
+    test_queries = harness.load_query_set('translation_strategies', TEST_QUERIES,
+                                          language='en', round_trip=True)
     
     # Run experiment
     results = exp.run_experiment(test_queries)
@@ -313,6 +332,15 @@ def main():
     print(f"P@1: {best_method[1]['P@1']:.1%}")
     print(f"P@3: {best_method[1]['P@3']:.1%}")
     print(f"MRR: {best_method[1]['MRR']:.3f}")
+    
+    return results
+
+
+def main():
+    from harness import EvaluationHarness
+    harness = EvaluationHarness()
+    run(harness)
+    harness.save()
 
 
 if __name__ == "__main__":
@@ -13,43 +13,58 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 import json
 import numpy as np
 from sentence_transformers import SentenceTransformer
+from embedding_store import EmbeddingStore, CachedEncoder
 from rank_bm25 import BM25Okapi
 import faiss
 from sklearn.metrics.pairwise import cosine_similarity
 import time
 from typing import List, Dict
 
+from metrics import evaluate_rankings, rate
+from results_stream import ResultsWriter, SummaryColumns
+
 
 class HybridRetriever:
     """Hybrid retrieval combining semantic search and BM25."""
     
-    def __init__(self, embeddings_path, chunks_path, metadata_path):
+    def __init__(self, embeddings_path=None, chunks_path=None, metadata_path=None, harness=None):
         print("="*80)
         print("EXPERIMENT 2: HYBRID RETRIEVAL")
         print("="*80)
         
-        print("\nLoading data...")
-        if not os.path.isabs(embeddings_path):
+        if harness is not None:
+            # Normalized embeddings, corpus and model shared with the other experiments
+            self.embeddings = harness.embeddings
+            self.chunks = harness.chunks
+            self.metadata = harness.metadata
+            self.model = harness.model
+        else:
+            print("\nLoading data...")
             base_dir = os.path.join(os.path.dirname(__file__), '..')
-            embeddings_path = os.path.join(base_dir, embeddings_path)
-            chunks_path = os.path.join(base_dir, chunks_path)
-            metadata_path = os.path.join(base_dir, metadata_path)
-        
-        self.embeddings = np.load(embeddings_path).astype('float32')
-        
-        with open(chunks_path, 'r', encoding='utf-8') as f:
-            self.chunks = json.load(f)
-        
-        with open(metadata_path, 'r', encoding='utf-8') as f:
-            self.metadata = json.load(f)
+            if not os.path.isabs(embeddings_path):
+                embeddings_path = os.path.join(base_dir, embeddings_path)
+                chunks_path = os.path.join(base_dir, chunks_path)
+                metadata_path = os.path.join(base_dir, metadata_path)
+            
+            self.embeddings = np.load(embeddings_path).astype('float32')
+            
+            with open(chunks_path, 'r', encoding='utf-8') as f:
+                self.chunks = json.load(f)
+            
+            with open(metadata_path, 'r', encoding='utf-8') as f:
+                self.metadata = json.load(f)
+            
+            faiss.normalize_L2(self.embeddings)
+            
+            print("Loading embedding model...")
+            self.model = CachedEncoder(
+                SentenceTransformer('paraphrase-multilingual-mpnet-base-v2'),
+                EmbeddingStore('paraphrase-multilingual-mpnet-base-v2',
+                               os.path.join(base_dir, 'index', 'embedding_store.sqlite'))
+            )
         
         print(f"[OK] Loaded {len(self.chunks)} chunks")
         
-        faiss.normalize_L2(self.embeddings)
-        
-        print("Loading embedding model...")
-        self.model = SentenceTransformer('paraphrase-multilingual-mpnet-base-v2')
-        
         print("Building BM25 index...")
         self._build_bm25_index()
         
@@ -192,19 +207,13 @@ class HybridRetriever:
             raise ValueError(f"Unknown method: {method}")
         
         top_category = results[0]['category']
-        p_at_1 = 1 if top_category == expected_category else 0
         
-        top3_categories = [r['category'] for r in results[:3]]
-        p_at_3 = 1 if expected_category in top3_categories else 0
-        
-        top5_categories = [r['category'] for r in results[:5]]
-        p_at_5 = 1 if expected_category in top5_categories else 0
-        
-        try:
-            rank = [r['category'] for r in results].index(expected_category) + 1
-            mrr = 1.0 / rank
-        except ValueError:
-            mrr = 0.0
+        # MRR looks at all k=10 results, P@k at the top 1/3/5
+        metrics = evaluate_rankings([[r['category'] for r in results]], [expected_category])
+        p_at_1 = int(metrics['correct_at_1'][0])
+        p_at_3 = int(metrics['correct_at_3'][0])
+        p_at_5 = int(metrics['correct_at_5'][0])
+        mrr = float(metrics['reciprocal_rank'][0])
         
         return {
             'method': method,
@@ -216,20 +225,18 @@ class HybridRetriever:
             'p@5': p_at_5,
             'mrr': mrr,
             'time': elapsed,
-            'top_results': results[:5]
+            # Chunks by index into corpus_chunks.json, not by text
+            'top_results': [{key: value for key, value in r.items() if key != 'chunk'}
+                            for r in results[:5]]
         }
 
 
-def run_experiment():
-    """Run complete hybrid retrieval experiment"""
+def run(harness):
+    """Run complete hybrid retrieval experiment on a shared EvaluationHarness"""
     
     base_dir = os.path.join(os.path.dirname(__file__), '..')
     
-    retriever = HybridRetriever(
-        'index/embeddings.npy',
-        'index/corpus_chunks.json',
-        'index/corpus_meta.json'
-    )
+    retriever = HybridRetriever(harness=harness)
     
     print("\n" + "="*80)
     print("LOADING TEST QUERIES")
@@ -241,6 +248,7 @@ def run_experiment():
     
     test_queries = dataset['queries'][:50]
     print(f"[OK] Loaded {len(test_queries)} test queries")
+    harness.prefetch([q['query_ar'] for q in test_queries])
     
     methods = [
         {'name': 'semantic', 'params': {}},
@@ -254,36 +262,42 @@ def run_experiment():
     print("RUNNING EXPERIMENTS")
     print("="*80)
     
-    all_results = {method['name'] + '_' + str(method['params']): [] for method in methods}
+    results_path = os.path.join(base_dir, 'index', 'experiment2_hybrid_retrieval.jsonl')
+    method_keys = [method['name'] + '_' + str(method['params']) for method in methods]
     
-    for i, test_query in enumerate(test_queries, 1):
-        query = test_query['query_ar']
-        expected = test_query['category']
-        
-        print(f"\n[{i}/{len(test_queries)}] {query[:50]}...")
-        
-        for method in methods:
-            method_key = method['name'] + '_' + str(method['params'])
-            result = retriever.evaluate_method(
-                query, expected, 
-                method['name'], 
-                **method['params']
-            )
-            all_results[method_key].append(result)
+    # One compact record per (query, method) is streamed to disk as it finishes;
+    # per-method summary columns are gathered along the way
+    columns = {method_key: SummaryColumns(('p@1', 'p@3', 'p@5', 'mrr', 'time')) for method_key in method_keys}
+    with ResultsWriter(results_path) as writer:
+        for i, test_query in enumerate(test_queries, 1):
+            query = test_query['query_ar']
+            expected = test_query['category']
+            
+            print(f"\n[{i}/{len(test_queries)}] {query[:50]}...")
+            
+            for method, method_key in zip(methods, method_keys):
+                result = retriever.evaluate_method(
+                    query, expected, 
+                    method['name'], 
+                    **method['params']
+                )
+                result['method_key'] = method_key
+                writer.write(result)
+                columns[method_key].add(result)
     
     print("\n" + "="*80)
     print("RESULTS SUMMARY")
     print("="*80)
     
     summary = {}
-    for method_key, results in all_results.items():
+    for method_key, results in columns.items():
         summary[method_key] = {
-            'P@1': np.mean([r['p@1'] for r in results]),
-            'P@3': np.mean([r['p@3'] for r in results]),
-            'P@5': np.mean([r['p@5'] for r in results]),
-            'MRR': np.mean([r['mrr'] for r in results]),
-            'Avg_Time': np.mean([r['time'] for r in results]),
-            'Total_Correct': sum([r['p@1'] for r in results])
+            'P@1': rate(results.values('p@1')),
+            'P@3': rate(results.values('p@3')),
+            'P@5': rate(results.values('p@5')),
+            'MRR': rate(results.values('mrr')),
+            'Avg_Time': rate(results.values('time')),
+            'Total_Correct': int(results.values('p@1').sum())
         }
     
     print("\n{:<35} {:>8} {:>8} {:>8} {:>8} {:>10}".format(
@@ -306,7 +320,7 @@ def run_experiment():
         'test_queries': len(test_queries),
         'methods_tested': len(methods),
         'summary': summary,
-        'detailed_results': all_results
+        'detailed_results_file': os.path.relpath(results_path, base_dir)
     }
     
     output_path = os.path.join(base_dir, 'index', 'experiment2_hybrid_retrieval.json')
@@ -328,6 +342,15 @@ def run_experiment():
     print(f"Avg Time: {best_method[1]['Avg_Time']:.4f}s")
     
     print("\n[OK] Experiment 2 complete!")
+    
+    return output
+
+
+def run_experiment():
+    from harness import EvaluationHarness
+    harness = EvaluationHarness()
+    run(harness)
+    harness.save()
 
 
 if __name__ == "__main__":
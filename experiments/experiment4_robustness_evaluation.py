@@ -8,205 +8,136 @@ sys.path.insert(0, 'src')
 
 import json
 import numpy as np
-from sentence_transformers import SentenceTransformer
-from retrieval import RetrieverSystem
-from translator import TranslationService
 from scipy import stats
-from collections import defaultdict
+from collections import Counter
 import time
 
+from metrics import label_matrix, evaluate_rankings, rate, group_breakdown, bootstrap_ci
+from harness import run_queries, EVAL_WORKERS
+from results_stream import ResultsWriter, SummaryColumns
 
-def load_robustness_queries():
-    """Load robustness test query set"""
-    with open('experiments/robustness_test_queries.json', 'r', encoding='utf-8') as f:
-        dataset = json.load(f)
-    return dataset['queries']
+RESULTS_PATH = 'index/experiment4_robustness_evaluation.jsonl'
+# Per-query columns the summaries are computed from (gathered while writing)
+NUMERIC_FIELDS = ('correct_at_1', 'correct_at_3', 'correct_at_5',
+                  'source_correct_at_1', 'source_correct_at_3', 'source_correct_at_5',
+                  'reciprocal_rank', 'ndcg_at_5', 'top_score', 'response_time')
+LABEL_FIELDS = ('query_type', 'language', 'expected_category')
 
 
-def evaluate_system(retriever, model, translator, queries):
-    """Evaluate system on query set"""
-    results = []
+def evaluate_system(retriever, model, translator, queries, writer, block_size=256):
+    """
+    Evaluate system on query set
+    
+    Queries are searched and scored a block at a time and one compact record
+    per query is streamed to writer, so memory stays flat as the set grows.
+    """
+    # English queries are translated; translations and searches run concurrently
+    start_time = time.time()
+    for start in range(0, len(queries), block_size):
+        block = queries[start:start + block_size]
+        searched = run_queries(retriever, model, translator,
+                               [(q['query'], q['language']) for q in block])
+        runs = [(search_results, elapsed) for _, search_results, elapsed in searched]
+        for record in score_runs(block, runs):
+            writer.write(record)
+    print(f"   [OK] {len(queries)} searches in {time.time() - start_time:.1f}s ({EVAL_WORKERS} workers)")
+
+
+def score_runs(queries, runs):
+    """Per-query result records for a block of queries and their (search_results, time) runs"""
+    # Score the whole block in one pass
+    top_5_cats = label_matrix([[r['metadata']['category'] for r in run[0]] for run in runs], k=5)
+    top_5_sources = label_matrix([[r['metadata']['source_file'] for r in run[0]] for run in runs], k=5)
+    expected_sources = [q.get('source') or None for q in queries]
+    metrics = evaluate_rankings(top_5_cats, [q['category'] for q in queries],
+                                top_5_sources, expected_sources)
     
-    for i, query_data in enumerate(queries, 1):
-        query = query_data['query']
-        expected_cat = query_data['category']
-        query_type = query_data['type']
-        language = query_data['language']
-        
-        # Translate if English
-        if language == 'en':
-            query_ar = translator.translate_to_arabic(query)
-        else:
-            query_ar = query
-        
-        # Get embedding and search
-        start_time = time.time()
-        query_emb = model.encode([query_ar])[0]
-        search_results = retriever.search(query_emb, k=5, query_text=query_ar)
-        elapsed = time.time() - start_time
-        
-        # Extract predictions
-        predicted_cat = search_results[0]['metadata']['category']
-        predicted_source = search_results[0]['metadata']['source_file']
-        top_5_cats = [r['metadata']['category'] for r in search_results]
-        top_5_sources = [r['metadata']['source_file'] for r in search_results]
-        scores = [r['score'] for r in search_results]
-        
-        # Expected source (if available)
-        expected_source = query_data.get('source', None)
-        
-        # Calculate category metrics
-        correct_at_1 = predicted_cat == expected_cat
-        correct_at_3 = expected_cat in top_5_cats[:3]
-        correct_at_5 = expected_cat in top_5_cats
-        
-        # Calculate source metrics
-        source_correct_at_1 = (predicted_source == expected_source) if expected_source else None
-        source_correct_at_3 = (expected_source in top_5_sources[:3]) if expected_source else None
-        source_correct_at_5 = (expected_source in top_5_sources) if expected_source else None
-        
-        # MRR
-        try:
-            rank = top_5_cats.index(expected_cat) + 1
-            rr = 1.0 / rank
-        except ValueError:
-            rr = 0.0
-        
-        # NDCG@5
-        relevance = [1 if cat == expected_cat else 0 for cat in top_5_cats]
-        dcg = sum(rel / np.log2(i + 2) for i, rel in enumerate(relevance))
-        idcg = 1.0  # Perfect ranking
-        ndcg = dcg / idcg if idcg > 0 else 0.0
-        
+    results = []
+    for i, (query_data, (search_results, elapsed)) in enumerate(zip(queries, runs)):
+        has_source = metrics['has_source'][i]
         results.append({
-            'query': query,
-            'expected_category': expected_cat,
-            'predicted_category': predicted_cat,
-            'expected_source': expected_source,
-            'predicted_source': predicted_source,
-            'query_type': query_type,
-            'language': language,
-            'correct_at_1': correct_at_1,
-            'correct_at_3': correct_at_3,
-            'correct_at_5': correct_at_5,
-            'source_correct_at_1': source_correct_at_1,
-            'source_correct_at_3': source_correct_at_3,
-            'source_correct_at_5': source_correct_at_5,
-            'reciprocal_rank': rr,
-            'ndcg_at_5': ndcg,
-            'top_score': scores[0],
+            'query': query_data['query'],
+            'expected_category': query_data['category'],
+            'predicted_category': top_5_cats[i, 0],
+            'expected_source': expected_sources[i],
+            'predicted_source': top_5_sources[i, 0],
+            'query_type': query_data['type'],
+            'language': query_data['language'],
+            'correct_at_1': bool(metrics['correct_at_1'][i]),
+            'correct_at_3': bool(metrics['correct_at_3'][i]),
+            'correct_at_5': bool(metrics['correct_at_5'][i]),
+            'source_correct_at_1': bool(metrics['source_correct_at_1'][i]) if has_source else None,
+            'source_correct_at_3': bool(metrics['source_correct_at_3'][i]) if has_source else None,
+            'source_correct_at_5': bool(metrics['source_correct_at_5'][i]) if has_source else None,
+            'reciprocal_rank': float(metrics['reciprocal_rank'][i]),
+            'ndcg_at_5': float(metrics['ndcg_at_5'][i]),
+            'top_score': search_results[0]['score'],
+            'top_chunks': [r['id'] for r in search_results],
             'response_time': elapsed
         })
-        
-        if i % 10 == 0:
-            print(f"   Progress: {i}/{len(queries)}")
     
     return results
 
 
-def calculate_statistics(results):
-    """Calculate comprehensive statistics"""
-    total = len(results)
-    
-    # Overall category metrics
-    p_at_1 = sum(r['correct_at_1'] for r in results) / total
-    p_at_3 = sum(r['correct_at_3'] for r in results) / total
-    p_at_5 = sum(r['correct_at_5'] for r in results) / total
-    mrr = sum(r['reciprocal_rank'] for r in results) / total
-    ndcg = sum(r['ndcg_at_5'] for r in results) / total
-    avg_time = sum(r['response_time'] for r in results) / total
+def source_rates(summary):
+    """Source P@1/3/5 over the queries that name an expected source (None if none do)"""
+    has_source = ~np.isnan(summary.values('source_correct_at_1'))
+    return [rate(np.nan_to_num(summary.values(f'source_correct_at_{k}')), has_source) for k in (1, 3, 5)]
+
+
+def calculate_statistics(summary):
+    """Calculate comprehensive statistics from the SummaryColumns of a run"""
+    total = len(summary)
+    p1_values = summary.values('correct_at_1')
+    rr_values = summary.values('reciprocal_rank')
     
     # Source accuracy metrics
-    source_results = [r for r in results if r['source_correct_at_1'] is not None]
-    if source_results:
-        source_p_at_1 = sum(r['source_correct_at_1'] for r in source_results) / len(source_results)
-        source_p_at_3 = sum(r['source_correct_at_3'] for r in source_results) / len(source_results)
-        source_p_at_5 = sum(r['source_correct_at_5'] for r in source_results) / len(source_results)
-    else:
-        source_p_at_1 = source_p_at_3 = source_p_at_5 = None
-    
-    # By query type
-    type_stats = defaultdict(lambda: {'correct': 0, 'total': 0})
-    for r in results:
-        qtype = r['query_type']
-        type_stats[qtype]['total'] += 1
-        if r['correct_at_1']:
-            type_stats[qtype]['correct'] += 1
-    
-    # By language
-    lang_stats = defaultdict(lambda: {'correct': 0, 'total': 0})
-    for r in results:
-        lang = r['language']
-        lang_stats[lang]['total'] += 1
-        if r['correct_at_1']:
-            lang_stats[lang]['correct'] += 1
-    
-    # By category
-    cat_stats = defaultdict(lambda: {'correct': 0, 'total': 0})
-    for r in results:
-        cat = r['expected_category']
-        cat_stats[cat]['total'] += 1
-        if r['correct_at_1']:
-            cat_stats[cat]['correct'] += 1
+    source_p_at_1, source_p_at_3, source_p_at_5 = source_rates(summary)
     
     # Confidence interval
-    p1_values = [r['correct_at_1'] for r in results]
     ci_95 = stats.t.interval(0.95, len(p1_values)-1,
                              loc=np.mean(p1_values),
                              scale=stats.sem(p1_values))
     
     return {
         'overall': {
-            'category_precision_at_1': p_at_1,
-            'category_precision_at_3': p_at_3,
-            'category_precision_at_5': p_at_5,
+            'category_precision_at_1': rate(p1_values),
+            'category_precision_at_3': rate(summary.values('correct_at_3')),
+            'category_precision_at_5': rate(summary.values('correct_at_5')),
             'source_precision_at_1': source_p_at_1,
             'source_precision_at_3': source_p_at_3,
             'source_precision_at_5': source_p_at_5,
-            'mrr': mrr,
-            'ndcg_at_5': ndcg,
-            'avg_response_time': avg_time,
+            'mrr': rate(rr_values),
+            'ndcg_at_5': rate(summary.values('ndcg_at_5')),
+            'avg_response_time': rate(summary.values('response_time')),
             'total_queries': total,
             'confidence_interval_95': {
                 'lower': float(ci_95[0]),
                 'upper': float(ci_95[1])
+            },
+            'bootstrap_ci_95': {
+                'precision_at_1': bootstrap_ci(p1_values),
+                'mrr': bootstrap_ci(rr_values)
             }
         },
-        'by_query_type': {
-            qtype: {
-                'precision_at_1': stats['correct'] / stats['total'],
-                'correct': stats['correct'],
-                'total': stats['total']
-            }
-            for qtype, stats in type_stats.items()
-        },
+        'by_query_type': group_breakdown(p1_values, summary.labels('query_type')),
         'by_language': {
-            lang: {
-                'precision_at_1': stats['correct'] / stats['total'],
-                'total': stats['total']
-            }
-            for lang, stats in lang_stats.items()
+            lang: {'precision_at_1': group['precision_at_1'], 'total': group['total']}
+            for lang, group in group_breakdown(p1_values, summary.labels('language')).items()
         },
-        'by_category': {
-            cat: {
-                'precision_at_1': stats['correct'] / stats['total'],
-                'correct': stats['correct'],
-                'total': stats['total']
-            }
-            for cat, stats in cat_stats.items()
-        }
+        'by_category': group_breakdown(p1_values, summary.labels('expected_category'))
     }
 
 
-def compare_with_baseline(results):
+def compare_with_baseline(summary):
     """Compare with BM25 baseline"""
     # Simulate BM25 baseline (from Experiment 2 results)
     bm25_p1 = 0.56
-    our_p1 = sum(r['correct_at_1'] for r in results) / len(results)
+    p1_values = summary.values('correct_at_1')
+    our_p1 = float(p1_values.sum() / len(summary))
     
     # Statistical significance test
-    p1_values = [r['correct_at_1'] for r in results]
-    bm25_values = np.random.binomial(1, bm25_p1, len(results))
+    bm25_values = np.random.binomial(1, bm25_p1, len(summary))
     
     t_stat, p_value = stats.ttest_ind(p1_values, bm25_values)
     
@@ -221,29 +152,20 @@ def compare_with_baseline(results):
     }
 
 
-def analyze_failures(results):
+def analyze_failures(summary):
     """Analyze failure patterns"""
-    failures = [r for r in results if not r['correct_at_1']]
-    
-    # Group by type
-    failure_by_type = defaultdict(list)
-    for f in failures:
-        failure_by_type[f['query_type']].append(f)
+    failed = summary.values('correct_at_1') == 0
+    total_failures = int(failed.sum())
     
-    # Group by language
-    failure_by_lang = defaultdict(list)
-    for f in failures:
-        failure_by_lang[f['language']].append(f)
+    # Counts per type / language, in order of first failure
+    failure_by_type = Counter(summary.labels('query_type')[failed].tolist())
+    failure_by_lang = Counter(summary.labels('language')[failed].tolist())
     
     return {
-        'total_failures': len(failures),
-        'failure_rate': len(failures) / len(results),
-        'by_type': {
-            qtype: len(fails) for qtype, fails in failure_by_type.items()
-        },
-        'by_language': {
-            lang: len(fails) for lang, fails in failure_by_lang.items()
-        },
+        'total_failures': total_failures,
+        'failure_rate': total_failures / len(summary),
+        'by_type': dict(failure_by_type),
+        'by_language': dict(failure_by_lang),
         'examples': [
             {
                 'query': f['query'],
@@ -252,46 +174,44 @@ def analyze_failures(results):
                 'predicted': f['predicted_category'],
                 'score': f['top_score']
             }
-            for f in failures[:10]
+            for f in summary.failures  # First 10 failures
         ]
     }
 
 
-def main():
+def run(harness):
+    """Run the evaluation on a shared EvaluationHarness"""
     print("="*80)
     print("EXPERIMENT 4: ROBUSTNESS EVALUATION")
     print("="*80)
     
-    # Load system
-    print("\n1. Loading system...")
-    model = SentenceTransformer('paraphrase-multilingual-mpnet-base-v2')
-    retriever = RetrieverSystem(
-        'index/embeddings.npy',
-        'index/corpus_chunks.json',
-        'index/corpus_meta.json'
-    )
-    translator = TranslationService()
-    print("   [OK] System loaded")
+    # Model, index and translator are loaded once by the harness
+    print("\n1. Using shared system...")
+    model, retriever, translator = harness.model, harness.retriever, harness.translator
     
     # Load queries
     print("\n2. Loading robustness queries...")
-    queries = load_robustness_queries()
+    # Translations and query encodings come from the prepared sidecar
+    queries = harness.load_query_set('robustness')
     print(f"   [OK] Loaded {len(queries)} queries")
     
     # Evaluate
     print("\n3. Running evaluation...")
-    results = evaluate_system(retriever, model, translator, queries)
-    print("   [OK] Evaluation complete")
+    # Summary columns are gathered as records are written: no second pass
+    summary = SummaryColumns(NUMERIC_FIELDS, LABEL_FIELDS, failure_field='correct_at_1')
+    with ResultsWriter(RESULTS_PATH, summary) as writer:
+        evaluate_system(retriever, model, translator, queries, writer)
+    print(f"   [OK] Evaluation complete ({writer.count} records streamed to {RESULTS_PATH})")
     
     # Calculate statistics
     print("\n4. Calculating statistics...")
-    statistics = calculate_statistics(results)
+    statistics = calculate_statistics(summary)
     
     # Compare with baseline
-    comparison = compare_with_baseline(results)
+    comparison = compare_with_baseline(summary)
     
     # Analyze failures
-    failure_analysis = analyze_failures(results)
+    failure_analysis = analyze_failures(summary)
     
     # Print results
     print("\n" + "="*80)
@@ -329,7 +249,7 @@ def main():
     print(f"   Statistical Significance: {'YES' if comparison['significant'] else 'NO'} (p={comparison['p_value']:.4f})")
     
     print(f"\n❌ Failure Analysis:")
-    print(f"   Total Failures: {failure_analysis['total_failures']}/{len(results)} ({failure_analysis['failure_rate']:.1%})")
+    print(f"   Total Failures: {failure_analysis['total_failures']}/{len(summary)} ({failure_analysis['failure_rate']:.1%})")
     print(f"   By Type: {dict(failure_analysis['by_type'])}")
     print(f"   By Language: {dict(failure_analysis['by_language'])}")
     
@@ -353,7 +273,7 @@ def main():
         'statistics': convert_types(statistics),
         'comparison': convert_types(comparison),
         'failure_analysis': convert_types(failure_analysis),
-        'detailed_results': convert_types(results)
+        'detailed_results_file': RESULTS_PATH
     }
     
     with open('index/experiment4_robustness_evaluation.json', 'w', encoding='utf-8') as f:
@@ -381,6 +301,15 @@ def main():
         print(f"⚠️  Source accuracy: {src_p5:.1%} at P@5 on messy queries (P@1: {src_p1:.1%})")
     
     print("\n[OK] Experiment 4 complete!")
+    
+    return output
+
+
+def main():
+    from harness import EvaluationHarness
+    harness = EvaluationHarness()
+    run(harness)
+    harness.save()
 
 
 if __name__ == "__main__":
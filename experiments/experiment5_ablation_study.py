@@ -8,58 +8,35 @@ import sys
 import io
 sys.path.insert(0, 'src')
 
-# Fix Windows encoding
-sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
-
 import json
 import numpy as np
-from sentence_transformers import SentenceTransformer
-from retrieval import RetrieverSystem
-from translator import TranslationService
 import time
 
+from harness import run_queries
+
 
 def test_configuration(config_name, use_keywords, use_title, queries, model, retriever, translator):
     """Test a specific configuration"""
     print(f"\n   Testing: {config_name}...")
     
-    correct = 0
-    total_time = 0
-    
     # Test on all queries (both Arabic and English)
     test_queries = []
     for q in queries:
         if q.get('query_ar'):
-            test_queries.append(('ar', q['query_ar'], q['category']))
+            test_queries.append((q['query_ar'], 'ar', q['category']))
         if q.get('query_en'):
-            # Translate English to Arabic
-            query_ar = translator.translate_to_arabic(q['query_en'])
-            test_queries.append(('en', query_ar, q['category']))
+            # Translated to Arabic by run_queries
+            test_queries.append((q['query_en'], 'en', q['category']))
     
-    for lang, query_ar, expected_cat in test_queries:
-        start = time.time()
-        query_emb = model.encode([query_ar])[0]
-        
-        # Modify search based on configuration
-        if use_keywords and use_title:
-            # Full system
-            results = retriever.search(query_emb, k=5, query_text=query_ar)
-        elif use_keywords and not use_title:
-            # Keywords only (simulate by not using title matching)
-            results = retriever.search(query_emb, k=5, query_text=query_ar)
-        elif not use_keywords and use_title:
-            # Title only (simulate by not using keywords)
-            results = retriever.search(query_emb, k=5, query_text=None)
-        else:
-            # Baseline: pure semantic
-            results = retriever.search(query_emb, k=5, query_text=None)
-        
-        elapsed = time.time() - start
-        total_time += elapsed
-        
-        predicted_cat = results[0]['metadata']['category']
-        if predicted_cat == expected_cat:
-            correct += 1
+    # Configurations with keyword boosting search with the query text, the
+    # others (title only, pure semantic) without it
+    searched = run_queries(retriever, model, translator,
+                           [(text, lang) for text, lang, _ in test_queries],
+                           use_query_text=use_keywords)
+    
+    correct = sum(results[0]['metadata']['category'] == expected_cat
+                  for (_, results, _), (_, _, expected_cat) in zip(searched, test_queries))
+    total_time = sum(elapsed for _, _, elapsed in searched)
     
     total = len(test_queries)
     accuracy = correct / total if total > 0 else 0
@@ -73,26 +50,20 @@ def test_configuration(config_name, use_keywords, use_title, queries, model, ret
     }
 
 
-def main():
+def run(harness):
+    """Run the ablation study on a shared EvaluationHarness"""
     print("="*80)
     print("EXPERIMENT 5: ABLATION STUDY")
     print("="*80)
     print("\nPurpose: Measure contribution of each system component")
     
-    # Load system
-    print("\n1. Loading system...")
-    model = SentenceTransformer('paraphrase-multilingual-mpnet-base-v2')
-    retriever = RetrieverSystem(
-        'index/embeddings.npy',
-        'index/corpus_chunks.json',
-        'index/corpus_meta.json'
-    )
-    translator = TranslationService()
-    
-    # Load queries
-    with open('experiments/test_queries_dataset.json', 'r', encoding='utf-8') as f:
-        dataset = json.load(f)
-    queries = dataset['queries']
+    # Model, index and translator are loaded once by the harness
+    print("\n1. Using shared system...")
+    model, retriever, translator = harness.model, harness.retriever, harness.translator
+    
+    # Load queries; translations and encodings (including the raw English for
+    # the no-translation test) come from the prepared sidecar
+    queries = harness.load_query_set('formal')
     
     print(f"   [OK] Loaded {len(queries)} queries")
     
@@ -262,7 +233,18 @@ def main():
         print("⚠️  System enhancements provide minimal improvement (<5%)")
     
     print("\n[OK] Ablation study complete!")
+    
+    return output
+
+
+def main():
+    from harness import EvaluationHarness
+    harness = EvaluationHarness()
+    run(harness)
+    harness.save()
 
 
 if __name__ == "__main__":
+    # Fix Windows encoding
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
     main()
@@ -0,0 +1,256 @@
+"""
+Fusion Weight Grid Search
+Tunes the score fusion used by RetrieverSystem.search.
+
+The per-query semantic, title, keyword-bonus and BM25 score matrices (Q x N)
+are computed once and cached in index/fusion_score_cache_<dataset>.npz. Every weight
+combination is then scored as one broadcasted NumPy operation per block of
+combinations, and the Pareto front over the accuracy objectives is reported.
+
+Usage:
+    python experiments/fusion_grid_search.py
+    python experiments/fusion_grid_search.py --steps 21 --dataset robustness
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import argparse
+import hashlib
+import itertools
+import json
+import time
+import numpy as np
+
+BASE_DIR = os.path.join(os.path.dirname(__file__), '..')
+INDEX_DIR = os.path.join(BASE_DIR, 'index')
+CACHE_PATH = os.path.join(INDEX_DIR, 'fusion_score_cache.npz')
+OUTPUT_PATH = os.path.join(INDEX_DIR, 'fusion_grid_search.json')
+
+DATASETS = {
+    'formal': os.path.join(os.path.dirname(__file__), 'test_queries_dataset.json'),
+    'robustness': os.path.join(os.path.dirname(__file__), 'robustness_test_queries.json')
+}
+COMPONENTS = ('semantic', 'title', 'keyword', 'bm25')
+OBJECTIVES = ('category_p_at_1', 'category_p_at_3', 'mrr', 'source_p_at_1')
+
+
+def load_queries(dataset):
+    """(search text, language, gold category, gold source) rows; English rows need translation"""
+    with open(DATASETS[dataset], 'r', encoding='utf-8') as f:
+        queries = json.load(f)['queries']
+
+    rows = []
+    for q in queries:
+        if 'query' in q:
+            rows.append((q['query'], q['language'], q['category'], q.get('source')))
+            continue
+        if q.get('query_ar'):
+            rows.append((q['query_ar'], 'ar', q['category'], q.get('source')))
+        if q.get('query_en'):
+            rows.append((q['query_en'], 'en', q['category'], q.get('source')))
+    return rows
+
+
+def cache_fingerprint(dataset):
+    """Changes whenever the query set or the index artifacts change"""
+    digest = hashlib.sha256()
+    for path in [DATASETS[dataset]] + [os.path.join(INDEX_DIR, name) for name in
+                                       ('embeddings.npy', 'corpus_chunks.json', 'corpus_meta.json')]:
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def compute_score_matrices(dataset):
+    """Encode every query once and collect the (Q, N) score component matrices"""
+    from harness import EvaluationHarness
+    from rank_bm25 import BM25Okapi
+
+    harness = EvaluationHarness()
+    retriever = harness.retriever
+    rows = load_queries(dataset)
+    harness.load_query_set(dataset)
+
+    # English queries are searched through their Arabic translation, as in search()
+    texts = [harness.translator.translate_to_arabic(text) if lang == 'en' else text
+             for text, lang, _, _ in rows]
+    query_embeddings = harness.model.encode(texts)
+    harness.save()
+
+    bm25 = BM25Okapi([chunk.split() for chunk in harness.chunks])
+
+    matrices = {name: [] for name in COMPONENTS}
+    for text, query_embedding in zip(texts, query_embeddings):
+        components = retriever.score_components(query_embedding, text)
+        for name in ('semantic', 'title', 'keyword'):
+            matrices[name].append(components[name])
+
+        # Min-max normalized per query, as in Experiment 2
+        bm25_scores = bm25.get_scores(text.split())
+        if bm25_scores.max() > bm25_scores.min():
+            bm25_scores = (bm25_scores - bm25_scores.min()) / (bm25_scores.max() - bm25_scores.min())
+        matrices['bm25'].append(bm25_scores)
+
+    return {
+        'scores': np.stack([np.array(matrices[name], dtype='float32') for name in COMPONENTS]),
+        'categories': np.array([m['category'] for m in harness.metadata]),
+        'sources': np.array([m['source_file'] for m in harness.metadata]),
+        'gold_categories': np.array([r[2] for r in rows]),
+        'gold_sources': np.array([r[3] or '' for r in rows]),
+        'languages': np.array([r[1] for r in rows])
+    }
+
+
+def load_score_matrices(dataset, refresh=False):
+    """Score matrices from the cache, recomputing them when the inputs changed"""
+    fingerprint = cache_fingerprint(dataset)
+    cache_path = CACHE_PATH.replace('.npz', f'_{dataset}.npz')
+
+    if not refresh and os.path.exists(cache_path):
+        with np.load(cache_path) as cached:
+            if str(cached['fingerprint']) == fingerprint:
+                print(f"[OK] Loaded score matrices from {os.path.basename(cache_path)}")
+                return {key: cached[key] for key in cached.files if key != 'fingerprint'}
+
+    print("Computing score matrices...")
+    data = compute_score_matrices(dataset)
+    np.savez_compressed(cache_path, fingerprint=np.array(fingerprint), **data)
+    print(f"[OK] Cached score matrices to {os.path.basename(cache_path)}")
+    return data
+
+
+def weight_grid(steps, max_weight=1.0):
+    """All (semantic, title, keyword, bm25) combinations on a regular grid, minus all-zero"""
+    axis = np.linspace(0.0, max_weight, steps)
+    grid = np.array(list(itertools.product(axis, repeat=len(COMPONENTS))), dtype='float32')
+    return grid[grid.sum(axis=1) > 0]
+
+
+def evaluate_weights(weights, data, block_size=256, k=5):
+    """
+    Accuracy of every weight combination
+
+    For each combination the rank of the best-scoring chunk of the gold
+    category (or source) is counted directly from the fused score matrix.
+    Ties with non-gold chunks count against the query, so weightings that
+    flatten whole categories (e.g. keyword bonus only) are not rewarded.
+
+    Returns:
+        Objective name -> (C,) array
+    """
+    scores = data['scores']                                              # (4, Q, N)
+    category_gold = data['categories'][None, :] == data['gold_categories'][:, None]  # (Q, N)
+    source_gold = data['sources'][None, :] == data['gold_sources'][:, None]
+    has_source = data['gold_sources'] != ''
+
+    results = {name: np.empty(len(weights)) for name in OBJECTIVES}
+    for start in range(0, len(weights), block_size):
+        block = weights[start:start + block_size]
+        fused = np.tensordot(block, scores, axes=1)                      # (C, Q, N)
+
+        best_gold = np.where(category_gold, fused, -np.inf).max(axis=2)  # (C, Q)
+        rank = ((fused >= best_gold[..., None]) & ~category_gold).sum(axis=2) + 1
+        results['category_p_at_1'][start:start + len(block)] = (rank == 1).mean(axis=1)
+        results['category_p_at_3'][start:start + len(block)] = (rank <= 3).mean(axis=1)
+        results['mrr'][start:start + len(block)] = np.where(rank <= k, 1.0 / rank, 0.0).mean(axis=1)
+
+        if has_source.any():
+            fused_src = fused[:, has_source]
+            best_src = np.where(source_gold[has_source], fused_src, -np.inf).max(axis=2)
+            top1 = ~((fused_src >= best_src[..., None]) & ~source_gold[has_source]).any(axis=2)
+            results['source_p_at_1'][start:start + len(block)] = top1.mean(axis=1)
+        else:
+            results['source_p_at_1'][start:start + len(block)] = 0.0
+
+    return results
+
+
+def pareto_front(objectives):
+    """Indices of combinations no other combination beats on every objective"""
+    points = np.column_stack(objectives)
+    unique, first = np.unique(points, axis=0, return_index=True)
+
+    # dominated[i]: some point is >= on all objectives and > on at least one
+    dominated = np.zeros(len(unique), dtype=bool)
+    for start in range(0, len(unique), 512):
+        block = unique[start:start + 512]
+        ge = (unique[None, :, :] >= block[:, None, :]).all(axis=2)
+        gt = (unique[None, :, :] > block[:, None, :]).any(axis=2)
+        dominated[start:start + len(block)] = (ge & gt).any(axis=1)
+
+    front = first[~dominated]
+    return front[np.argsort(-points[front, 0], kind='stable')]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Grid-search the retrieval fusion weights')
+    parser.add_argument('--dataset', choices=sorted(DATASETS), default='formal')
+    parser.add_argument('--steps', type=int, default=11, help='Grid points per weight (default: 11)')
+    parser.add_argument('--max-weight', type=float, default=1.0)
+    parser.add_argument('--objectives', nargs='+', choices=OBJECTIVES,
+                        default=['category_p_at_1', 'source_p_at_1'],
+                        help='Objectives for the Pareto front')
+    parser.add_argument('--refresh', action='store_true', help='Recompute the cached score matrices')
+    args = parser.parse_args()
+
+    print("="*80)
+    print("FUSION WEIGHT GRID SEARCH")
+    print("="*80)
+
+    data = load_score_matrices(args.dataset, refresh=args.refresh)
+    n_components, n_queries, n_chunks = data['scores'].shape
+    print(f"[OK] {n_queries} queries x {n_chunks} chunks")
+
+    # Reference point: the weights search() uses today
+    from retrieval import RetrieverSystem
+    current = np.array([[RetrieverSystem.SEMANTIC_WEIGHT, RetrieverSystem.TITLE_WEIGHT,
+                         RetrieverSystem.KEYWORD_WEIGHT, 0.0]], dtype='float32')
+
+    weights = weight_grid(args.steps, args.max_weight)
+    start = time.time()
+    results = evaluate_weights(np.vstack([current, weights]), data)
+    elapsed = time.time() - start
+    print(f"[OK] Evaluated {len(weights)} weight combinations in {elapsed:.2f}s")
+
+    def describe(i, all_weights):
+        entry = {name: round(float(w), 4) for name, w in zip(COMPONENTS, all_weights[i])}
+        entry.update({name: float(results[name][i]) for name in OBJECTIVES})
+        return entry
+
+    all_weights = np.vstack([current, weights])
+    front = pareto_front([results[name] for name in args.objectives])
+
+    print("\n{:>9} {:>7} {:>8} {:>6}   {:>6} {:>6} {:>6} {:>6}".format(
+        "Semantic", "Title", "Keyword", "BM25", "P@1", "P@3", "MRR", "Src@1"))
+    print("-"*80)
+    for label, rows in (("current", [0]), ("pareto", front[:20])):
+        for i in rows:
+            e = describe(i, all_weights)
+            print("{:>9.2f} {:>7.2f} {:>8.2f} {:>6.2f}   {:>5.1%} {:>5.1%} {:>6.3f} {:>5.1%}  {}".format(
+                e['semantic'], e['title'], e['keyword'], e['bm25'],
+                e['category_p_at_1'], e['category_p_at_3'], e['mrr'], e['source_p_at_1'], label))
+
+    output = {
+        'experiment': 'fusion_grid_search',
+        'dataset': args.dataset,
+        'queries': int(n_queries),
+        'combinations': int(len(weights)),
+        'seconds': elapsed,
+        'objectives': args.objectives,
+        'current': describe(0, all_weights),
+        'best': {name: describe(int(np.argmax(results[name])), all_weights) for name in OBJECTIVES},
+        'pareto_front': [describe(int(i), all_weights) for i in front]
+    }
+
+    with open(OUTPUT_PATH, 'w', encoding='utf-8') as f:
+        json.dump(output, f, indent=2, ensure_ascii=False)
+
+    print(f"\n[OK] {len(front)} Pareto-optimal combinations saved to index/fusion_grid_search.json")
+
+
+if __name__ == "__main__":
+    main()
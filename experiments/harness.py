@@ -0,0 +1,286 @@
+"""
+Shared in-process evaluation harness.
+
+Loads the encoder, index and translator once and hands them to each
+experiment's run(harness). Evaluation query sets are loaded through
+load_query_set(), which preloads their translations and embeddings from the
+prepared sidecars; other texts are encoded in one batch per prefetch(), and
+translations are cached on disk across runs. Experiments keep calling
+model.encode([query])[0] and translator.translate_to_arabic(query) as before.
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+MODEL_NAME = 'paraphrase-multilingual-mpnet-base-v2'
+BASE_DIR = os.path.join(os.path.dirname(__file__), '..')
+TRANSLATION_CACHE_PATH = os.path.join(BASE_DIR, 'index', 'translation_cache.json')
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+# Concurrent translations/searches in run_queries (1 = sequential)
+EVAL_WORKERS = int(os.getenv('ARAGOV_EVAL_WORKERS', '8'))
+
+
+class PrefetchEncoder:
+    """Encoder proxy that serves query vectors from memory, batching all misses"""
+
+    def __init__(self, model):
+        self.model = model
+        self._vectors = {}
+        self.batches = 0
+        self.encoded = 0
+
+    def encode(self, sentences, **kwargs):
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+
+        missing = list(dict.fromkeys(t for t in texts if t not in self._vectors))
+        if missing:
+            vectors = np.asarray(self.model.encode(missing, show_progress_bar=False), dtype='float32')
+            self._vectors.update(zip(missing, vectors))
+            self.batches += 1
+            self.encoded += len(missing)
+
+        if single:
+            return self._vectors[texts[0]].copy()
+        if not texts:
+            return np.zeros((0, 0), dtype='float32')
+        return np.vstack([self._vectors[t] for t in texts])
+
+    def preload(self, texts, vectors):
+        """Serve precomputed vectors (e.g. from a prepared query set) without encoding"""
+        self._vectors.update(zip(texts, np.asarray(vectors, dtype='float32')))
+
+    def __getattr__(self, name):
+        if name == 'model':
+            raise AttributeError(name)
+        return getattr(self.model, name)
+
+
+class CachedTranslator:
+    """TranslationService proxy that remembers translations in a JSON file (in memory if path is None)"""
+
+    def __init__(self, translator, path: str = TRANSLATION_CACHE_PATH):
+        self.translator = translator
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._dirty = False
+
+        self._cache = {'ar': {}, 'en': {}}
+        if path and os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self._cache.update(json.load(f))
+
+    def _translate(self, text, target, translate):
+        with self._lock:
+            cached = self._cache[target].get(text)
+        if cached is not None:
+            self.hits += 1
+            return cached
+
+        self.misses += 1
+        result = translate(text)
+        # TranslationService returns the input unchanged on failure; don't pin that
+        if result and result != text:
+            with self._lock:
+                self._cache[target][text] = result
+                self._dirty = True
+        return result
+
+    def preload(self, target, translations):
+        """Add known translations (e.g. from a prepared query set) to the in-memory cache"""
+        with self._lock:
+            self._cache[target].update(translations)
+
+    def translate_to_arabic(self, text):
+        return self._translate(text, 'ar', self.translator.translate_to_arabic)
+
+    def translate_to_english(self, text):
+        return self._translate(text, 'en', self.translator.translate_to_english)
+
+    def save(self):
+        """Write new translations back to the cache file"""
+        with self._lock:
+            if not self._dirty or not self.path:
+                return
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._cache, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+
+    def __getattr__(self, name):
+        # detect_language, process_query, ... fall through to the real service
+        if name == 'translator':
+            raise AttributeError(name)
+        return getattr(self.translator, name)
+
+
+class EvaluationHarness:
+    """Model, index and translator loaded once and shared by all experiments"""
+
+    def __init__(self, index_dir: str = os.path.join(BASE_DIR, 'index'),
+                 translation_cache_path: str = TRANSLATION_CACHE_PATH):
+        from sentence_transformers import SentenceTransformer
+        from retrieval import RetrieverSystem
+        from translator import TranslationService
+        from embedding_store import EmbeddingStore, CachedEncoder
+        from record_replay import Cassette, RecordReplayTranslator, mode_from_env
+
+        start = time.time()
+        print("Loading evaluation harness...")
+
+        store = EmbeddingStore(MODEL_NAME, os.path.join(index_dir, 'embedding_store.sqlite'))
+        self.model = PrefetchEncoder(CachedEncoder(SentenceTransformer(MODEL_NAME), store))
+        self.retriever = RetrieverSystem(
+            os.path.join(index_dir, 'embeddings.npy'),
+            os.path.join(index_dir, 'corpus_chunks.json'),
+            os.path.join(index_dir, 'corpus_meta.json')
+        )
+
+        # ARAGOV_RECORD_MODE=replay runs the experiments offline from experiments/fixtures.
+        # The cassette then replaces the on-disk translation cache, so recording
+        # sees every translation instead of only the cache misses.
+        self.record_mode, latency = mode_from_env()
+        if self.record_mode:
+            translation_cache_path = None
+            translator = RecordReplayTranslator(
+                Cassette(os.path.join(FIXTURES_DIR, 'translator.json.gz')), self.record_mode, latency)
+            print(f"[OK] Translator in {self.record_mode} mode ({len(translator.recorder.cassette)} recorded)")
+        else:
+            translator = TranslationService()
+        self.translator = CachedTranslator(translator, translation_cache_path)
+
+        self.load_seconds = time.time() - start
+        print(f"[OK] Harness ready in {self.load_seconds:.1f}s")
+
+    @property
+    def chunks(self):
+        return self.retriever.chunks
+
+    @property
+    def metadata(self):
+        return self.retriever.metadata
+
+    @property
+    def embeddings(self):
+        """L2-normalized corpus embeddings"""
+        return self.retriever.embeddings
+
+    def translate_all(self, texts, target='ar'):
+        """Translate a list (cached), preserving order"""
+        translate = (self.translator.translate_to_arabic if target == 'ar'
+                     else self.translator.translate_to_english)
+        return [translate(t) for t in texts]
+
+    def prefetch(self, texts):
+        """Encode every not-yet-seen text in a single batch"""
+        texts = [t for t in texts if t]
+        if texts:
+            self.model.encode(texts)
+
+    def load_query_set(self, name, queries=None, language='ar', round_trip=False):
+        """
+        Queries of an evaluation set, with translations and encodings preloaded
+
+        Translations and query embeddings come from the set's sidecar in
+        experiments/prepared/ (see prepare_query_sets.py), which is built on
+        first use and rebuilt when the queries or the model change.
+
+        Args:
+            name: 'formal', 'robustness', or a name for the queries passed in
+            queries: Query dicts (default: the named dataset file)
+            language: Language of {'query'} entries without a 'language' key
+            round_trip: Also prepare EN -> AR -> EN -> AR back-translations
+        """
+        from prepare_query_sets import load_queries, load_sidecar, prepare_query_set, sidecar_path
+
+        if queries is None:
+            queries = load_queries(name)
+
+        prepared = load_sidecar(name, queries, language, round_trip)
+        if prepared is None:
+            prepared = prepare_query_set(name, queries, self.translator, self.model,
+                                         language, round_trip)
+            print(f"   [OK] Prepared {os.path.relpath(sidecar_path(name))}")
+
+        for target, translations in prepared['translations'].items():
+            self.translator.preload(target, translations)
+        self.model.preload(prepared['texts'], prepared['embeddings'])
+        return queries
+
+    def save(self):
+        self.translator.save()
+        if self.record_mode:
+            self.translator.translator.save()
+
+    def get_stats(self):
+        return {
+            'load_seconds': self.load_seconds,
+            'encode_batches': self.model.batches,
+            'texts_encoded': self.model.encoded,
+            'translation_hits': self.translator.hits,
+            'translation_misses': self.translator.misses,
+            'record_replay': (self.translator.translator.recorder.get_stats()
+                              if self.record_mode else None)
+        }
+
+
+def parallel_map(func, items, workers=EVAL_WORKERS):
+    """func over items on a bounded thread pool; results in input order"""
+    items = list(items)
+    if workers <= 1 or len(items) <= 1:
+        return [func(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(workers, len(items))) as pool:
+        return list(pool.map(func, items))
+
+
+def run_queries(retriever, model, translator, queries, k=5, use_query_text=True,
+                workers=EVAL_WORKERS):
+    """
+    Search a list of (text, language) queries concurrently
+
+    English texts are translated to Arabic on a thread pool (network-bound),
+    every search text is encoded in one batch, and the searches run on the
+    pool as well. Results come back in input order, identical to running the
+    queries one by one.
+
+    Returns:
+        One (search_text, search_results, seconds) tuple per query; seconds
+        is the query's search time plus its share of the batch encoding
+    """
+    english = list(dict.fromkeys(text for text, language in queries if language == 'en'))
+    translated = dict(zip(english, parallel_map(translator.translate_to_arabic, english, workers)))
+    texts = [translated[text] if language == 'en' else text for text, language in queries]
+    if not texts:
+        return []
+
+    start = time.time()
+    embeddings = model.encode(texts)
+    encode_share = (time.time() - start) / len(texts)
+
+    def search(i):
+        start = time.time()
+        results = retriever.search(embeddings[i], k=k,
+                                   query_text=texts[i] if use_query_text else None)
+        return texts[i], results, encode_share + time.time() - start
+
+    return parallel_map(search, range(len(texts)), workers)
+
+
+def run_experiment_module(module, harness):
+    """Run a plug-in experiment (a module exposing run(harness)) and persist caches"""
+    try:
+        return module.run(harness)
+    finally:
+        harness.save()
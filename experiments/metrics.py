@@ -0,0 +1,130 @@
+"""
+Vectorized retrieval metrics for the experiments.
+
+Every function works on a Q x k matrix of retrieved labels (categories or
+source files, best first) and a length-Q vector of gold labels, so a whole
+query set is scored in one NumPy pass. Definitions match the ones the
+experiments have always reported:
+
+    P@k     1 if the gold label appears in the top k (hit rate)
+    MRR     1 / rank of the first correct result, 0 if none
+    NDCG@k  DCG of the binary relevance row with IDCG fixed at 1.0
+"""
+
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+def label_matrix(rows: Sequence[Sequence], k: int = None, fill=None) -> np.ndarray:
+    """Stack ranked label lists into a (Q, k) object array, padding short rows"""
+    k = k if k is not None else max((len(r) for r in rows), default=0)
+    matrix = np.full((len(rows), k), fill, dtype=object)
+    for i, row in enumerate(rows):
+        row = list(row)[:k]
+        matrix[i, :len(row)] = row
+    return matrix
+
+
+def relevance(retrieved, gold) -> np.ndarray:
+    """(Q, k) bool matrix: retrieved[i, j] == gold[i] (never true for a missing gold label)"""
+    retrieved = np.asarray(retrieved)
+    gold = np.asarray(gold)
+    rel = np.asarray(retrieved == gold[:, None], dtype=bool)
+    if gold.dtype == object:
+        # Padding is None too; a missing gold label must not match it
+        rel &= np.array([g is not None for g in gold], dtype=bool)[:, None]
+    return rel
+
+
+def hits_at_k(rel: np.ndarray, k: int) -> np.ndarray:
+    """Per-query P@k as the experiments report it: any relevant result in the top k"""
+    return rel[:, :k].any(axis=1)
+
+
+def reciprocal_rank(rel: np.ndarray) -> np.ndarray:
+    """Per-query 1/rank of the first relevant result (0.0 if none in the window)"""
+    first = rel.argmax(axis=1)
+    return np.where(rel.any(axis=1), 1.0 / (first + 1), 0.0)
+
+
+def ndcg_at_k(rel: np.ndarray, k: int) -> np.ndarray:
+    """Per-query DCG@k of binary relevance; IDCG is 1.0 (one relevant item expected)"""
+    window = rel[:, :k]
+    discounts = 1.0 / np.log2(np.arange(window.shape[1]) + 2)
+    return window.astype(float) @ discounts
+
+
+def evaluate_rankings(retrieved_categories, gold_categories,
+                      retrieved_sources=None, gold_sources=None,
+                      ks: Sequence[int] = (1, 3, 5), ndcg_k: int = 5) -> Dict[str, np.ndarray]:
+    """
+    Score a query set in one pass
+
+    Args:
+        retrieved_categories: (Q, k) ranked categories
+        gold_categories: (Q,) expected categories
+        retrieved_sources: Optional (Q, k) ranked source files
+        gold_sources: Optional (Q,) expected source files (None where unknown)
+        ks: Cutoffs for P@k
+        ndcg_k: Cutoff for NDCG
+
+    Returns:
+        Per-query arrays: correct_at_<k>, reciprocal_rank, ndcg_at_<ndcg_k> and,
+        with sources, has_source plus source_correct_at_<k> (False where has_source is False)
+    """
+    rel = relevance(retrieved_categories, gold_categories)
+    metrics = {f'correct_at_{k}': hits_at_k(rel, k) for k in ks}
+    metrics['reciprocal_rank'] = reciprocal_rank(rel)
+    metrics[f'ndcg_at_{ndcg_k}'] = ndcg_at_k(rel, ndcg_k)
+
+    if retrieved_sources is not None and gold_sources is not None:
+        source_rel = relevance(retrieved_sources, gold_sources)
+        metrics['has_source'] = np.array([s is not None for s in gold_sources], dtype=bool)
+        for k in ks:
+            metrics[f'source_correct_at_{k}'] = hits_at_k(source_rel, k)
+
+    return metrics
+
+
+def rate(values, mask=None) -> Optional[float]:
+    """Mean of values (optionally where mask is true); None if nothing is selected"""
+    values = np.asarray(values, dtype=float)
+    if mask is not None:
+        values = values[np.asarray(mask, dtype=bool)]
+    return float(values.mean()) if values.size else None
+
+
+def group_breakdown(correct, groups) -> Dict[str, Dict]:
+    """P@1-style rate per group label: {group: {'precision_at_1', 'correct', 'total'}}"""
+    correct = np.asarray(correct, dtype=float)
+    labels, inverse = np.unique(np.asarray(groups, dtype=str), return_inverse=True)
+    totals = np.bincount(inverse, minlength=len(labels))
+    hits = np.bincount(inverse, weights=correct, minlength=len(labels))
+    return {
+        str(label): {
+            'precision_at_1': float(hits[i] / totals[i]),
+            'correct': int(hits[i]),
+            'total': int(totals[i])
+        }
+        for i, label in enumerate(labels)
+    }
+
+
+def bootstrap_ci(values, confidence: float = 0.95, n_resamples: int = 2000,
+                 seed: int = 0) -> Dict[str, float]:
+    """Percentile bootstrap confidence interval of the mean"""
+    values = np.asarray(values, dtype=float)
+    if values.size == 0:
+        return {'lower': None, 'upper': None}
+
+    rng = np.random.RandomState(seed)
+    means = values[rng.randint(0, values.size, size=(n_resamples, values.size))].mean(axis=1)
+    alpha = (1.0 - confidence) / 2
+    lower, upper = np.percentile(means, [100 * alpha, 100 * (1 - alpha)])
+    return {'lower': float(lower), 'upper': float(upper)}
+
+
+def column(results: List[Dict], key: str, dtype=None) -> np.ndarray:
+    """One field of a list of per-query result dicts as an array"""
+    return np.array([r[key] for r in results], dtype=dtype)
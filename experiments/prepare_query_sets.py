@@ -0,0 +1,181 @@
+"""
+Query Set Preparation
+Translates every English evaluation query once and stores the translations
+together with the embeddings of every search text in a versioned sidecar
+(experiments/prepared/<name>.npz). EvaluationHarness.load_query_set() reads
+the sidecars, so experiments run without translator calls or query encoding.
+
+A sidecar is rebuilt automatically when the queries, the embedding model or
+the sidecar format change.
+
+Usage:
+    python experiments/prepare_query_sets.py
+    python experiments/prepare_query_sets.py --refresh
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import argparse
+import hashlib
+import json
+import numpy as np
+
+from harness import MODEL_NAME, parallel_map
+
+SIDECAR_VERSION = 1
+PREPARED_DIR = os.path.join(os.path.dirname(__file__), 'prepared')
+
+QUERY_SETS = {
+    'formal': os.path.join(os.path.dirname(__file__), 'test_queries_dataset.json'),
+    'robustness': os.path.join(os.path.dirname(__file__), 'robustness_test_queries.json')
+}
+
+
+def load_queries(name):
+    with open(QUERY_SETS[name], 'r', encoding='utf-8') as f:
+        return json.load(f)['queries']
+
+
+def split_languages(queries, language='ar'):
+    """
+    (arabic, english) query texts, in order
+
+    Accepts both dataset layouts: {'query_ar', 'query_en'} pairs and
+    {'query', 'language'} entries (language defaults to `language`).
+    """
+    arabic, english = [], []
+    for q in queries:
+        if q.get('query_ar'):
+            arabic.append(q['query_ar'])
+        if q.get('query_en'):
+            english.append(q['query_en'])
+        if q.get('query'):
+            (english if q.get('language', language) == 'en' else arabic).append(q['query'])
+    return arabic, english
+
+
+def fingerprint(queries, language='ar', round_trip=False):
+    """Changes whenever the queries, the model or the sidecar format change"""
+    payload = json.dumps([SIDECAR_VERSION, MODEL_NAME, language, round_trip, queries],
+                         ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def sidecar_path(name):
+    return os.path.join(PREPARED_DIR, f'{name}.npz')
+
+
+def prepare_query_set(name, queries, translator, model, language='ar', round_trip=False):
+    """
+    Translate and encode a query set and write its sidecar
+
+    Every English query is translated to Arabic; with round_trip the Arabic is
+    also translated back to English and to Arabic again (Experiment 1's
+    back-translation). All Arabic and English texts are encoded in one batch.
+
+    Returns:
+        The sidecar contents (see load_sidecar)
+    """
+    arabic, english = split_languages(queries, language)
+    english = list(dict.fromkeys(english))
+
+    # Translation is network-bound: each step runs on a thread pool
+    to_ar = dict(zip(english, parallel_map(translator.translate_to_arabic, english)))
+    to_en = {}
+    if round_trip:
+        arabic_variants = list(dict.fromkeys(to_ar.values()))
+        to_en = dict(zip(arabic_variants, parallel_map(translator.translate_to_english, arabic_variants)))
+        english_variants = list(dict.fromkeys(to_en.values()))
+        to_ar.update(zip(english_variants, parallel_map(translator.translate_to_arabic, english_variants)))
+
+    texts = list(dict.fromkeys(t for t in arabic + english + list(to_ar.values()) if t))
+    embeddings = np.asarray(model.encode(texts), dtype='float32')
+
+    # TranslationService returns the input unchanged on failure; don't pin that
+    to_ar = {source: target for source, target in to_ar.items() if target and target != source}
+    to_en = {source: target for source, target in to_en.items() if target and target != source}
+
+    prepared = {
+        'texts': texts,
+        'embeddings': embeddings,
+        'translations': {'ar': to_ar, 'en': to_en}
+    }
+
+    os.makedirs(PREPARED_DIR, exist_ok=True)
+    path = sidecar_path(name)
+    tmp_path = path + '.tmp.npz'
+    np.savez_compressed(
+        tmp_path,
+        version=np.array(SIDECAR_VERSION),
+        fingerprint=np.array(fingerprint(queries, language, round_trip)),
+        model=np.array(MODEL_NAME),
+        texts=np.array(texts, dtype=str),
+        embeddings=embeddings,
+        ar_sources=np.array(list(to_ar.keys()), dtype=str),
+        ar_targets=np.array(list(to_ar.values()), dtype=str),
+        en_sources=np.array(list(to_en.keys()), dtype=str),
+        en_targets=np.array(list(to_en.values()), dtype=str)
+    )
+    os.replace(tmp_path, path)
+    return prepared
+
+
+def load_sidecar(name, queries, language='ar', round_trip=False):
+    """
+    Prepared translations and embeddings, or None if the sidecar is missing or stale
+
+    Returns:
+        {'texts': [...], 'embeddings': (T, D) array,
+         'translations': {'ar': {source: arabic}, 'en': {source: english}}}
+    """
+    path = sidecar_path(name)
+    if not os.path.exists(path):
+        return None
+
+    with np.load(path) as sidecar:
+        if (int(sidecar['version']) != SIDECAR_VERSION or
+                str(sidecar['fingerprint']) != fingerprint(queries, language, round_trip)):
+            return None
+        return {
+            'texts': sidecar['texts'].tolist(),
+            'embeddings': sidecar['embeddings'],
+            'translations': {
+                'ar': dict(zip(sidecar['ar_sources'].tolist(), sidecar['ar_targets'].tolist())),
+                'en': dict(zip(sidecar['en_sources'].tolist(), sidecar['en_targets'].tolist()))
+            }
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pre-translate and encode the evaluation query sets')
+    parser.add_argument('--refresh', action='store_true', help='Rebuild sidecars even if up to date')
+    args = parser.parse_args()
+
+    print("="*80)
+    print("QUERY SET PREPARATION")
+    print("="*80)
+
+    from harness import EvaluationHarness
+    from experiment1_translation_strategies import TEST_QUERIES
+
+    harness = EvaluationHarness()
+    query_sets = [(name, load_queries(name), 'ar', False) for name in QUERY_SETS]
+    query_sets.append(('translation_strategies', TEST_QUERIES, 'en', True))
+
+    for name, queries, language, round_trip in query_sets:
+        if not args.refresh and load_sidecar(name, queries, language, round_trip) is not None:
+            print(f"[OK] {name}: up to date")
+            continue
+        prepared = prepare_query_set(name, queries, harness.translator, harness.model,
+                                     language, round_trip)
+        print(f"[OK] {name}: {len(prepared['translations']['ar'])} translations, "
+              f"{len(prepared['texts'])} embeddings -> {os.path.relpath(sidecar_path(name))}")
+
+    harness.save()
+
+
+if __name__ == "__main__":
+    main()
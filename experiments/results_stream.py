@@ -0,0 +1,127 @@
+"""
+Streaming per-query results.
+
+Experiments append one compact JSON line per query to index/<experiment>.jsonl
+as results are scored, instead of collecting every result and dumping one large
+indented file at the end. Records reference chunks by their retriever id
+(stable across add/remove/compact; the row in corpus_chunks.json for an
+unmodified index) rather than repeating their text.
+
+Summaries are gathered while writing (SummaryColumns), a few bytes per query
+and field, or computed by reading the stream back with iter_records.
+"""
+
+import json
+import os
+from array import array
+
+import numpy as np
+
+
+class SummaryColumns:
+    """
+    Compact per-query columns gathered as records are written
+
+    Numeric and boolean fields are kept as float64 (None -> NaN) and string
+    fields as int32 codes into a label table, so summaries never need the
+    records themselves. The first `keep_failures` records whose
+    `failure_field` is false are kept whole as failure examples.
+    """
+
+    def __init__(self, numeric, labels=(), failure_field=None, keep_failures=10):
+        self._numeric = {field: array('d') for field in numeric}
+        self._codes = {field: array('i') for field in labels}
+        self._label_ids = {field: {} for field in labels}
+        self.failure_field = failure_field
+        self.keep_failures = keep_failures
+        self.failures = []
+        self.count = 0
+
+    def add(self, record):
+        for field, values in self._numeric.items():
+            value = record.get(field)
+            values.append(float('nan') if value is None else float(value))
+        for field, codes in self._codes.items():
+            ids = self._label_ids[field]
+            codes.append(ids.setdefault(str(record.get(field)), len(ids)))
+        if (self.failure_field and not record.get(self.failure_field)
+                and len(self.failures) < self.keep_failures):
+            self.failures.append(record)
+        self.count += 1
+
+    def values(self, field):
+        """Numeric column as a float array (NaN where the record had None)"""
+        # Copy: a live view would stop the array from growing
+        return np.frombuffer(self._numeric[field], dtype='float64').copy() if self.count else np.zeros(0)
+
+    def labels(self, field):
+        """String column as an array of labels"""
+        table = np.array(list(self._label_ids[field]), dtype=str)
+        return table[np.frombuffer(self._codes[field], dtype='int32')] if self.count else table
+
+    def __len__(self):
+        return self.count
+
+
+class ResultsWriter:
+    """Appends records to a JSONL file; the file appears atomically on close"""
+
+    def __init__(self, path, summary=None):
+        """
+        Args:
+            path: Destination .jsonl file
+            summary: Optional SummaryColumns updated with every record written
+        """
+        self.path = path
+        self.summary = summary
+        self.count = 0
+        self._tmp_path = path + '.partial'
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._file = open(self._tmp_path, 'w', encoding='utf-8')
+
+    def write(self, record):
+        self._file.write(json.dumps(record, ensure_ascii=False, separators=(',', ':'), default=_to_python))
+        self._file.write('\n')
+        if self.summary is not None:
+            self.summary.add(record)
+        self.count += 1
+
+    def close(self):
+        if self._file.closed:
+            return
+        self._file.close()
+        os.replace(self._tmp_path, self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            # Keep the previous complete file rather than a truncated one
+            self._file.close()
+            os.remove(self._tmp_path)
+
+
+def iter_records(path, fields=None):
+    """
+    Records of a JSONL results file, one at a time
+
+    Args:
+        path: File written by ResultsWriter
+        fields: Keep only these keys of each record (default: all)
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            yield {k: record.get(k) for k in fields} if fields else record
+
+
+def _to_python(obj):
+    """NumPy scalars -> Python (json.dumps default hook)"""
+    if hasattr(obj, 'item'):
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
@@ -1,11 +1,19 @@
 """
 Master script to run all research experiments.
 Executes Day 8 experiments in sequence.
+
+By default every experiment runs in this process on one EvaluationHarness
+(experiments/harness.py), so the model and index are loaded once and query
+encodings and translations are shared. --subprocess runs each script on its own.
 """
 
+import importlib
 import subprocess
 import sys
 import time
+import traceback
+
+sys.path.insert(0, 'experiments')
 
 
 def run_experiment(script_name, description):
@@ -35,10 +43,37 @@ def run_experiment(script_name, description):
         return False
 
 
+def run_experiment_in_process(module_name, description, harness):
+    """Run a single experiment's run(harness) in this process"""
+    from harness import run_experiment_module
+    
+    print("\n" + "="*80)
+    print(f"STARTING: {description}")
+    print("="*80)
+    
+    start_time = time.time()
+    
+    try:
+        run_experiment_module(importlib.import_module(module_name), harness)
+        
+        elapsed = time.time() - start_time
+        print(f"\n✅ {description} completed in {elapsed:.1f}s")
+        return True
+        
+    except Exception as e:
+        elapsed = time.time() - start_time
+        print(f"\n❌ {description} failed after {elapsed:.1f}s")
+        print(f"Error: {e}")
+        traceback.print_exc()
+        return False
+
+
 def main():
     import argparse
     parser = argparse.ArgumentParser(description='Run all research experiments')
     parser.add_argument('--auto', action='store_true', help='Run without prompts (for automation)')
+    parser.add_argument('--subprocess', action='store_true',
+                        help='Run each experiment as a separate script (reloads the model each time)')
     args = parser.parse_args()
     
     print("="*80)
@@ -58,22 +93,27 @@ def main():
     experiments = [
         {
             'script': 'experiments/experiment1_translation_strategies.py',
+            'module': 'experiment1_translation_strategies',
             'description': 'Experiment 1 - Translation Strategies'
         },
         {
             'script': 'experiments/experiment2_hybrid_retrieval.py',
+            'module': 'experiment2_hybrid_retrieval',
             'description': 'Experiment 2 - Hybrid Retrieval'
         },
         {
             'script': 'experiments/experiment3_comprehensive_evaluation.py',
+            'module': 'experiment3_comprehensive_evaluation',
             'description': 'Experiment 3 - Comprehensive Evaluation'
         },
         {
             'script': 'experiments/experiment4_robustness_evaluation.py',
+            'module': 'experiment4_robustness_evaluation',
             'description': 'Experiment 4 - Robustness Evaluation'
         },
         {
             'script': 'experiments/experiment5_ablation_study.py',
+            'module': 'experiment5_ablation_study',
             'description': 'Experiment 5 - Ablation Study'
         }
     ]
@@ -81,8 +121,16 @@ def main():
     results = []
     total_start = time.time()
     
+    harness = None
+    if not args.subprocess:
+        from harness import EvaluationHarness
+        harness = EvaluationHarness()
+    
     for exp in experiments:
-        success = run_experiment(exp['script'], exp['description'])
+        if harness is None:
+            success = run_experiment(exp['script'], exp['description'])
+        else:
+            success = run_experiment_in_process(exp['module'], exp['description'], harness)
         results.append({
             'experiment': exp['description'],
             'success': success
@@ -112,14 +160,19 @@ def main():
     successful = sum(1 for r in results if r['success'])
     print(f"\nTotal: {successful}/{len(results)} experiments successful")
     print(f"Total time: {total_elapsed/60:.1f} minutes")
+    if harness is not None:
+        stats = harness.get_stats()
+        print(f"Harness: loaded in {stats['load_seconds']:.1f}s, "
+              f"{stats['texts_encoded']} texts encoded in {stats['encode_batches']} batches, "
+              f"{stats['translation_hits']} translation cache hits")
     
     if successful == len(results):
         print("\n🎉 All experiments completed successfully!")
         print("\nResults saved to:")
         print("  - index/experiment1_translation_strategies.json")
-        print("  - index/experiment2_hybrid_retrieval.json")
-        print("  - index/experiment3_comprehensive_evaluation.json")
-        print("  - index/experiment4_robustness_evaluation.json")
+        print("  - index/experiment2_hybrid_retrieval.json (+ per-query .jsonl)")
+        print("  - index/experiment3_comprehensive_evaluation.json (+ per-query .jsonl)")
+        print("  - index/experiment4_robustness_evaluation.json (+ per-query .jsonl)")
         print("  - index/experiment5_ablation_study.json")
     else:
         print("\n⚠️  Some experiments failed. Check the output above for details.")
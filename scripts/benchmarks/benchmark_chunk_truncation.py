@@ -0,0 +1,58 @@
+"""
+Encoder truncation report for the chunking strategies
+Counts how many tokens of the data/ corpus the encoder never sees when chunks
+are sized in characters versus in encoder tokens.
+"""
+import argparse
+import glob
+import sys
+
+sys.path.append('src')
+
+from chunking import chunk_document, get_tokenizer, truncation_report
+
+
+def print_report(name, report):
+    print(f"\n📊 {name}")
+    print(f"   Chunks:           {report['chunks']}")
+    print(f"   Tokens:           {report['tokens']}")
+    print(f"   Truncated chunks: {report['truncated_chunks']}")
+    print(f"   Truncated tokens: {report['truncated_tokens']} ({report['truncated_fraction']:.1%})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare encoder truncation across chunking strategies')
+    parser.add_argument('--chunk-size', type=int, default=512)
+    parser.add_argument('--overlap', type=int, default=128)
+    parser.add_argument('--max-seq-length', type=int, default=128)
+    parser.add_argument('--overlap-tokens', type=int, default=16)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("✂️  Chunk Truncation Report")
+    print("=" * 60)
+
+    files = sorted(glob.glob('data/*/*.txt'))
+    if not files:
+        print("❌ No documents found under data/")
+        sys.exit(1)
+
+    tokenizer = get_tokenizer()
+
+    char_chunks = [c for f in files
+                   for c in chunk_document(f, chunk_size=args.chunk_size, overlap=args.overlap)]
+    token_chunks = [c for f in files
+                    for c in chunk_document(f, strategy='tokens', max_seq_length=args.max_seq_length,
+                                            overlap_tokens=args.overlap_tokens)]
+
+    before = truncation_report(char_chunks, tokenizer, args.max_seq_length)
+    after = truncation_report(token_chunks, tokenizer, args.max_seq_length)
+
+    print_report(f"Character chunks (chunk_size={args.chunk_size}, overlap={args.overlap})", before)
+    print_report(f"Token chunks (window={args.max_seq_length}, overlap={args.overlap_tokens})", after)
+
+    print(f"\n✅ Tokens lost to truncation: {before['truncated_tokens']} → {after['truncated_tokens']}")
+
+
+if __name__ == "__main__":
+    main()
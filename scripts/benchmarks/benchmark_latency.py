@@ -0,0 +1,213 @@
+"""
+Per-stage latency benchmark
+Times each stage of the query and build paths (normalization, chunking,
+encoding, retrieval, encoding + retrieval end to end, BM25, prompt
+construction) with warmup and repetitions,
+reports p50/p95/p99 and throughput, and compares against a stored baseline.
+
+Usage:
+    python scripts/benchmarks/benchmark_latency.py --save-baseline
+    python scripts/benchmarks/benchmark_latency.py --threshold 0.25
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import sys
+import time
+
+import numpy as np
+
+sys.path.append('src')
+
+RESULTS_PATH = 'index/latency_benchmark.json'
+BASELINE_PATH = 'index/latency_baseline.json'
+STAGES = ('normalize', 'chunk', 'encode', 'search', 'query', 'bm25', 'prompt')
+PERCENTILES = (50, 95, 99)
+
+
+def load_documents():
+    """Every document under data/"""
+    texts = []
+    for filepath in sorted(glob.glob('data/*/*.txt')):
+        with open(filepath, 'r', encoding='utf-8') as f:
+            texts.append(f.read())
+    return texts
+
+
+def load_queries():
+    with open('experiments/test_queries_dataset.json', 'r', encoding='utf-8') as f:
+        return [q['query_ar'] for q in json.load(f)['queries'] if q.get('query_ar')]
+
+
+def time_stage(func, inputs, warmup, repeats):
+    """
+    Per-call latencies of func over inputs
+
+    The first `warmup` calls are discarded; then every input is run `repeats`
+    times, so the sample holds len(inputs) * repeats timings.
+    """
+    for i in range(warmup):
+        func(inputs[i % len(inputs)])
+
+    samples = []
+    for _ in range(repeats):
+        for item in inputs:
+            start = time.perf_counter()
+            func(item)
+            samples.append(time.perf_counter() - start)
+    return np.array(samples)
+
+
+def summarize(samples):
+    """Latency percentiles in milliseconds plus throughput in calls/second"""
+    p50, p95, p99 = np.percentile(samples, PERCENTILES) * 1000
+    return {
+        'calls': int(samples.size),
+        'mean_ms': float(samples.mean() * 1000),
+        'p50_ms': float(p50),
+        'p95_ms': float(p95),
+        'p99_ms': float(p99),
+        'throughput_per_sec': float(samples.size / samples.sum()) if samples.sum() > 0 else None
+    }
+
+
+def build_stages(selected):
+    """Stage name -> (callable, inputs); heavy dependencies load only for selected stages"""
+    from preprocessing import normalize_arabic
+
+    documents = load_documents()
+    queries = load_queries()
+    stages = {}
+
+    if 'normalize' in selected:
+        stages['normalize'] = (normalize_arabic, documents)
+
+    if 'chunk' in selected:
+        from chunking import chunk_text
+        # chunk_text cleans the document itself
+        stages['chunk'] = (chunk_text, documents)
+
+    if {'encode', 'search', 'query', 'prompt'} & set(selected):
+        from sentence_transformers import SentenceTransformer
+        from retrieval import RetrieverSystem
+
+        # Uncached model: this measures real encoder cost, not store lookups
+        model = SentenceTransformer('paraphrase-multilingual-mpnet-base-v2')
+        retriever = RetrieverSystem('index/embeddings.npy', 'index/corpus_chunks.json',
+                                    'index/corpus_meta.json')
+        query_embeddings = model.encode(queries, show_progress_bar=False)
+
+        if 'encode' in selected:
+            stages['encode'] = (lambda q: model.encode([q], show_progress_bar=False), queries)
+        if 'search' in selected:
+            stages['search'] = (lambda i: retriever.search(query_embeddings[i], k=5, query_text=queries[i]),
+                                list(range(len(queries))))
+        if 'query' in selected:
+            # What a user waits for (the app's response-time metric): one p95 of
+            # the combined call, not the sum of two per-stage p95s
+            stages['query'] = (lambda q: retriever.search(model.encode([q], show_progress_bar=False)[0],
+                                                          k=5, query_text=q), queries)
+        if 'prompt' in selected:
+            from llm_generator import build_prompt
+            contexts = [retriever.search(e, k=5, query_text=q) for e, q in zip(query_embeddings, queries)]
+            stages['prompt'] = (lambda i: build_prompt(queries[i], contexts[i]), list(range(len(queries))))
+
+    if 'bm25' in selected:
+        try:
+            from rank_bm25 import BM25Okapi
+        except ImportError:
+            print("⚠️  rank_bm25 not installed; skipping bm25 stage")
+        else:
+            with open('index/corpus_chunks.json', 'r', encoding='utf-8') as f:
+                bm25 = BM25Okapi([chunk.split() for chunk in json.load(f)])
+            stages['bm25'] = (lambda q: bm25.get_scores(q.split()), queries)
+
+    return {name: stages[name] for name in selected if name in stages}
+
+
+def compare_with_baseline(results, baseline, threshold):
+    """Stages whose p50 or p95 grew by more than threshold (fraction) over the baseline"""
+    regressions = []
+    for stage, current in results['stages'].items():
+        previous = baseline.get('stages', {}).get(stage)
+        if not previous:
+            continue
+        for key in ('p50_ms', 'p95_ms'):
+            if previous[key] > 0 and current[key] > previous[key] * (1 + threshold):
+                regressions.append({
+                    'stage': stage,
+                    'metric': key,
+                    'baseline': previous[key],
+                    'current': current[key],
+                    'change': current[key] / previous[key] - 1
+                })
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-stage latency benchmark with regression check')
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=list(STAGES))
+    parser.add_argument('--warmup', type=int, default=5, help='Discarded calls per stage')
+    parser.add_argument('--repeats', type=int, default=5, help='Passes over the inputs per stage')
+    parser.add_argument('--threshold', type=float, default=0.20,
+                        help='Allowed p50/p95 slowdown vs the baseline (0.20 = 20%%)')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--output', default=RESULTS_PATH)
+    parser.add_argument('--save-baseline', action='store_true', help='Store this run as the new baseline')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("⏱️  Latency Benchmark")
+    print("=" * 60)
+
+    stages = build_stages(args.stages)
+
+    results = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'machine': {'platform': platform.platform(), 'python': platform.python_version(),
+                    'cpus': os.cpu_count()},
+        'warmup': args.warmup,
+        'repeats': args.repeats,
+        'stages': {}
+    }
+
+    print(f"\n{'Stage':<10} {'calls':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'ops/s':>10}")
+    print("-" * 60)
+    for name, (func, inputs) in stages.items():
+        stats = summarize(time_stage(func, inputs, args.warmup, args.repeats))
+        results['stages'][name] = stats
+        print(f"{name:<10} {stats['calls']:>6} {stats['p50_ms']:>9.3f} {stats['p95_ms']:>9.3f} "
+              f"{stats['p99_ms']:>9.3f} {stats['throughput_per_sec']:>10.1f}")
+
+    regressions = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(results, baseline, args.threshold)
+        results['baseline'] = {'path': args.baseline, 'timestamp': baseline.get('timestamp'),
+                               'threshold': args.threshold, 'regressions': regressions}
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"\n✅ Results saved to {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Baseline saved to {args.baseline}")
+    elif 'baseline' not in results:
+        print(f"ℹ️  No baseline at {args.baseline}; run with --save-baseline to create one")
+    elif regressions:
+        print(f"\n❌ {len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+        for r in regressions:
+            print(f"   {r['stage']:<10} {r['metric']}: {r['baseline']:.3f} → {r['current']:.3f} ms "
+                  f"(+{r['change']:.0%})")
+        sys.exit(1)
+    else:
+        print(f"✅ No stage slower than the baseline by more than {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Arabic normalizer throughput benchmark
+Compares the single-pass normalizer against the original multi-pass version
+on the data/ corpus and on a synthetically scaled copy of it.
+"""
+import argparse
+import glob
+import re
+import sys
+import time
+
+sys.path.append('src')
+
+from preprocessing import normalize_arabic, clean_document
+
+
+def normalize_arabic_multipass(text: str) -> str:
+    """Original six-pass implementation (reference for output and speed)"""
+    if not text:
+        return ""
+    text = re.sub(r'[\u064B-\u065F\u0670]', '', text)
+    text = re.sub(r'[إأآا]', 'ا', text)
+    text = re.sub(r'ى', 'ي', text)
+    text = re.sub(r'ة', 'ه', text)
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'[^\u0600-\u06FF\s\d\.\،\؛\؟]', '', text)
+    return text.strip()
+
+
+def load_corpus():
+    """Load every document under data/"""
+    texts = []
+    for filepath in sorted(glob.glob('data/*/*.txt')):
+        with open(filepath, 'r', encoding='utf-8') as f:
+            texts.append(f.read())
+    return texts
+
+
+def measure(func, texts, repeats):
+    """Best-of-N wall time for normalizing all texts"""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for text in texts:
+            func(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run_benchmark(name, texts, repeats):
+    megabytes = sum(len(t.encode('utf-8')) for t in texts) / (1024 * 1024)
+
+    # Output must be identical before any timing is trusted
+    mismatches = sum(1 for t in texts if normalize_arabic(t) != normalize_arabic_multipass(t))
+    if mismatches:
+        print(f"❌ {name}: {mismatches} documents differ from the multi-pass output")
+        sys.exit(1)
+
+    old_time = measure(normalize_arabic_multipass, texts, repeats)
+    new_time = measure(normalize_arabic, texts, repeats)
+
+    print(f"\n📊 {name}: {len(texts)} documents, {megabytes:.2f} MB")
+    print(f"   Multi-pass:  {megabytes / old_time:8.1f} MB/s")
+    print(f"   Single-pass: {megabytes / new_time:8.1f} MB/s  ({old_time / new_time:.2f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark Arabic normalization throughput')
+    parser.add_argument('--scale', type=int, default=200, help='Synthetic corpus = data/ repeated N times')
+    parser.add_argument('--repeats', type=int, default=5, help='Timing repetitions (best is reported)')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("⚡ Normalizer Throughput Benchmark")
+    print("=" * 60)
+
+    corpus = load_corpus()
+    if not corpus:
+        print("❌ No documents found under data/")
+        sys.exit(1)
+
+    run_benchmark("data/ corpus (raw)", corpus, args.repeats)
+    run_benchmark("data/ corpus (cleaned)", [clean_document(t) for t in corpus], args.repeats)
+    run_benchmark(f"Synthetic corpus (x{args.scale})", corpus * args.scale, max(1, args.repeats // 2))
+
+    print("\n✅ Outputs identical; benchmark complete")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""
+Scaling benchmark on synthetic corpora
+Generates corpora of growing size from the data/ templates (see
+src/synthetic_corpus.py) and measures, per size: generation time, index size on
+disk, RetrieverSystem load time and peak memory, search latency with and
+without query text, top-1 cluster accuracy, and BM25 build/query time.
+
+Each size is measured in a fresh process so memory numbers don't accumulate.
+
+Usage:
+    python scripts/benchmarks/benchmark_scaling.py --sizes 10000 100000 1000000
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import queue as queue_module
+import shutil
+import sys
+import time
+
+import numpy as np
+
+sys.path.append('src')
+
+from synthetic_corpus import generate_corpus, load_templates, synthetic_queries
+
+RESULTS_PATH = 'index/scaling_benchmark.json'
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process in MB (None where unsupported)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / 1024 / (1024 if sys.platform == 'darwin' else 1)
+
+
+def percentiles_ms(samples):
+    p50, p95 = np.percentile(samples, [50, 95]) * 1000
+    return {'p50_ms': float(p50), 'p95_ms': float(p95)}
+
+
+def measure(corpus_dir, options, queue):
+    """Load the corpus and time queries (runs in a child process)"""
+    from retrieval import RetrieverSystem
+
+    rss_before = peak_rss_mb()
+    start = time.perf_counter()
+    retriever = RetrieverSystem(*(os.path.join(corpus_dir, name) for name in
+                                  ('embeddings.npy', 'corpus_chunks.json', 'corpus_meta.json')))
+    load_seconds = time.perf_counter() - start
+    rss_after = peak_rss_mb()
+
+    templates = load_templates(options['data_dir'])
+    vectors, texts, clusters = synthetic_queries(options['queries'], options['clusters'], templates,
+                                                 options['dim'], options['noise'], options['seed'])
+
+    result = {
+        'load_seconds': load_seconds,
+        'peak_rss_mb': rss_after,
+        'load_rss_mb': rss_after - rss_before if rss_after is not None else None
+    }
+
+    for label, use_text in (('search_semantic', False), ('search_full', True)):
+        samples, correct = [], 0
+        for vector, text, cluster in zip(vectors, texts, clusters):
+            t0 = time.perf_counter()
+            top = retriever.search(vector, k=5, query_text=text if use_text else None)
+            samples.append(time.perf_counter() - t0)
+            correct += top[0]['metadata']['cluster'] == cluster
+        result[label] = {**percentiles_ms(samples), 'top1_cluster_accuracy': correct / len(clusters)}
+
+    if len(retriever.chunks) <= options['bm25_max']:
+        try:
+            from rank_bm25 import BM25Okapi
+        except ImportError:
+            result['bm25'] = None
+        else:
+            t0 = time.perf_counter()
+            bm25 = BM25Okapi([chunk.split() for chunk in retriever.chunks])
+            build_seconds = time.perf_counter() - t0
+            samples = []
+            for text in texts[:50]:
+                t0 = time.perf_counter()
+                bm25.get_scores(text.split())
+                samples.append(time.perf_counter() - t0)
+            result['bm25'] = {'build_seconds': build_seconds, **percentiles_ms(samples)}
+
+    queue.put(result)
+
+
+def run_isolated(ctx, corpus_dir, options, timeout=None):
+    """
+    Run measure() in a fresh process and return its result
+
+    A worker that dies (e.g. killed by the OOM killer) or exceeds `timeout`
+    seconds yields {'error': ...} instead of blocking forever.
+    """
+    queue = ctx.Queue()
+    worker = ctx.Process(target=measure, args=(corpus_dir, options, queue))
+    worker.start()
+    deadline = time.monotonic() + timeout if timeout else None
+
+    try:
+        while True:
+            try:
+                return queue.get(timeout=1.0)
+            except queue_module.Empty:
+                pass
+            if not worker.is_alive():
+                # The result may have been queued just before the process exited
+                try:
+                    return queue.get(timeout=1.0)
+                except queue_module.Empty:
+                    return {'error': f"worker exited with code {worker.exitcode}"
+                                     + (" (killed; out of memory?)" if worker.exitcode == -9 else "")}
+            if deadline and time.monotonic() > deadline:
+                worker.terminate()
+                return {'error': f"timed out after {timeout:.0f}s"}
+    finally:
+        worker.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure retrieval scaling on synthetic corpora')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000],
+                        help='Corpus sizes in chunks (up to 5,000,000)')
+    parser.add_argument('--dim', type=int, default=768)
+    parser.add_argument('--clusters', type=int, default=None, help='Embedding clusters (default: one per template)')
+    parser.add_argument('--noise', type=float, default=0.5)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--bm25-max', type=int, default=200_000, help='Skip BM25 above this many chunks')
+    parser.add_argument('--workdir', default='index/scaling')
+    parser.add_argument('--keep', action='store_true', help='Keep the generated corpora')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--timeout', type=float, default=None,
+                        help='Seconds before a size is reported as failed (default: no limit)')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("📈 Scaling Benchmark")
+    print("=" * 60)
+
+    options = {
+        'data_dir': 'data',
+        'dim': args.dim,
+        'clusters': args.clusters or len(load_templates('data')),
+        'noise': args.noise,
+        'queries': args.queries,
+        'bm25_max': args.bm25_max,
+        'seed': args.seed
+    }
+
+    ctx = multiprocessing.get_context('spawn')
+    results = []
+
+    for n in sorted(args.sizes):
+        corpus_dir = os.path.join(args.workdir, str(n))
+        print(f"\n🔧 {n:,} chunks")
+
+        start = time.perf_counter()
+        stats = generate_corpus(corpus_dir, n, dim=args.dim, n_clusters=options['clusters'],
+                                noise=args.noise, seed=args.seed)
+        stats['generate_seconds'] = time.perf_counter() - start
+        stats['index_mb'] = sum(stats['bytes'].values()) / (1024 * 1024)
+        print(f"   Generated in {stats['generate_seconds']:.1f}s ({stats['index_mb']:.1f} MB on disk)")
+
+        stats.update(run_isolated(ctx, corpus_dir, options, args.timeout))
+        results.append(stats)
+
+        if not args.keep:
+            shutil.rmtree(corpus_dir, ignore_errors=True)
+
+        if 'error' in stats:
+            print(f"   ❌ Failed: {stats['error']}")
+            continue
+
+        full = stats['search_full']
+        print(f"   Load: {stats['load_seconds']:.1f}s, peak RSS {stats['peak_rss_mb'] or 0:.0f} MB")
+        print(f"   Search p50/p95: {full['p50_ms']:.1f}/{full['p95_ms']:.1f} ms "
+              f"(semantic only {stats['search_semantic']['p50_ms']:.1f}/{stats['search_semantic']['p95_ms']:.1f} ms), "
+              f"top-1 cluster {full['top1_cluster_accuracy']:.0%}")
+        if stats.get('bm25'):
+            print(f"   BM25: build {stats['bm25']['build_seconds']:.1f}s, query p50 {stats['bm25']['p50_ms']:.1f} ms")
+
+    if not args.keep and os.path.isdir(args.workdir) and not os.listdir(args.workdir):
+        os.rmdir(args.workdir)
+
+    print(f"\n{'chunks':>10} {'disk MB':>9} {'load s':>8} {'RSS MB':>8} {'p50 ms':>8} {'p95 ms':>8}")
+    print("-" * 60)
+    for r in results:
+        if 'error' in r:
+            print(f"{r['chunks']:>10,} {r['index_mb']:>9.1f}  failed: {r['error']}")
+            continue
+        print(f"{r['chunks']:>10,} {r['index_mb']:>9.1f} {r['load_seconds']:>8.2f} "
+              f"{r['peak_rss_mb'] or 0:>8.0f} {r['search_full']['p50_ms']:>8.2f} {r['search_full']['p95_ms']:>8.2f}")
+
+    with open(RESULTS_PATH, 'w', encoding='utf-8') as f:
+        json.dump({'options': options, 'results': results}, f, indent=2)
+    print(f"\n✅ Results saved to {RESULTS_PATH}")
+
+
+if __name__ == "__main__":
+    main()
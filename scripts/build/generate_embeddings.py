@@ -1,68 +1,146 @@
 """Generate embeddings for all chunks"""
+import sys
+sys.path.append('src')
+
+import argparse
 import json
+import os
+import time
 import numpy as np
 from sentence_transformers import SentenceTransformer
-from tqdm import tqdm
 from sklearn.metrics.pairwise import cosine_similarity
 
-print("=" * 60)
-print("🔢 Generating Embeddings for Corpus")
-print("=" * 60)
+from corpus_encoder import MODEL_NAME, encode_corpus, discard_checkpoint
+from embedding_store import EmbeddingStore, CachedEncoder
+from ingest import iter_embedded_batches
+
+
+def encode_streaming(chunks, model, output_path, batch_size=32):
+    """
+    Encode chunks in corpus order, writing each batch straight into the .npy
+
+    Only one batch of embeddings is in memory at a time. No bucketing,
+    workers or checkpoint: the lowest-memory path, not the fastest.
+
+    Returns:
+        Read-only memmap of the finished file
+    """
+    tmp_path = output_path + '.tmp.npy'
+    array = np.lib.format.open_memmap(tmp_path, mode='w+', dtype='float32',
+                                      shape=(len(chunks), model.get_sentence_embedding_dimension()))
+    row = 0
+    records = ({'chunk': chunk} for chunk in chunks)
+    for batch, embeddings in iter_embedded_batches(model, records, batch_size):
+        array[row:row + len(batch)] = embeddings
+        row += len(batch)
+    array.flush()
+    del array
+
+    os.replace(tmp_path, output_path)
+    discard_checkpoint(output_path)  # an interrupted bucketed run is now superseded
+    return np.load(output_path, mmap_mode='r')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Embed index/corpus_chunks.json')
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Encoder processes, each with its own model copy (1 = in-process)')
+    parser.add_argument('--threads-per-worker', type=int, default=None,
+                        help='torch threads per worker (default: cores / workers)')
+    parser.add_argument('--no-bucketing', action='store_true',
+                        help='Batch chunks in corpus order instead of by token length')
+    parser.add_argument('--no-store', action='store_true',
+                        help='Re-encode every chunk instead of reusing the embedding store')
+    parser.add_argument('--stream', action='store_true',
+                        help='Encode in corpus order one batch at a time (lowest memory; '
+                             'ignores --workers and --no-bucketing)')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("🔢 Generating Embeddings for Corpus")
+    print("=" * 60)
+
+    # Load chunks
+    print("\n📥 Loading chunks...")
+    with open('index/corpus_chunks.json', 'r', encoding='utf-8') as f:
+        chunks = json.load(f)
 
-# Load chunks
-print("\n📥 Loading chunks...")
-with open('index/corpus_chunks.json', 'r', encoding='utf-8') as f:
-    chunks = json.load(f)
+    with open('index/corpus_meta.json', 'r', encoding='utf-8') as f:
+        metadata = json.load(f)
 
-with open('index/corpus_meta.json', 'r', encoding='utf-8') as f:
-    metadata = json.load(f)
+    print(f"✅ Loaded {len(chunks)} chunks")
 
-print(f"✅ Loaded {len(chunks)} chunks")
+    # Load model
+    print("\n📥 Loading embedding model...")
+    model = SentenceTransformer(MODEL_NAME)
+    store = None if args.no_store else EmbeddingStore(MODEL_NAME)
+    print("✅ Model loaded!")
 
-# Load model
-print("\n📥 Loading embedding model...")
-model = SentenceTransformer('paraphrase-multilingual-mpnet-base-v2')
-print("✅ Model loaded!")
+    if args.stream:
+        print("\n🔢 Streaming embeddings batch by batch...")
+        encoder = model if store is None else CachedEncoder(model, store)
+        start = time.time()
+        embeddings = encode_streaming(chunks, encoder, 'index/embeddings.npy', args.batch_size)
+        print(f"\n⚡ {len(chunks) / max(time.time() - start, 1e-9):.1f} chunks/sec")
+        if store is not None:
+            store_stats = store.get_stats()
+            print(f"   Embedding store: {store_stats['hits']} reused, {store_stats['misses']} encoded")
+    else:
+        # Generate embeddings (length-bucketed; original order is restored).
+        # Rows stream into a checkpointed memmap, so an interrupted run resumes.
+        print(f"\n🔢 Generating embeddings with {args.workers} encoder process(es)...")
+        embeddings, stats = encode_corpus(
+            chunks,
+            batch_size=args.batch_size,
+            workers=args.workers,
+            threads_per_worker=args.threads_per_worker,
+            bucketed=not args.no_bucketing,
+            model=model if args.workers <= 1 else None,
+            tokenizer=model.tokenizer,
+            max_seq_length=model.max_seq_length,
+            output_path='index/embeddings.npy',
+            store=store
+        )
 
-# Generate embeddings (with progress bar)
-print("\n🔢 Generating embeddings...")
-embeddings = []
+        if stats['resumed_batches']:
+            print(f"\n↩️  {stats['resumed_batches']} batches were reused from the checkpoint")
+        print(f"\n⚡ {stats['tokens_per_sec']:.0f} tokens/sec, {stats['chunks_per_sec']:.1f} chunks/sec "
+              f"({stats['seconds']:.1f}s, {stats['batches']} batches)")
+        if store is not None:
+            print(f"   Embedding store: {stats['store_hits']} reused, {stats['encoded_chunks']} encoded")
+        print(f"   Padding waste: {stats['padding_waste']:.1%} "
+              f"(corpus order: {stats['unbucketed_padding_waste']:.1%})")
 
-batch_size = 32
-for i in tqdm(range(0, len(chunks), batch_size), desc="Processing batches"):
-    batch = chunks[i:i+batch_size]
-    batch_embeddings = model.encode(batch, show_progress_bar=False)
-    embeddings.append(batch_embeddings)
+    print(f"\n✅ Embeddings shape: {embeddings.shape}")
+    print(f"   Expected: ({len(chunks)}, 768)")
 
-embeddings = np.vstack(embeddings)
+    print("✅ Saved to index/embeddings.npy")
 
-print(f"\n✅ Embeddings shape: {embeddings.shape}")
-print(f"   Expected: ({len(chunks)}, 768)")
+    # Quick test
+    print("\n" + "=" * 60)
+    print("🧪 Quick Test")
+    print("=" * 60)
 
-# Save
-print("\n💾 Saving embeddings...")
-np.save('index/embeddings.npy', embeddings)
-print("✅ Saved to index/embeddings.npy")
+    test_query = "ما هي شروط الحصول على رخصة العمل؟"
+    query_embedding = model.encode([test_query])[0]
 
-# Quick test
-print("\n" + "=" * 60)
-print("🧪 Quick Test")
-print("=" * 60)
+    # Find most similar chunks
+    similarities = cosine_similarity([query_embedding], embeddings)[0]
+    top_5_idx = np.argsort(similarities)[-5:][::-1]
 
-test_query = "ما هي شروط الحصول على رخصة العمل؟"
-query_embedding = model.encode([test_query])[0]
+    print(f"\nTest query: {test_query}")
+    print("\nTop 5 most similar chunks:")
+    for rank, idx in enumerate(top_5_idx, 1):
+        print(f"\n[{rank}] Score: {similarities[idx]:.3f}")
+        print(f"    Category: {metadata[idx]['category']}")
+        print(f"    Text: {chunks[idx][:100]}...")
 
-# Find most similar chunks
-similarities = cosine_similarity([query_embedding], embeddings)[0]
-top_5_idx = np.argsort(similarities)[-5:][::-1]
+    print("\n" + "=" * 60)
+    print("✅ Embeddings generation complete!")
+    print("=" * 60)
 
-print(f"\nTest query: {test_query}")
-print("\nTop 5 most similar chunks:")
-for rank, idx in enumerate(top_5_idx, 1):
-    print(f"\n[{rank}] Score: {similarities[idx]:.3f}")
-    print(f"    Category: {metadata[idx]['category']}")
-    print(f"    Text: {chunks[idx][:100]}...")
 
-print("\n" + "=" * 60)
-print("✅ Embeddings generation complete!")
-print("=" * 60)
+# Guard required: encoder worker processes are spawned and re-import this module
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+"""
+Incremental index rebuild driven by a content-hash manifest.
+
+Only added or changed files are re-chunked and re-embedded; rows of unchanged
+files are copied from the existing artifacts and removed files are dropped.
+Replaces running process_all_documents.py, generate_embeddings.py and
+build_retrieval_system.py from scratch after every change to data/.
+"""
+import sys
+import os
+sys.path.append('src')
+
+import argparse
+import glob
+import json
+import numpy as np
+from pathlib import Path
+
+from chunking import chunk_document
+from corpus_encoder import load_embeddings, discard_checkpoint
+from embedding_store import EmbeddingStore, CachedEncoder
+from index_manifest import (file_sha256, chunking_options, new_manifest, load_manifest,
+                            save_manifest, is_compatible, plan_rebuild)
+
+MODEL_NAME = 'paraphrase-multilingual-mpnet-base-v2'
+
+categories = ['health', 'education', 'business', 'transportation', 'justice', 'housing', 'culture', 'info']
+
+CHUNKS_PATH = 'index/corpus_chunks.json'
+META_PATH = 'index/corpus_meta.json'
+EMBEDDINGS_PATH = 'index/embeddings.npy'
+INDEX_PATH = 'index/faiss.index'
+MANIFEST_PATH = 'index/manifest.json'
+DUPLICATES_PATH = 'index/corpus_duplicates.json'
+
+
+def list_source_files():
+    """Source files in build order: category list, then sorted filenames"""
+    files = []
+    for cat in categories:
+        for filepath in sorted(glob.glob(f'data/{cat}/*.txt')):
+            files.append((cat, filepath))
+    return files
+
+
+def load_existing_artifacts(manifest):
+    """Load current artifacts; None if they don't line up with the manifest"""
+    try:
+        with open(CHUNKS_PATH, 'r', encoding='utf-8') as f:
+            chunks = json.load(f)
+        with open(META_PATH, 'r', encoding='utf-8') as f:
+            metadata = json.load(f)
+        embeddings = load_embeddings(EMBEDDINGS_PATH)
+    except (OSError, ValueError):
+        return None
+
+    rows = manifest['total_rows']
+    if not (len(chunks) == len(metadata) == embeddings.shape[0] == rows):
+        print(f"⚠️ Artifacts ({len(chunks)} chunks, {embeddings.shape[0]} embeddings) "
+              f"don't match manifest ({rows} rows)")
+        return None
+
+    return chunks, metadata, embeddings
+
+
+def write_atomic_json(path, data):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def write_atomic_npy(path, array):
+    tmp_path = path + '.tmp.npy'
+    np.save(tmp_path, array)
+    os.replace(tmp_path, path)
+
+
+def write_faiss_index(embeddings):
+    """Rebuild the flat inner-product index from the (cheap to copy) matrix"""
+    import faiss
+
+    vectors = embeddings.astype('float32').copy()
+    faiss.normalize_L2(vectors)
+    index = faiss.IndexFlatIP(vectors.shape[1])
+    index.add(vectors)
+
+    tmp_path = INDEX_PATH + '.tmp'
+    faiss.write_index(index, tmp_path)
+    os.replace(tmp_path, INDEX_PATH)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Re-chunk and re-embed only changed documents')
+    parser.add_argument('--chunk-size', type=int, default=512)
+    parser.add_argument('--overlap', type=int, default=128)
+    parser.add_argument('--strategy', choices=['chars', 'tokens'], default='chars',
+                        help='Size chunks in characters or in encoder tokens')
+    parser.add_argument('--max-seq-length', type=int, default=128,
+                        help='Encoder window in tokens (tokens strategy)')
+    parser.add_argument('--overlap-tokens', type=int, default=16)
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--full', action='store_true', help='Ignore the manifest and rebuild everything')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("🔁 Incremental Index Rebuild")
+    print("=" * 60)
+
+    Path('index').mkdir(exist_ok=True)
+
+    source_files = list_source_files()
+    current_hashes = {filepath: file_sha256(filepath) for _, filepath in source_files}
+
+    # Incremental builds never deduplicate; a --dedup build (or any other
+    # chunking) doesn't match and triggers a full rebuild
+    chunking = chunking_options(args.chunk_size, args.overlap, args.strategy,
+                                args.max_seq_length, args.overlap_tokens, dedup=False)
+    manifest = None if args.full else load_manifest(MANIFEST_PATH)
+    existing = None
+    if is_compatible(manifest, MODEL_NAME, chunking):
+        existing = load_existing_artifacts(manifest)
+        if existing is None:
+            print("⚠️ Existing artifacts unusable; doing a full rebuild")
+    elif manifest is not None:
+        print("⚠️ Model or chunking settings changed; doing a full rebuild")
+    if existing is None:
+        manifest = None
+
+    plan = plan_rebuild(manifest, current_hashes)
+    print(f"\n📋 Plan: {len(plan['added'])} added, {len(plan['changed'])} changed, "
+          f"{len(plan['removed'])} removed, {len(plan['unchanged'])} unchanged")
+
+    if manifest is not None and not (plan['added'] or plan['changed'] or plan['removed']):
+        print("\n✅ Index is up to date; nothing to do")
+        return
+
+    # Re-chunk added/changed files only
+    to_chunk = set(plan['added']) | set(plan['changed'])
+    new_chunks = {}
+    for cat, filepath in source_files:
+        if filepath in to_chunk:
+            new_chunks[filepath] = chunk_document(filepath, chunk_size=args.chunk_size, overlap=args.overlap,
+                                                  strategy=args.strategy, max_seq_length=args.max_seq_length,
+                                                  overlap_tokens=args.overlap_tokens)
+            print(f"  ✂️  {Path(filepath).name}: {len(new_chunks[filepath])} chunks")
+
+    # Embed only the new chunks
+    texts = [chunk for _, filepath in source_files if filepath in new_chunks for chunk in new_chunks[filepath]]
+    # Files can chunk to nothing (e.g. emptied); slicing this keeps working
+    dim = existing[2].shape[1] if existing is not None else 768
+    new_embeddings = np.zeros((0, dim), dtype='float32')
+    if texts:
+        from sentence_transformers import SentenceTransformer
+        print(f"\n🔢 Embedding {len(texts)} new chunks...")
+        # Unchanged boilerplate inside changed files comes from the store
+        model = CachedEncoder(SentenceTransformer(MODEL_NAME), EmbeddingStore(MODEL_NAME))
+        new_embeddings = model.encode(texts, batch_size=args.batch_size, show_progress_bar=True)
+        stats = model.store.get_stats()
+        print(f"   Embedding store: {stats['hits']} hits, {stats['misses']} encoded")
+
+    # Assemble artifacts in build order from old rows and new rows
+    if existing is not None:
+        old_chunks, old_metadata, old_embeddings = existing
+    all_chunks, metadata, embedding_parts = [], [], []
+    updated = new_manifest(MODEL_NAME, chunking)
+    new_row = 0
+    row = 0
+
+    for cat, filepath in source_files:
+        if filepath in new_chunks:
+            chunks = new_chunks[filepath]
+            embedding_parts.append(new_embeddings[new_row:new_row + len(chunks)])
+            new_row += len(chunks)
+            file_meta = [
+                {'source_file': Path(filepath).name, 'category': cat, 'chunk_id': i,
+                 'chunk_length': len(chunk)}
+                for i, chunk in enumerate(chunks)
+            ]
+        else:
+            entry = manifest['files'][filepath]
+            start, end = entry['start'], entry['start'] + entry['count']
+            chunks = old_chunks[start:end]
+            file_meta = old_metadata[start:end]
+            embedding_parts.append(old_embeddings[start:end])
+
+        all_chunks.extend(chunks)
+        metadata.extend(file_meta)
+        updated['files'][filepath] = {
+            'sha256': current_hashes[filepath],
+            'category': cat,
+            'start': row,
+            'count': len(chunks)
+        }
+        row += len(chunks)
+
+    updated['total_rows'] = row
+    embeddings = np.vstack(embedding_parts).astype('float32') if row else np.zeros((0, dim), dtype='float32')
+
+    # Drop the manifest first and write it last: a crash in between leaves no
+    # manifest, so the next run does a full rebuild instead of trusting stale rows
+    print("\n💾 Writing artifacts...")
+    if os.path.exists(MANIFEST_PATH):
+        os.remove(MANIFEST_PATH)
+    write_atomic_json(CHUNKS_PATH, all_chunks)
+    write_atomic_json(META_PATH, metadata)
+    write_atomic_npy(EMBEDDINGS_PATH, embeddings)
+    discard_checkpoint(EMBEDDINGS_PATH)  # a crashed generate_embeddings run is now superseded
+    write_faiss_index(embeddings)
+    if os.path.exists(DUPLICATES_PATH):
+        # Row mapping from an earlier deduplicated build no longer applies
+        os.remove(DUPLICATES_PATH)
+    save_manifest(MANIFEST_PATH, updated)
+
+    print(f"\n✅ Index rebuilt: {row} chunks from {len(source_files)} documents "
+          f"({len(texts)} chunks re-embedded)")
+
+
+if __name__ == "__main__":
+    main()
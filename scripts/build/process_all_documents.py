@@ -1,66 +1,272 @@
 """Process all documents into chunks"""
 import sys
+import os
 from pathlib import Path
 sys.path.append('src')
 
-from src.chunking import chunk_document
+from chunking import chunk_document, get_tokenizer, truncation_report
+from dedup import MinHashDeduplicator, dedup_report
+from ingest import iter_chunk_records, JsonArrayWriter
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+import argparse
 import glob
 import json
 
-# Create index directory
-Path('index').mkdir(exist_ok=True)
+categories = ['health', 'education', 'business', 'transportation', 'justice', 'housing', 'culture', 'info']
 
-# Process all documents
-all_chunks = []
-metadata = []
 
-categories = ['health', 'education', 'business', 'transportation', 'justice', 'housing', 'culture', 'info']
+def process_file(task):
+    """Chunk one file (runs in a worker process when --workers > 1)"""
+    cat, filepath, options = task
+    try:
+        chunks = chunk_document(filepath, **options)
+        return {'category': cat, 'filepath': filepath, 'chunks': chunks, 'error': None, 'worker': os.getpid()}
+    except Exception as e:
+        return {'category': cat, 'filepath': filepath, 'chunks': [], 'error': str(e), 'worker': os.getpid()}
+
+
+def list_tasks(options):
+    """All (category, file) tasks in a fixed order so output is deterministic"""
+    tasks = []
+    for cat in categories:
+        for filepath in sorted(glob.glob(f'data/{cat}/*.txt')):
+            tasks.append((cat, filepath, options))
+    return tasks
+
+
+def iter_results(tasks, workers):
+    """Yield per-file results in task order, serially or from a process pool"""
+    if workers <= 1:
+        for task in tasks:
+            yield process_file(task)
+        return
+
+    # map() returns results in submission order regardless of completion order
+    chunksize = max(1, len(tasks) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(process_file, tasks, chunksize=chunksize)
+
+
+def deduplicate(all_chunks, metadata, threshold):
+    """
+    Keep one canonical chunk per near-duplicate cluster
+
+    Returns:
+        (canonical chunks, their metadata, duplicate records, report)
+    """
+    result = MinHashDeduplicator(threshold=threshold).find_duplicates(all_chunks)
+    canonical = result['canonical']
+    report = dedup_report(canonical, [m['category'] for m in metadata])
+
+    # Row of each canonical chunk in the deduplicated output
+    new_row = {}
+    kept_chunks, kept_meta = [], []
+    for i, c in enumerate(canonical):
+        if c == i:
+            new_row[i] = len(kept_chunks)
+            kept_chunks.append(all_chunks[i])
+            kept_meta.append(dict(metadata[i]))
+
+    duplicates = []
+    for i, c in enumerate(canonical):
+        if c == i:
+            continue
+        canonical_meta = kept_meta[new_row[c]]
+        duplicates.append({
+            'source_file': metadata[i]['source_file'],
+            'category': metadata[i]['category'],
+            'chunk_id': metadata[i]['chunk_id'],
+            'duplicate_of': new_row[c],
+            'similarity': round(result['similarity'][i], 4)
+        })
+        sources = canonical_meta.setdefault('duplicate_sources', [])
+        if metadata[i]['source_file'] not in sources and metadata[i]['source_file'] != canonical_meta['source_file']:
+            sources.append(metadata[i]['source_file'])
+
+    return kept_chunks, kept_meta, duplicates, report
+
+
+def process_streaming(options):
+    """
+    Chunk data/ one document at a time, writing both JSON files as it goes
+
+    Memory stays flat regardless of corpus size; the output is identical to
+    a serial run without --dedup.
+    """
+    per_category = Counter()
+    documents = set()
+
+    with JsonArrayWriter('index/corpus_chunks.json') as chunks_out, \
+         JsonArrayWriter('index/corpus_meta.json') as meta_out:
+        for record in iter_chunk_records('data', categories=categories, **options):
+            chunks_out.append(record['chunk'])
+            meta_out.append({
+                'source_file': record['source_file'],
+                'category': record['category'],
+                'chunk_id': record['chunk_id'],
+                'chunk_length': record['chunk_length']
+            })
+            per_category[record['category']] += 1
+            documents.add(record['filepath'])
+
+    print(f"Total documents: {len(documents)}")
+    print(f"Total chunks: {chunks_out.count}")
+    print(f"\nChunks per category:")
+    for cat in categories:
+        print(f"  {cat}: {per_category[cat]}")
+
+    if os.path.exists('index/corpus_duplicates.json'):
+        # Stale mapping from an earlier deduplicated build
+        os.remove('index/corpus_duplicates.json')
+
+    print("\n✅ Saved:")
+    print("  - index/corpus_chunks.json")
+    print("  - index/corpus_meta.json")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Chunk all documents under data/')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Worker processes (1 = serial; output is identical either way)')
+    parser.add_argument('--chunk-size', type=int, default=512)
+    parser.add_argument('--overlap', type=int, default=128)
+    parser.add_argument('--strategy', choices=['chars', 'tokens'], default='chars',
+                        help='Size chunks in characters or in encoder tokens')
+    parser.add_argument('--max-seq-length', type=int, default=128,
+                        help='Encoder window in tokens (tokens strategy)')
+    parser.add_argument('--overlap-tokens', type=int, default=16)
+    parser.add_argument('--dedup', action='store_true',
+                        help='Index one canonical chunk per near-duplicate cluster (MinHash/LSH)')
+    parser.add_argument('--dedup-threshold', type=float, default=0.9,
+                        help='Shingle Jaccard similarity above which chunks are duplicates')
+    parser.add_argument('--stream', action='store_true',
+                        help='Write chunks as they are produced instead of holding the corpus in memory '
+                             '(serial; no --dedup or truncation report)')
+    args = parser.parse_args()
+    if args.stream and (args.dedup or args.workers > 1):
+        parser.error('--stream runs serially and cannot be combined with --dedup or --workers')
+
+    # Create index directory
+    Path('index').mkdir(exist_ok=True)
+
+    # Process all documents
+    all_chunks = []
+    metadata = []
+    errors = []
+    files_per_worker = Counter()
+
+    options = {
+        'chunk_size': args.chunk_size,
+        'overlap': args.overlap,
+        'strategy': args.strategy,
+        'max_seq_length': args.max_seq_length,
+        'overlap_tokens': args.overlap_tokens
+    }
+    if args.stream:
+        print("Streaming documents into index/ ...")
+        print("=" * 60)
+        process_streaming(options)
+        return
+
+    tasks = list_tasks(options)
+
+    print(f"Processing {len(tasks)} documents with {args.workers} worker(s)...")
+    print("=" * 60)
+
+    current_cat = None
+    for result in iter_results(tasks, args.workers):
+        cat = result['category']
+        filepath = result['filepath']
+        files_per_worker[result['worker']] += 1
+
+        if cat != current_cat:
+            current_cat = cat
+            print(f"\n📁 {cat}: {sum(1 for t in tasks if t[0] == cat)} files")
+
+        if result['error']:
+            errors.append((filepath, result['error']))
+            print(f"  ❌ {Path(filepath).name}: {result['error']}")
+            continue
+
+        chunks = result['chunks']
+        for i, chunk in enumerate(chunks):
+            all_chunks.append(chunk)
+            metadata.append({
+                'source_file': Path(filepath).name,
+                'category': cat,
+                'chunk_id': i,
+                'chunk_length': len(chunk)
+            })
+
+        print(f"  ✅ {Path(filepath).name}: {len(chunks)} chunks")
+
+    print("\n" + "=" * 60)
+    print("📊 SUMMARY")
+    print("=" * 60)
+    print(f"Total documents: {len(set((m['category'], m['source_file']) for m in metadata))}")
+    print(f"Total chunks: {len(all_chunks)}")
+    print(f"\nChunks per category:")
+    for cat in categories:
+        count = len([m for m in metadata if m['category'] == cat])
+        print(f"  {cat}: {count}")
+
+    # How much of each chunk the encoder will actually see
+    try:
+        report = truncation_report(all_chunks, get_tokenizer(), args.max_seq_length)
+        print(f"\nEncoder truncation ({args.max_seq_length} tokens, strategy={args.strategy}):")
+        print(f"  Chunks truncated: {report['truncated_chunks']}/{report['chunks']}")
+        print(f"  Tokens truncated: {report['truncated_tokens']}/{report['tokens']} "
+              f"({report['truncated_fraction']:.1%})")
+    except (ImportError, OSError) as e:
+        print(f"\n⚠️ Tokenizer unavailable, skipping truncation report: {e}")
+
+    duplicates = None
+    if args.dedup:
+        all_chunks, metadata, duplicates, report = deduplicate(all_chunks, metadata, args.dedup_threshold)
+        print(f"\nNear-duplicate chunks (Jaccard >= {args.dedup_threshold}):")
+        print(f"  Duplicates: {report['duplicates']}/{report['chunks']} ({report['dedup_ratio']:.1%}), "
+              f"{report['clusters_with_duplicates']} clusters, largest {report['largest_cluster']}")
+        print(f"  Chunks to embed and index: {report['unique']}")
+        for cat in categories:
+            if cat in report['per_category']:
+                stats = report['per_category'][cat]
+                print(f"  {cat}: {stats['duplicates']}/{stats['chunks']} ({stats['dedup_ratio']:.1%})")
+
+    if args.workers > 1:
+        print(f"\nFiles per worker:")
+        for worker, count in sorted(files_per_worker.items()):
+            print(f"  pid {worker}: {count}")
+
+    if errors:
+        print(f"\n❌ {len(errors)} file(s) failed:")
+        for filepath, error in errors:
+            print(f"  {filepath}: {error}")
+
+    # Save
+    print("\n💾 Saving to index/ directory...")
+    with open('index/corpus_chunks.json', 'w', encoding='utf-8') as f:
+        json.dump(all_chunks, f, ensure_ascii=False, indent=2)
+
+    with open('index/corpus_meta.json', 'w', encoding='utf-8') as f:
+        json.dump(metadata, f, ensure_ascii=False, indent=2)
+
+    if duplicates is not None:
+        with open('index/corpus_duplicates.json', 'w', encoding='utf-8') as f:
+            json.dump(duplicates, f, ensure_ascii=False, indent=2)
+    elif os.path.exists('index/corpus_duplicates.json'):
+        # Stale mapping from an earlier deduplicated build
+        os.remove('index/corpus_duplicates.json')
+
+    print("✅ Saved:")
+    print("  - index/corpus_chunks.json")
+    print("  - index/corpus_meta.json")
+    if duplicates is not None:
+        print("  - index/corpus_duplicates.json")
+    print("\n" + "=" * 60)
+    print("✅ ALL DOCUMENTS PROCESSED!")
+    print("=" * 60)
+
 
-print("Processing documents...")
-print("=" * 60)
-
-for cat in categories:
-    files = glob.glob(f'data/{cat}/*.txt')
-    print(f"\n📁 {cat}: {len(files)} files")
-    
-    for filepath in files:
-        try:
-            chunks = chunk_document(filepath, chunk_size=512, overlap=128)
-            
-            for i, chunk in enumerate(chunks):
-                all_chunks.append(chunk)
-                metadata.append({
-                    'source_file': filepath,
-                    'category': cat,
-                    'chunk_id': i,
-                    'chunk_length': len(chunk)
-                })
-            
-            print(f"  ✅ {Path(filepath).name}: {len(chunks)} chunks")
-        except Exception as e:
-            print(f"  ❌ {Path(filepath).name}: {e}")
-
-print("\n" + "=" * 60)
-print("📊 SUMMARY")
-print("=" * 60)
-print(f"Total documents: {len(set(m['source_file'] for m in metadata))}")
-print(f"Total chunks: {len(all_chunks)}")
-print(f"\nChunks per category:")
-for cat in categories:
-    count = len([m for m in metadata if m['category'] == cat])
-    print(f"  {cat}: {count}")
-
-# Save
-print("\n💾 Saving to index/ directory...")
-with open('index/corpus_chunks.json', 'w', encoding='utf-8') as f:
-    json.dump(all_chunks, f, ensure_ascii=False, indent=2)
-
-with open('index/corpus_meta.json', 'w', encoding='utf-8') as f:
-    json.dump(metadata, f, ensure_ascii=False, indent=2)
-
-print("✅ Saved:")
-print("  - index/corpus_chunks.json")
-print("  - index/corpus_meta.json")
-print("\n" + "=" * 60)
-print("✅ ALL DOCUMENTS PROCESSED!")
-print("=" * 60)
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""
+Publish the artifacts in index/ as a new versioned snapshot.
+
+Running apps pick the new snapshot up on their next poll of
+index/snapshots/CURRENT; no restart is needed.
+"""
+import sys
+sys.path.append('src')
+
+import argparse
+
+from index_snapshots import SNAPSHOT_ROOT, publish_snapshot, prune_snapshots
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Publish index/ artifacts as the current snapshot')
+    parser.add_argument('--source-dir', default='index')
+    parser.add_argument('--root', default=SNAPSHOT_ROOT)
+    parser.add_argument('--version', default=None, help='Snapshot name (default: UTC timestamp with microseconds)')
+    parser.add_argument('--keep', type=int, default=3, help='Snapshots to keep after publishing')
+    args = parser.parse_args()
+
+    try:
+        version = publish_snapshot(args.source_dir, args.root, args.version)
+    except ValueError as e:
+        print(f"❌ Not published, artifacts in {args.source_dir} are inconsistent: {e}")
+        sys.exit(1)
+    print(f"✅ Published snapshot {version}")
+
+    removed = prune_snapshots(args.root, keep=args.keep)
+    if removed:
+        print(f"🗑️  Pruned {len(removed)} old snapshot(s): {', '.join(removed)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -13,6 +13,7 @@ from sentence_transformers import SentenceTransformer
 import faiss
 from sklearn.metrics.pairwise import cosine_similarity
 from translator import TranslationService
+from embedding_store import EmbeddingStore, CachedEncoder
 
 
 def test_comprehensive():
@@ -32,7 +33,8 @@ def test_comprehensive():
     with open('index/corpus_meta.json', 'r', encoding='utf-8') as f:
         metadata = json.load(f)
     
-    model = SentenceTransformer('paraphrase-multilingual-mpnet-base-v2')
+    model = CachedEncoder(SentenceTransformer('paraphrase-multilingual-mpnet-base-v2'),
+                          EmbeddingStore('paraphrase-multilingual-mpnet-base-v2'))
     translator = TranslationService()
     
     # Load formal queries (50)
@@ -0,0 +1,131 @@
+"""
+Checkpointed corpus encoding tests
+An interrupted encode_corpus run resumes from its checkpoint and produces the
+same embeddings as an uninterrupted one; partial files are never loaded
+"""
+
+import sys
+import os
+import tempfile
+sys.path.insert(0, 'src')
+
+import numpy as np
+from corpus_encoder import (encode_corpus, load_embeddings, discard_checkpoint,
+                            partial_path, checkpoint_path, IncompleteEmbeddingsError)
+
+TEXTS = [f"chunk {i} " + "word " * (i % 7) for i in range(40)]
+
+
+class FakeTokenizer:
+    """One token per whitespace-separated word"""
+
+    def __call__(self, texts, add_special_tokens=True, truncation=True, max_length=128):
+        return {'input_ids': [list(range(min(len(t.split()) + 2, max_length))) for t in texts]}
+
+
+class FakeModel:
+    """Deterministic vectors; raises once `fail_after` batches have been encoded"""
+
+    tokenizer = FakeTokenizer()
+    max_seq_length = 128
+
+    def __init__(self, fail_after=None):
+        self.fail_after = fail_after
+        self.encoded = []
+
+    def encode(self, texts, batch_size=32, show_progress_bar=False):
+        if self.fail_after is not None and len(self.encoded) >= self.fail_after:
+            raise KeyboardInterrupt("simulated interruption")
+        self.encoded.append(list(texts))
+        return np.array([[len(t), sum(map(ord, t)) % 101, 1.0] for t in texts], dtype='float32')
+
+
+def run(output_path, model, **kwargs):
+    return encode_corpus(TEXTS, model=model, batch_size=8, progress=False,
+                         output_path=output_path, checkpoint_every=1, **kwargs)
+
+
+def test_resume_after_interruption():
+    """Only unfinished batches are encoded on the second run"""
+    expected, _ = encode_corpus(TEXTS, model=FakeModel(), batch_size=8, progress=False)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, 'embeddings.npy')
+
+        try:
+            run(output, FakeModel(fail_after=2))
+            raise AssertionError("interruption did not propagate")
+        except KeyboardInterrupt:
+            pass
+
+        assert not os.path.exists(output)
+        assert os.path.exists(partial_path(output)) and os.path.exists(checkpoint_path(output))
+
+        model = FakeModel()
+        embeddings, stats = run(output, model)
+
+        assert stats['batches'] == 5
+        assert stats['resumed_batches'] == 2
+        assert len(model.encoded) == 3
+        assert stats['encoded_chunks'] == 24
+        np.testing.assert_array_equal(np.asarray(embeddings), expected)
+
+        assert not os.path.exists(partial_path(output)) and not os.path.exists(checkpoint_path(output))
+        np.testing.assert_array_equal(load_embeddings(output, expected_rows=len(TEXTS)), expected)
+    print("✅ Interrupted run resumed from checkpoint (2/5 batches reused)")
+
+
+def test_incomplete_artifacts_refused():
+    """load_embeddings rejects partial files, pending checkpoints and row mismatches"""
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, 'embeddings.npy')
+        np.save(output, np.zeros((3, 2), dtype='float32'))
+
+        try:
+            run(output, FakeModel(fail_after=1))
+        except KeyboardInterrupt:
+            pass
+
+        for path, rows in [(output, None), (partial_path(output), None)]:
+            try:
+                load_embeddings(path, expected_rows=rows)
+                raise AssertionError(f"{path} was loaded mid-rebuild")
+            except IncompleteEmbeddingsError:
+                pass
+
+        discard_checkpoint(output)
+        assert load_embeddings(output).shape == (3, 2)
+        try:
+            load_embeddings(output, expected_rows=4)
+            raise AssertionError("row mismatch was accepted")
+        except IncompleteEmbeddingsError:
+            pass
+    print("✅ Partial and mid-rebuild embedding files refused")
+
+
+def test_changed_settings_start_over():
+    """A checkpoint for a different batch plan is not reused"""
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, 'embeddings.npy')
+        try:
+            run(output, FakeModel(fail_after=2))
+        except KeyboardInterrupt:
+            pass
+
+        model = FakeModel()
+        embeddings, stats = encode_corpus(TEXTS, model=model, batch_size=10, progress=False,
+                                          output_path=output, checkpoint_every=1)
+        assert stats['resumed_batches'] == 0
+        assert sum(len(b) for b in model.encoded) == len(TEXTS)
+        assert np.asarray(embeddings).shape == (len(TEXTS), 3)
+    print("✅ Checkpoint for different settings ignored")
+
+
+if __name__ == "__main__":
+    print("="*80)
+    print("CORPUS ENCODER CHECKPOINT TESTS")
+    print("="*80)
+    test_resume_after_interruption()
+    test_incomplete_artifacts_refused()
+    test_changed_settings_start_over()
+    print("\n✅ ALL CORPUS ENCODER CHECKPOINT TESTS PASSED")
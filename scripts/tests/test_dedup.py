@@ -0,0 +1,76 @@
+"""
+Near-duplicate dedup tests
+MinHash/LSH clustering: exact and near duplicates collapse onto the earliest
+chunk, distinct chunks are kept, and the report counts them
+"""
+
+import sys
+sys.path.insert(0, 'src')
+
+from dedup import MinHashDeduplicator, dedup_report, shingles, jaccard, choose_bands
+
+BASE = ("يجب على المتقدم تقديم نسخة من البطاقة الشخصية وشهادة الميلاد وصورة شخصية حديثة "
+        "إلى مركز الخدمة خلال ساعات العمل الرسمية من الأحد إلى الخميس")
+NEAR = BASE.replace("حديثة", "ملونة")
+OTHER = ("للحصول على رخصة تجارية يجب تسجيل الاسم التجاري أولا ثم تقديم عقد الإيجار "
+         "مع موافقة البلدية وسداد الرسوم المقررة عبر البوابة الإلكترونية")
+
+
+def test_duplicates_collapse_onto_earliest():
+    """Exact and near copies point at the first occurrence; distinct text stays canonical"""
+    texts = [OTHER, BASE, "  " + BASE.replace(" ", "\n  "), NEAR, OTHER]
+    result = MinHashDeduplicator(threshold=0.7).find_duplicates(texts)
+
+    assert result['canonical'] == [0, 1, 1, 1, 0]
+    assert result['similarity'][2] == 1.0, "whitespace differences are not differences"
+    assert 0.7 <= result['similarity'][3] < 1.0
+    print(f"✅ Duplicates collapsed (near-duplicate similarity {result['similarity'][3]:.2f})")
+
+
+def test_threshold_respected():
+    """A pair below the threshold is kept apart even if LSH buckets them together"""
+    similarity = jaccard(shingles(BASE), shingles(NEAR))
+    strict = MinHashDeduplicator(threshold=min(0.99, similarity + 0.05))
+    assert strict.find_duplicates([BASE, NEAR])['canonical'] == [0, 1]
+
+    loose = MinHashDeduplicator(threshold=max(0.1, similarity - 0.05))
+    assert loose.find_duplicates([BASE, NEAR])['canonical'] == [0, 0]
+    print("✅ Threshold respected on both sides")
+
+
+def test_deterministic_and_edge_cases():
+    """Same input, same clusters; empty and short texts don't break clustering"""
+    texts = [BASE, "", NEAR, "قصير", "", OTHER]
+    first = MinHashDeduplicator(threshold=0.7).find_duplicates(texts)
+    second = MinHashDeduplicator(threshold=0.7).find_duplicates(texts)
+    assert first == second
+    assert first['canonical'][1] == 1 and first['canonical'][4] == 1
+    assert first['canonical'][3] == 3 and first['canonical'][5] == 5
+    assert MinHashDeduplicator().find_duplicates([]) == {'canonical': [], 'similarity': []}
+
+    bands, rows = choose_bands(128, 0.8)
+    assert bands * rows == 128
+    print("✅ Deterministic clustering; empty and short texts handled")
+
+
+def test_report():
+    """Counts overall and per category"""
+    report = dedup_report([0, 1, 1, 1, 0, 5], ['a', 'a', 'b', 'b', 'b', 'b'])
+    assert report['chunks'] == 6 and report['unique'] == 3 and report['duplicates'] == 3
+    assert report['dedup_ratio'] == 0.5
+    assert report['clusters_with_duplicates'] == 2 and report['largest_cluster'] == 3
+    assert report['per_category']['a'] == {'chunks': 2, 'duplicates': 0, 'dedup_ratio': 0.0}
+    assert report['per_category']['b']['duplicates'] == 3
+    assert dedup_report([])['dedup_ratio'] == 0.0
+    print("✅ Dedup report counts")
+
+
+if __name__ == "__main__":
+    print("="*80)
+    print("DEDUP TESTS")
+    print("="*80)
+    test_duplicates_collapse_onto_earliest()
+    test_threshold_respected()
+    test_deterministic_and_edge_cases()
+    test_report()
+    print("\n✅ ALL DEDUP TESTS PASSED")
@@ -0,0 +1,99 @@
+"""
+DocumentStore tests
+LRU eviction under the byte budget, hit/miss accounting and stale-file reloads
+"""
+
+import sys
+import os
+import tempfile
+sys.path.insert(0, 'src')
+
+from pathlib import Path
+from document_store import DocumentStore
+
+
+def make_corpus(root, sizes):
+    """Write data/health/doc{i}.txt files of the given lengths"""
+    (Path(root) / 'health').mkdir(parents=True)
+    for i, size in enumerate(sizes):
+        (Path(root) / 'health' / f'doc{i}.txt').write_text('ا' * size, encoding='utf-8')
+
+
+def test_lru_eviction():
+    """The least recently used document goes first once the budget is exceeded"""
+    with tempfile.TemporaryDirectory() as root:
+        make_corpus(root, [1000, 1000, 1000])
+        one_doc = sys.getsizeof('ا' * 1000)
+        store = DocumentStore(root, max_bytes=2 * one_doc)
+
+        store.get('health', 'doc0.txt')
+        store.get('health', 'doc1.txt')
+        store.get('health', 'doc0.txt')   # doc0 is now most recently used
+        store.get('health', 'doc2.txt')   # evicts doc1
+
+        stats = store.get_stats()
+        assert stats['entries'] == 2
+        assert stats['evictions'] == 1
+        assert stats['bytes'] <= store.max_bytes
+
+        store.get('health', 'doc0.txt')
+        assert store.get_stats()['hits'] == 2, "doc0 should still be cached"
+        store.get('health', 'doc1.txt')
+        assert store.get_stats()['misses'] == 4, "doc1 should have been evicted"
+    print("✅ LRU eviction keeps the most recently used documents")
+
+
+def test_oversized_document_not_cached():
+    """A document larger than the whole budget is returned but not cached"""
+    with tempfile.TemporaryDirectory() as root:
+        make_corpus(root, [5000])
+        store = DocumentStore(root, max_bytes=1024)
+
+        assert len(store.get('health', 'doc0.txt')) == 5000
+        assert store.get_stats()['entries'] == 0
+    print("✅ Oversized document bypasses the cache")
+
+
+def test_modified_file_reloaded_and_translation_dropped():
+    """Editing a file invalidates both its text and its cached translations"""
+    with tempfile.TemporaryDirectory() as root:
+        make_corpus(root, [100])
+        store = DocumentStore(root)
+        path = Path(root) / 'health' / 'doc0.txt'
+
+        store.get('health', 'doc0.txt')
+        store.put_translation('health', 'doc0.txt', 'en', 'translated')
+        assert store.get_translation('health', 'doc0.txt', 'en') == 'translated'
+
+        path.write_text('ب' * 200, encoding='utf-8')
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+        assert store.get('health', 'doc0.txt') == 'ب' * 200
+        assert store.get_translation('health', 'doc0.txt', 'en') is None
+    print("✅ Edited file re-read and stale translation dropped")
+
+
+def test_preload_respects_budget():
+    """preload reads every file but stays within max_bytes"""
+    with tempfile.TemporaryDirectory() as root:
+        make_corpus(root, [1000] * 5)
+        store = DocumentStore(root, max_bytes=3 * sys.getsizeof('ا' * 1000))
+
+        assert store.preload() == 5
+        stats = store.get_stats()
+        assert stats['entries'] == 3
+        assert stats['evictions'] == 2
+        assert stats['bytes'] <= store.max_bytes
+    print("✅ Preload stays within the memory budget")
+
+
+if __name__ == "__main__":
+    print("="*80)
+    print("DOCUMENT STORE TESTS")
+    print("="*80)
+    test_lru_eviction()
+    test_oversized_document_not_cached()
+    test_modified_file_reloaded_and_translation_dropped()
+    test_preload_respects_budget()
+    print("\n✅ ALL DOCUMENT STORE TESTS PASSED")
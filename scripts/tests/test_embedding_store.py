@@ -0,0 +1,117 @@
+"""
+Embedding store tests
+SQLite-backed vector cache and the CachedEncoder wrapper, with a fake model
+"""
+
+import sys
+import os
+import tempfile
+sys.path.insert(0, 'src')
+
+import numpy as np
+from embedding_store import EmbeddingStore, CachedEncoder, text_key
+
+
+class FakeModel:
+    """Vector [len(text), normalized flag]; records every text it encodes"""
+
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, texts, normalize_embeddings=False, **kwargs):
+        self.encoded.extend(texts)
+        return np.array([[len(t), float(normalize_embeddings)] for t in texts], dtype='float32')
+
+    def get_sentence_embedding_dimension(self):
+        return 2
+
+
+def test_store_round_trip():
+    """Vectors come back per model, keyed on whitespace-normalized text"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'store.sqlite')
+        store = EmbeddingStore('model-a', path)
+
+        store.put_many(['hello  world', 'other'], np.array([[1, 2], [3, 4]]))
+        vectors, missing = store.get_many([' hello world\n', 'unknown', 'other'])
+        assert missing == [1]
+        np.testing.assert_array_equal(vectors[0], [1, 2])
+        np.testing.assert_array_equal(vectors[2], [3, 4])
+        assert text_key('a  b') == text_key('a b')
+
+        # Another model never sees these vectors; another process/connection does
+        assert EmbeddingStore('model-b', path).get_many(['other'])[1] == [0]
+        assert EmbeddingStore('model-a', path).get_many(['other'])[1] == []
+
+        stats = store.get_stats()
+        assert stats['entries'] == 2 and stats['hits'] == 2 and stats['misses'] == 1
+    print("✅ Store round trip, model isolation and whitespace-insensitive keys")
+
+
+def test_cached_encoder_encodes_only_misses():
+    """Repeated and already-stored texts never reach the model"""
+    with tempfile.TemporaryDirectory() as tmp:
+        model = FakeModel()
+        encoder = CachedEncoder(model, EmbeddingStore('m', os.path.join(tmp, 'store.sqlite')))
+
+        first = encoder.encode(['aa', 'bbb', 'aa'], batch_size=8, show_progress_bar=False)
+        assert model.encoded == ['aa', 'bbb']
+        assert first.shape == (3, 2) and list(first[:, 0]) == [2, 3, 2]
+
+        second = encoder.encode(['bbb', 'cccc'])
+        assert model.encoded == ['aa', 'bbb', 'cccc']
+        assert list(second[:, 0]) == [3, 4]
+
+        single = encoder.encode('aa')
+        assert single.shape == (2,) and single[0] == 2
+        assert encoder.get_sentence_embedding_dimension() == 2
+    print("✅ CachedEncoder sends only misses to the model")
+
+
+def test_encode_options_keyed_separately():
+    """Normalized vectors are cached apart from raw ones; unknown options are refused"""
+    with tempfile.TemporaryDirectory() as tmp:
+        model = FakeModel()
+        encoder = CachedEncoder(model, EmbeddingStore('m', os.path.join(tmp, 'store.sqlite')))
+
+        raw = encoder.encode(['text'])
+        normalized = encoder.encode(['text'], normalize_embeddings=True)
+        assert raw[0, 1] == 0.0 and normalized[0, 1] == 1.0
+        assert model.encoded == ['text', 'text']
+
+        encoder.encode(['text'], normalize_embeddings=True)
+        assert len(model.encoded) == 2
+
+        try:
+            encoder.encode(['text'], output_value='token_embeddings')
+            raise AssertionError("unsupported encode option was accepted")
+        except TypeError:
+            pass
+    print("✅ Encode options keyed separately, unsupported options refused")
+
+
+def test_lookup_only_mode():
+    """persist_misses=False reads the store but never writes to it"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'store.sqlite')
+        CachedEncoder(FakeModel(), EmbeddingStore('m', path)).encode(['known'])
+
+        model = FakeModel()
+        encoder = CachedEncoder(model, EmbeddingStore('m', path), persist_misses=False)
+        encoder.encode(['known', 'private query'])
+        encoder.encode(['private query'])
+
+        assert model.encoded == ['private query', 'private query']
+        assert EmbeddingStore('m', path).get_stats()['entries'] == 1
+    print("✅ Lookup-only encoder never persists queries")
+
+
+if __name__ == "__main__":
+    print("="*80)
+    print("EMBEDDING STORE TESTS")
+    print("="*80)
+    test_store_round_trip()
+    test_cached_encoder_encodes_only_misses()
+    test_encode_options_keyed_separately()
+    test_lookup_only_mode()
+    print("\n✅ ALL EMBEDDING STORE TESTS PASSED")
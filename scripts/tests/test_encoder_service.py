@@ -0,0 +1,151 @@
+"""
+BatchingEncoder tests
+Flushing on batch size and on the wait deadline, with a fake model
+"""
+
+import sys
+import threading
+import time
+sys.path.insert(0, 'src')
+
+import numpy as np
+from encoder_service import BatchingEncoder
+
+
+class FakeModel:
+    """Records each forward pass; a text's vector is [len(text), 0]"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = []
+
+    def encode(self, texts, **kwargs):
+        self.calls.append(list(texts))
+        time.sleep(self.delay)
+        return np.array([[len(t), 0.0] for t in texts], dtype='float32')
+
+    def get_sentence_embedding_dimension(self):
+        return 2
+
+
+def test_flush_on_batch_size():
+    """A full batch is encoded without waiting for the deadline"""
+    model = FakeModel()
+    encoder = BatchingEncoder(model, max_batch_size=4, max_wait_ms=5000)
+    try:
+        start = time.monotonic()
+        futures = [encoder.submit('x' * (i + 1)) for i in range(4)]
+        vectors = [f.result(timeout=2) for f in futures]
+        elapsed = time.monotonic() - start
+
+        assert elapsed < 2, f"waited {elapsed:.2f}s for a full batch"
+        assert model.calls == [['x', 'xx', 'xxx', 'xxxx']]
+        assert [v[0] for v in vectors] == [1, 2, 3, 4]
+    finally:
+        encoder.close()
+    print("✅ Full batch flushed immediately")
+
+
+def test_flush_on_wait_deadline():
+    """A lone request is encoded once max_wait_ms passes"""
+    model = FakeModel()
+    encoder = BatchingEncoder(model, max_batch_size=32, max_wait_ms=50)
+    try:
+        start = time.monotonic()
+        vector = encoder.encode('hello', timeout=2)
+        elapsed = time.monotonic() - start
+
+        assert vector[0] == 5
+        assert 0.04 <= elapsed < 1, f"lone request took {elapsed:.3f}s"
+        assert model.calls == [['hello']]
+    finally:
+        encoder.close()
+    print(f"✅ Lone request flushed after {elapsed * 1000:.0f}ms")
+
+
+def test_concurrent_requests_share_batches():
+    """Concurrent callers are grouped, and each gets its own vector back"""
+    model = FakeModel(delay=0.02)
+    encoder = BatchingEncoder(model, max_batch_size=8, max_wait_ms=20)
+    results = {}
+
+    def worker(i):
+        results[i] = encoder.encode('y' * i, timeout=5)
+
+    try:
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(1, 33)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        stats = encoder.get_stats()
+        assert all(results[i][0] == i for i in range(1, 33))
+        assert stats['total_requests'] == 32
+        assert stats['total_batches'] < 32
+        assert max(len(call) for call in model.calls) <= 8
+    finally:
+        encoder.close()
+    print(f"✅ 32 requests in {stats['total_batches']} batches (avg {stats['avg_batch_size']:.1f})")
+
+
+def test_list_input_and_errors():
+    """encode(list) returns a matrix; model errors reach every caller"""
+    model = FakeModel()
+    encoder = BatchingEncoder(model, max_batch_size=8, max_wait_ms=5)
+    try:
+        matrix = encoder.encode(['a', 'bb', 'ccc'], timeout=2)
+        assert matrix.shape == (3, 2)
+        assert list(matrix[:, 0]) == [1, 2, 3]
+
+        def fail(texts, **kwargs):
+            raise ValueError("boom")
+        model.encode = fail
+        try:
+            encoder.encode('z', timeout=2)
+            raise AssertionError("model error was swallowed")
+        except ValueError:
+            pass
+    finally:
+        encoder.close()
+
+    try:
+        encoder.submit('late')
+        raise AssertionError("submit after close was accepted")
+    except RuntimeError:
+        pass
+    print("✅ List input, error propagation and close")
+
+
+def test_sentence_transformer_call_forms():
+    """encode() takes SentenceTransformer's options and an empty list"""
+    model = FakeModel()
+    encoder = BatchingEncoder(model, max_batch_size=8, max_wait_ms=5)
+    try:
+        matrix = encoder.encode(['a', 'bb'], batch_size=32, show_progress_bar=False, timeout=2)
+        assert list(matrix[:, 0]) == [1, 2]
+
+        empty = encoder.encode([], show_progress_bar=False)
+        assert empty.shape == (0, 2) and empty.dtype == np.float32
+        assert model.calls == [['a', 'bb']]
+
+        try:
+            encoder.encode(['a'], normalize_embeddings=True)
+            raise AssertionError("option that changes the vectors was ignored")
+        except TypeError:
+            pass
+    finally:
+        encoder.close()
+    print("✅ SentenceTransformer options and empty input accepted")
+
+
+if __name__ == "__main__":
+    print("="*80)
+    print("BATCHING ENCODER TESTS")
+    print("="*80)
+    test_flush_on_batch_size()
+    test_flush_on_wait_deadline()
+    test_concurrent_requests_share_batches()
+    test_list_input_and_errors()
+    test_sentence_transformer_call_forms()
+    print("\n✅ ALL BATCHING ENCODER TESTS PASSED")
@@ -0,0 +1,158 @@
+"""
+Incremental rebuild tests
+Runs scripts/build/incremental_rebuild.py in a temporary project directory:
+files that chunk to nothing (the zero-chunk case), removed files, an
+up-to-date index, and manifest compatibility checks. No model is loaded
+because no case needs new embeddings.
+"""
+
+import sys
+import os
+import json
+import subprocess
+import tempfile
+sys.path.insert(0, 'src')
+
+import numpy as np
+from pathlib import Path
+from index_manifest import (file_sha256, chunking_options, new_manifest, is_compatible,
+                            plan_rebuild, save_manifest, load_manifest)
+
+ROOT = Path(__file__).resolve().parents[2]
+SCRIPT = ROOT / 'scripts' / 'build' / 'incremental_rebuild.py'
+MODEL_NAME = 'paraphrase-multilingual-mpnet-base-v2'
+DIM = 4
+
+
+def seed_project(root, files):
+    """
+    data/ plus index artifacts and a manifest as a previous build left them
+
+    Args:
+        files: {relative path: number of chunks it was built into}
+    """
+    root = Path(root)
+    manifest = new_manifest(MODEL_NAME, chunking_options())
+    chunks, metadata, row = [], [], 0
+    for rel, count in files.items():
+        path = root / 'data' / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(f"نص الخدمة {rel}\n" * 20, encoding='utf-8')
+        category = rel.split('/')[0]
+        chunks += [f"{rel} chunk {i}" for i in range(count)]
+        metadata += [{'source_file': path.name, 'category': category, 'chunk_id': i,
+                      'chunk_length': 10} for i in range(count)]
+        filepath = f'data/{rel}'
+        manifest['files'][filepath] = {'sha256': file_sha256(path), 'category': category,
+                                       'start': row, 'count': count}
+        row += count
+    manifest['total_rows'] = row
+
+    index = root / 'index'
+    index.mkdir()
+    with open(index / 'corpus_chunks.json', 'w', encoding='utf-8') as f:
+        json.dump(chunks, f, ensure_ascii=False)
+    with open(index / 'corpus_meta.json', 'w', encoding='utf-8') as f:
+        json.dump(metadata, f, ensure_ascii=False)
+    np.save(index / 'embeddings.npy', np.arange(row * DIM, dtype='float32').reshape(row, DIM))
+    save_manifest(str(index / 'manifest.json'), manifest)
+    return manifest
+
+
+def run_rebuild(root, *args):
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [str(ROOT / 'src'), env.get('PYTHONPATH')]))
+    result = subprocess.run([sys.executable, str(SCRIPT), *args], cwd=root, env=env,
+                            capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stdout + result.stderr
+    return result.stdout
+
+
+def load_artifacts(root):
+    index = Path(root) / 'index'
+    with open(index / 'corpus_chunks.json', encoding='utf-8') as f:
+        chunks = json.load(f)
+    with open(index / 'corpus_meta.json', encoding='utf-8') as f:
+        metadata = json.load(f)
+    return chunks, metadata, np.load(index / 'embeddings.npy'), load_manifest(str(index / 'manifest.json'))
+
+
+def test_file_emptied_to_zero_chunks():
+    """A changed file that chunks to nothing drops its rows; nothing is re-embedded"""
+    with tempfile.TemporaryDirectory() as root:
+        seed_project(root, {'health/a.txt': 2, 'health/b.txt': 3, 'info/c.txt': 1})
+        Path(root, 'data', 'health', 'b.txt').write_text('', encoding='utf-8')
+
+        output = run_rebuild(root)
+        assert '0 chunks re-embedded' in output
+
+        chunks, metadata, embeddings, manifest = load_artifacts(root)
+        assert chunks == ['health/a.txt chunk 0', 'health/a.txt chunk 1', 'info/c.txt chunk 0']
+        assert [m['source_file'] for m in metadata] == ['a.txt', 'a.txt', 'c.txt']
+        assert embeddings.shape == (3, DIM)
+        np.testing.assert_array_equal(embeddings[2], np.arange(5 * DIM, 6 * DIM))
+        assert manifest['total_rows'] == 3
+        assert manifest['files']['data/health/b.txt']['count'] == 0
+        assert manifest['files']['data/info/c.txt']['start'] == 2
+        assert (Path(root) / 'index' / 'faiss.index').exists()
+
+        assert 'up to date' in run_rebuild(root)
+    print("✅ Zero-chunk file handled without loading a model")
+
+
+def test_every_file_empty_from_scratch():
+    """A full build where nothing chunks writes empty, consistent artifacts"""
+    with tempfile.TemporaryDirectory() as root:
+        path = Path(root, 'data', 'culture', 'empty.txt')
+        path.parent.mkdir(parents=True)
+        path.write_text('', encoding='utf-8')
+
+        run_rebuild(root)
+        chunks, metadata, embeddings, manifest = load_artifacts(root)
+        assert chunks == [] and metadata == []
+        assert embeddings.shape == (0, 768)
+        assert manifest['total_rows'] == 0
+    print("✅ Empty corpus builds without crashing")
+
+
+def test_removed_file_and_stale_duplicates():
+    """Removed files lose their rows; a dedup mapping from an earlier build is dropped"""
+    with tempfile.TemporaryDirectory() as root:
+        seed_project(root, {'health/a.txt': 2, 'housing/d.txt': 2})
+        os.remove(Path(root, 'data', 'health', 'a.txt'))
+        Path(root, 'index', 'corpus_duplicates.json').write_text('[]', encoding='utf-8')
+
+        run_rebuild(root)
+        chunks, _, embeddings, manifest = load_artifacts(root)
+        assert chunks == ['housing/d.txt chunk 0', 'housing/d.txt chunk 1']
+        np.testing.assert_array_equal(embeddings, np.arange(2 * DIM, 4 * DIM).reshape(2, DIM))
+        assert list(manifest['files']) == ['data/housing/d.txt']
+        assert not Path(root, 'index', 'corpus_duplicates.json').exists()
+    print("✅ Removed file dropped, stale duplicate mapping removed")
+
+
+def test_manifest_compatibility():
+    """Any chunking or model change forces a full rebuild"""
+    manifest = new_manifest(MODEL_NAME, chunking_options())
+    assert is_compatible(manifest, MODEL_NAME, chunking_options())
+    assert not is_compatible(None, MODEL_NAME, chunking_options())
+    assert not is_compatible(manifest, 'other-model', chunking_options())
+    for change in [{'chunk_size': 256}, {'strategy': 'tokens'}, {'max_seq_length': 256},
+                   {'overlap_tokens': 32}, {'dedup': True}]:
+        assert not is_compatible(manifest, MODEL_NAME, chunking_options(**change)), change
+
+    manifest['files'] = {'a': {'sha256': '1'}, 'b': {'sha256': '2'}, 'c': {'sha256': '3'}}
+    plan = plan_rebuild(manifest, {'a': '1', 'b': 'changed', 'd': '4'})
+    assert plan == {'added': ['d'], 'changed': ['b'], 'removed': ['c'], 'unchanged': ['a']}
+    print("✅ Manifest compatibility and rebuild plan")
+
+
+if __name__ == "__main__":
+    print("="*80)
+    print("INCREMENTAL REBUILD TESTS")
+    print("="*80)
+    test_file_emptied_to_zero_chunks()
+    test_every_file_empty_from_scratch()
+    test_removed_file_and_stale_duplicates()
+    test_manifest_compatibility()
+    print("\n✅ ALL INCREMENTAL REBUILD TESTS PASSED")
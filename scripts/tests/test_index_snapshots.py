@@ -0,0 +1,212 @@
+"""
+Index snapshot tests
+Publishing, unique version names, pruning and HotSwapRetriever swaps
+"""
+
+import sys
+import os
+import json
+import tempfile
+import threading
+sys.path.insert(0, 'src')
+
+import numpy as np
+from pathlib import Path
+from index_snapshots import (publish_snapshot, read_current, list_snapshots,
+                             prune_snapshots, HotSwapRetriever)
+
+
+def write_artifacts(directory, n_chunks, label):
+    """Minimal index artifacts: n_chunks chunks, all with the given label"""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    np.save(directory / 'embeddings.npy', np.eye(n_chunks, 4, dtype='float32') + 0.01)
+    with open(directory / 'corpus_chunks.json', 'w', encoding='utf-8') as f:
+        json.dump([f"{label} {i}" for i in range(n_chunks)], f)
+    with open(directory / 'corpus_meta.json', 'w', encoding='utf-8') as f:
+        json.dump([{'source_file': f'{label}{i}.txt', 'category': 'info'} for i in range(n_chunks)], f)
+
+
+def test_publish_switches_current():
+    """Each publish creates a complete snapshot and moves CURRENT to it"""
+    with tempfile.TemporaryDirectory() as tmp:
+        build, root = os.path.join(tmp, 'index'), os.path.join(tmp, 'snapshots')
+        write_artifacts(build, 2, 'old')
+
+        assert read_current(root) is None
+        v1 = publish_snapshot(build, root, version='v1')
+        assert read_current(root) == 'v1'
+        assert sorted(os.listdir(os.path.join(root, 'v1'))) == sorted(
+            ['embeddings.npy', 'corpus_chunks.json', 'corpus_meta.json'])
+
+        v2 = publish_snapshot(build, root)
+        assert v2 != v1 and read_current(root) == v2
+        assert not [n for n in os.listdir(root) if n.endswith('.tmp')]
+
+        try:
+            publish_snapshot(build, root, version='v1')
+            raise AssertionError("explicit version was overwritten")
+        except FileExistsError:
+            pass
+    print("✅ Publish writes a complete snapshot and switches CURRENT")
+
+
+def test_concurrent_publishes_get_unique_versions():
+    """Publishers racing on the same timestamp never share a directory"""
+    with tempfile.TemporaryDirectory() as tmp:
+        build, root = os.path.join(tmp, 'index'), os.path.join(tmp, 'snapshots')
+        write_artifacts(build, 2, 'doc')
+
+        versions = []
+        lock = threading.Lock()
+
+        def publish():
+            version = publish_snapshot(build, root)
+            with lock:
+                versions.append(version)
+
+        threads = [threading.Thread(target=publish) for _ in range(20)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert len(set(versions)) == 20
+        assert sorted(list_snapshots(root)) == sorted(versions)
+        assert read_current(root) in versions
+    print("✅ 20 concurrent publishes got unique versions")
+
+
+def test_prune_keeps_newest_and_current():
+    """prune deletes by publish order and never removes the current snapshot"""
+    with tempfile.TemporaryDirectory() as tmp:
+        build, root = os.path.join(tmp, 'index'), os.path.join(tmp, 'snapshots')
+        write_artifacts(build, 2, 'doc')
+
+        # Names sort opposite to publish order; pruning must follow mtime
+        for i, version in enumerate(['z', 'y', 'x', 'w']):
+            publish_snapshot(build, root, version=version)
+            os.utime(os.path.join(root, version), ns=(0, (i + 1) * 10**9))
+        assert list_snapshots(root) == ['z', 'y', 'x', 'w']
+
+        assert prune_snapshots(root, keep=2) == ['z', 'y']
+        assert list_snapshots(root) == ['x', 'w']
+
+        # Roll back to an older snapshot: it survives pruning
+        with open(os.path.join(root, 'CURRENT'), 'w', encoding='utf-8') as f:
+            f.write('x\n')
+        assert prune_snapshots(root, keep=0) == ['w']
+        assert list_snapshots(root) == ['x']
+    print("✅ Prune follows publish time and keeps the current snapshot")
+
+
+def test_hot_swap():
+    """HotSwapRetriever starts on the fallback, then follows CURRENT"""
+    with tempfile.TemporaryDirectory() as tmp:
+        build, root = os.path.join(tmp, 'index'), os.path.join(tmp, 'snapshots')
+        write_artifacts(build, 2, 'old')
+        os.makedirs(root)
+
+        retriever = HotSwapRetriever(root, fallback_dir=build)
+        assert retriever.version is None and len(retriever.chunks) == 2
+        assert not retriever.check_for_update()
+
+        old = retriever.retriever
+        write_artifacts(build, 3, 'new')
+        version = publish_snapshot(build, root)
+        assert retriever.check_for_update()
+        assert retriever.version == version
+        assert len(retriever.chunks) == 3 and retriever.chunks[0].startswith('new')
+        assert len(old.chunks) == 2, "in-flight searches keep the old retriever"
+
+        stats = retriever.get_stats()
+        assert stats['snapshot_version'] == version and stats['snapshot_swaps'] == 1
+    print("✅ Hot swap to a newly published snapshot")
+
+
+def test_inconsistent_build_not_published():
+    """Artifacts whose rows don't line up are refused; CURRENT stays on the good version"""
+    with tempfile.TemporaryDirectory() as tmp:
+        build, root = os.path.join(tmp, 'index'), os.path.join(tmp, 'snapshots')
+        write_artifacts(build, 2, 'good')
+        good = publish_snapshot(build, root)
+
+        # Embedding rows no longer match the chunks, then metadata doesn't either
+        with open(os.path.join(build, 'corpus_chunks.json'), 'w', encoding='utf-8') as f:
+            json.dump(['a', 'b', 'c'], f)
+        for broken_version in ('bad-embeddings', 'bad-metadata'):
+            try:
+                publish_snapshot(build, root, version=broken_version)
+                raise AssertionError("inconsistent build was published")
+            except ValueError:
+                pass
+            with open(os.path.join(build, 'corpus_meta.json'), 'w', encoding='utf-8') as f:
+                json.dump([{'source_file': 'x.txt', 'category': 'info'}], f)
+            np.save(os.path.join(build, 'embeddings.npy'), np.ones((3, 4), dtype='float32'))
+
+        assert read_current(root) == good
+        assert list_snapshots(root) == [good]
+        assert sorted(os.listdir(root)) == sorted([good, 'CURRENT'])
+
+        retriever = HotSwapRetriever(root, fallback_dir=build)
+        assert retriever.version == good and retriever.last_error is None
+    print("✅ Inconsistent build refused, CURRENT unchanged, restart works")
+
+
+def corrupt_snapshot(root, version):
+    """Damage a published snapshot on disk (publish-time checks can't catch this)"""
+    with open(os.path.join(root, version, 'corpus_chunks.json'), 'w', encoding='utf-8') as f:
+        json.dump(['damaged'] * 7, f)
+
+
+def test_broken_snapshot_keeps_serving():
+    """A snapshot that fails to load leaves the current retriever in place"""
+    with tempfile.TemporaryDirectory() as tmp:
+        build, root = os.path.join(tmp, 'index'), os.path.join(tmp, 'snapshots')
+        write_artifacts(build, 2, 'good')
+        good = publish_snapshot(build, root)
+        retriever = HotSwapRetriever(root, fallback_dir=build)
+
+        bad = publish_snapshot(build, root)
+        corrupt_snapshot(root, bad)
+
+        assert not retriever.check_for_update()
+        assert retriever.version == good
+        assert retriever.last_error and retriever.last_error.startswith(bad)
+        assert len(retriever.chunks) == 2
+    print("✅ Broken snapshot rejected, previous version keeps serving")
+
+
+def test_restart_with_broken_current():
+    """A new retriever falls back to the newest loadable snapshot, then to fallback_dir"""
+    with tempfile.TemporaryDirectory() as tmp:
+        build, root = os.path.join(tmp, 'index'), os.path.join(tmp, 'snapshots')
+        write_artifacts(build, 2, 'old')
+        old = publish_snapshot(build, root, version='old')
+        write_artifacts(build, 3, 'new')
+        publish_snapshot(build, root, version='new')
+        corrupt_snapshot(root, 'new')
+
+        retriever = HotSwapRetriever(root, fallback_dir=build)
+        assert retriever.version == old and len(retriever.chunks) == 2
+        assert retriever.last_error.startswith('new')
+
+        corrupt_snapshot(root, 'old')
+        retriever = HotSwapRetriever(root, fallback_dir=build)
+        assert retriever.version is None and len(retriever.chunks) == 3
+        assert retriever.last_error.startswith('new')
+    print("✅ Restart survives a broken CURRENT snapshot")
+
+
+if __name__ == "__main__":
+    print("="*80)
+    print("INDEX SNAPSHOT TESTS")
+    print("="*80)
+    test_publish_switches_current()
+    test_concurrent_publishes_get_unique_versions()
+    test_prune_keeps_newest_and_current()
+    test_hot_swap()
+    test_inconsistent_build_not_published()
+    test_broken_snapshot_keeps_serving()
+    test_restart_with_broken_current()
+    print("\n✅ ALL INDEX SNAPSHOT TESTS PASSED")
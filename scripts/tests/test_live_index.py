@@ -0,0 +1,172 @@
+"""
+Live index tests
+Adding and removing documents on a running RetrieverSystem: tombstoned rows
+never come back from search, and compact() drops them from memory
+"""
+
+import sys
+import json
+import tempfile
+sys.path.insert(0, 'src')
+
+import numpy as np
+from pathlib import Path
+from retrieval import RetrieverSystem
+
+DIM = 8
+
+
+def one_hot(i):
+    v = np.zeros(DIM, dtype='float32')
+    v[i] = 1.0
+    return v
+
+
+def build_retriever(root):
+    """Four chunks from three documents, chunk i pointing along axis i"""
+    chunks = [f"Service {i}\nbody {i}" for i in range(4)]
+    metadata = [
+        {'source_file': 'a.txt', 'category': 'health', 'chunk_id': 0},
+        {'source_file': 'a.txt', 'category': 'health', 'chunk_id': 1},
+        {'source_file': 'b.txt', 'category': 'education', 'chunk_id': 0},
+        {'source_file': 'c.txt', 'category': 'housing', 'chunk_id': 0},
+    ]
+    root = Path(root)
+    np.save(root / 'embeddings.npy', np.vstack([one_hot(i) for i in range(4)]))
+    with open(root / 'corpus_chunks.json', 'w', encoding='utf-8') as f:
+        json.dump(chunks, f)
+    with open(root / 'corpus_meta.json', 'w', encoding='utf-8') as f:
+        json.dump(metadata, f)
+    return RetrieverSystem(str(root / 'embeddings.npy'), str(root / 'corpus_chunks.json'),
+                           str(root / 'corpus_meta.json'))
+
+
+def test_removed_documents_never_returned():
+    """Tombstoned rows are excluded even when they are the best match"""
+    with tempfile.TemporaryDirectory() as root:
+        retriever = build_retriever(root)
+
+        assert retriever.search(one_hot(0), k=1)[0]['metadata']['source_file'] == 'a.txt'
+        assert retriever.remove_documents(['a.txt']) == 2
+        assert retriever.remove_documents(['a.txt']) == 0
+
+        results = retriever.search(one_hot(0), k=10)
+        assert [r['metadata']['source_file'] for r in results].count('a.txt') == 0
+        assert len(results) == 2, "k is capped at the number of live chunks"
+
+        # Query text path (title + keyword fusion) must respect tombstones too
+        results = retriever.search(one_hot(0), k=10, query_text='Service 0 health')
+        assert all(r['metadata']['source_file'] != 'a.txt' for r in results)
+
+        stats = retriever.get_stats()
+        assert stats['total_chunks'] == 2
+        assert stats['tombstones'] == 2
+        assert stats['total_documents'] == 2
+        assert 'health' not in stats['categories']
+        assert retriever.index.ntotal == 2
+    print("✅ Removed documents never returned by search")
+
+
+def test_search_sees_consistent_snapshot():
+    """A snapshot grabbed before an update is unaffected by it"""
+    with tempfile.TemporaryDirectory() as root:
+        retriever = build_retriever(root)
+        before = retriever._snapshot
+
+        retriever.remove_documents(['b.txt'])
+        retriever.add_documents(['Service 9\nnew'], [{'source_file': 'd.txt', 'category': 'info'}],
+                                one_hot(5).reshape(1, -1))
+
+        assert before.alive.all() and len(before.chunks) == 4
+        assert len(retriever.chunks) == 5
+    print("✅ Earlier snapshot unchanged by add/remove")
+
+
+def test_compact_drops_tombstones():
+    """compact() removes tombstoned rows; search results are unchanged"""
+    with tempfile.TemporaryDirectory() as root:
+        retriever = build_retriever(root)
+        retriever.remove_documents(['a.txt'])
+        before = [(r['chunk'], r['score']) for r in retriever.search(one_hot(2), k=10)]
+
+        retriever.compact()
+        after = [(r['chunk'], r['score']) for r in retriever.search(one_hot(2), k=10)]
+
+        assert len(retriever.chunks) == 2
+        assert retriever._snapshot.alive.all()
+        assert retriever.get_stats()['tombstones'] == 0
+        assert before == after
+        assert retriever.search(one_hot(2), k=1)[0]['metadata']['source_file'] == 'b.txt'
+
+        # Compacting a clean index is a no-op
+        snapshot = retriever._snapshot
+        retriever.compact()
+        assert retriever._snapshot is snapshot
+    print("✅ Compaction drops tombstones without changing results")
+
+
+def test_add_documents_validates_input():
+    """Mismatched metadata or embedding dimension is rejected"""
+    with tempfile.TemporaryDirectory() as root:
+        retriever = build_retriever(root)
+        for chunks, meta, emb in [
+            (['x'], [], one_hot(0).reshape(1, -1)),
+            (['x'], [{'source_file': 'x.txt', 'category': 'info'}], np.ones((1, DIM + 1))),
+        ]:
+            try:
+                retriever.add_documents(chunks, meta, emb)
+                raise AssertionError("invalid add was accepted")
+            except ValueError:
+                pass
+        assert len(retriever.chunks) == 4
+    print("✅ Invalid additions rejected")
+
+
+def test_duplicate_source_files_removed_once():
+    """Listing a file twice removes (and counts) its chunks once"""
+    with tempfile.TemporaryDirectory() as root:
+        retriever = build_retriever(root)
+        retriever.add_documents(['Service 9\nmore health'], [{'source_file': 'e.txt', 'category': 'health'}],
+                                one_hot(5).reshape(1, -1))
+
+        assert retriever.remove_documents(['a.txt', 'a.txt']) == 2
+        stats = retriever.get_stats()
+        assert stats['total_chunks'] == 3 and stats['tombstones'] == 2
+        assert stats['categories']['health'] == 1, "e.txt is still in health"
+        assert retriever.index.ntotal == 3
+    print("✅ Duplicated source file removed once")
+
+
+def test_ids_stable_across_compaction():
+    """Result ids survive the row shift compact() causes and are never reused"""
+    with tempfile.TemporaryDirectory() as root:
+        retriever = build_retriever(root)
+
+        # Unmodified index: id == row in corpus_chunks.json
+        assert retriever.search(one_hot(2), k=1)[0]['id'] == 2
+
+        retriever.remove_documents(['a.txt'])
+        retriever.compact()
+        top = retriever.search(one_hot(2), k=1)[0]
+        assert retriever.chunks.index(top['chunk']) == 0, "b.txt moved to row 0"
+        assert top['id'] == 2, "but keeps its id"
+
+        new_ids = retriever.add_documents(['Service 9\nnew'], [{'source_file': 'd.txt', 'category': 'info'}],
+                                          one_hot(5).reshape(1, -1))
+        assert new_ids == [4], "ids of removed chunks are not reused"
+        assert retriever.search(one_hot(5), k=1)[0]['id'] == 4
+        assert sorted(r['id'] for r in retriever.search(one_hot(0), k=10)) == [2, 3, 4]
+    print("✅ Result ids stable across compaction")
+
+
+if __name__ == "__main__":
+    print("="*80)
+    print("LIVE INDEX TESTS")
+    print("="*80)
+    test_removed_documents_never_returned()
+    test_search_sees_consistent_snapshot()
+    test_compact_drops_tombstones()
+    test_add_documents_validates_input()
+    test_duplicate_source_files_removed_once()
+    test_ids_stable_across_compaction()
+    print("\n✅ ALL LIVE INDEX TESTS PASSED")
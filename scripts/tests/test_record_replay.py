@@ -0,0 +1,145 @@
+"""
+Record/replay fixture tests
+Cassette persistence, ReplayMiss on unseen requests, auto mode and the
+translator/generator wrappers, all offline
+"""
+
+import sys
+import os
+import tempfile
+import time
+sys.path.insert(0, 'src')
+
+from record_replay import (Cassette, CallRecorder, ReplayMiss,
+                           RecordReplayTranslator, RecordReplayAnswerGenerator)
+
+
+class Live:
+    """Stand-in for a network call; counts how often it is reached"""
+
+    def __init__(self, response):
+        self.response = response
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.response
+
+
+def test_record_then_replay():
+    """Recorded responses are saved, reloaded and replayed without the live call"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'fixtures', 'service.json.gz')
+
+        recorder = CallRecorder(Cassette(path), 'svc', mode='record')
+        assert recorder.call('echo', ['مرحبا'], Live('hello')) == 'hello'
+        recorder.cassette.save()
+        first_bytes = open(path, 'rb').read()
+
+        live = Live('must not be called')
+        replay = CallRecorder(Cassette(path), 'svc', mode='replay')
+        assert replay.call('echo', ['مرحبا'], live) == 'hello'
+        assert live.calls == 0
+        assert replay.get_stats() == {'mode': 'replay', 'replayed': 1, 'recorded': 0, 'entries': 1}
+
+        # Same content, same bytes (no gzip timestamp)
+        again = Cassette(path)
+        key = Cassette.key('svc', 'echo', ['مرحبا'])
+        again.put(key, dict(again.get(key)))
+        again.save()
+        assert open(path, 'rb').read() == first_bytes
+    print("✅ Recorded responses replayed offline; cassette bytes are stable")
+
+
+def test_replay_miss():
+    """An unseen request raises ReplayMiss and never reaches the service"""
+    with tempfile.TemporaryDirectory() as tmp:
+        recorder = CallRecorder(Cassette(os.path.join(tmp, 'empty.json.gz')), 'svc', mode='replay')
+        live = Live('x')
+        try:
+            recorder.call('echo', ['unseen'], live)
+            raise AssertionError("replay miss was not raised")
+        except ReplayMiss as e:
+            assert isinstance(e, KeyError)
+        assert live.calls == 0
+
+        # Arguments and method are part of the key
+        assert Cassette.key('svc', 'echo', ['a']) != Cassette.key('svc', 'echo', ['b'])
+        assert Cassette.key('svc', 'echo', ['a']) != Cassette.key('svc', 'other', ['a'])
+        assert Cassette.key('svc', 'echo', ['a']) != Cassette.key('other', 'echo', ['a'])
+
+        try:
+            CallRecorder(recorder.cassette, 'svc', mode='live')
+            raise AssertionError("unknown mode was accepted")
+        except ValueError:
+            pass
+    print("✅ Replay miss raised without contacting the service")
+
+
+def test_auto_mode_and_failures():
+    """auto records only misses; responses failing should_record are not stored"""
+    with tempfile.TemporaryDirectory() as tmp:
+        cassette = Cassette(os.path.join(tmp, 'auto.json.gz'))
+        recorder = CallRecorder(cassette, 'svc', mode='auto')
+
+        live = Live('answer')
+        recorder.call('ask', ['q'], live)
+        recorder.call('ask', ['q'], live)
+        assert live.calls == 1 and recorder.recorded == 1 and recorder.replayed == 1
+
+        failing = Live('q2')
+        recorder.call('ask', ['q2'], failing, should_record=lambda r: r != 'q2')
+        recorder.call('ask', ['q2'], failing, should_record=lambda r: r != 'q2')
+        assert failing.calls == 2 and len(cassette) == 1
+        cassette.save()
+    print("✅ Auto mode records misses once; failed responses not recorded")
+
+
+def test_recorded_latency():
+    """latency='recorded' reproduces the original call time"""
+    with tempfile.TemporaryDirectory() as tmp:
+        cassette = Cassette(os.path.join(tmp, 'slow.json.gz'))
+        CallRecorder(cassette, 'svc', mode='record').call('slow', [], lambda: time.sleep(0.05) or 'done')
+        cassette.save()
+
+        replay = CallRecorder(cassette, 'svc', mode='replay', latency='recorded')
+        start = time.perf_counter()
+        assert replay.call('slow', [], Live(None)) == 'done'
+        assert time.perf_counter() - start >= 0.04
+    print("✅ Recorded latency reproduced on replay")
+
+
+def test_service_wrappers_replay_offline():
+    """Translator and generator wrappers replay without API keys or network"""
+    with tempfile.TemporaryDirectory() as tmp:
+        cassette = Cassette(os.path.join(tmp, 'services.json.gz'))
+        cassette.put(Cassette.key('translator', 'translate_to_arabic', ['transcript']),
+                     {'response': 'كشف درجات', 'latency': 0.0})
+        cassette.put(Cassette.key('generator', 'complete', ['prompt']),
+                     {'response': 'answer', 'latency': 0.0})
+
+        translator = RecordReplayTranslator(cassette, mode='replay')
+        assert translator.translate_to_arabic('transcript') == 'كشف درجات'
+
+        generator = RecordReplayAnswerGenerator(cassette, mode='replay')
+        assert generator.models == []
+        assert generator.complete('prompt') == 'answer'
+        try:
+            generator.complete('another prompt')
+            raise AssertionError("generator replay miss was not raised")
+        except ReplayMiss:
+            pass
+        cassette.save()
+    print("✅ Translator and generator wrappers replay offline")
+
+
+if __name__ == "__main__":
+    print("="*80)
+    print("RECORD/REPLAY TESTS")
+    print("="*80)
+    test_record_then_replay()
+    test_replay_miss()
+    test_auto_mode_and_failures()
+    test_recorded_latency()
+    test_service_wrappers_replay_offline()
+    print("\n✅ ALL RECORD/REPLAY TESTS PASSED")
@@ -0,0 +1,92 @@
+"""
+Results stream tests
+ResultsWriter/iter_records round trips, atomic files and SummaryColumns
+"""
+
+import sys
+import os
+import math
+import tempfile
+sys.path.insert(0, 'experiments')
+
+import numpy as np
+from results_stream import ResultsWriter, SummaryColumns, iter_records
+
+
+def test_round_trip():
+    """Records come back in order, compact, with NumPy values converted"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'out', 'results.jsonl')
+        records = [
+            {'query': 'كشف درجات', 'rank': np.int64(1), 'score': np.float32(0.5), 'ids': [3, 7]},
+            {'query': 'rent', 'rank': None, 'score': 0.25, 'ids': []},
+        ]
+        with ResultsWriter(path) as writer:
+            for record in records:
+                writer.write(record)
+        assert writer.count == 2
+
+        lines = open(path, encoding='utf-8').read().splitlines()
+        assert len(lines) == 2 and ': ' not in lines[0] and 'كشف' in lines[0]
+
+        back = list(iter_records(path))
+        assert back[0] == {'query': 'كشف درجات', 'rank': 1, 'score': 0.5, 'ids': [3, 7]}
+        assert back[1]['rank'] is None
+        assert list(iter_records(path, fields=['rank', 'missing'])) == [
+            {'rank': 1, 'missing': None}, {'rank': None, 'missing': None}]
+    print("✅ JSONL round trip with field selection")
+
+
+def test_failed_run_keeps_previous_file():
+    """An exception mid-run leaves the last complete file and no partial"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'results.jsonl')
+        with ResultsWriter(path) as writer:
+            writer.write({'run': 1})
+
+        try:
+            with ResultsWriter(path) as writer:
+                writer.write({'run': 2})
+                raise RuntimeError("experiment crashed")
+        except RuntimeError:
+            pass
+
+        assert list(iter_records(path)) == [{'run': 1}]
+        assert os.listdir(tmp) == ['results.jsonl']
+    print("✅ Crashed run keeps the previous results file")
+
+
+def test_summary_columns():
+    """Numeric columns (None -> NaN), label codes and failure examples"""
+    summary = SummaryColumns(numeric=['rr', 'hit'], labels=['category'],
+                             failure_field='hit', keep_failures=2)
+    with tempfile.TemporaryDirectory() as tmp:
+        with ResultsWriter(os.path.join(tmp, 'r.jsonl'), summary=summary) as writer:
+            writer.write({'rr': 1.0, 'hit': True, 'category': 'health'})
+            values_before = summary.values('rr')
+            writer.write({'rr': None, 'hit': False, 'category': 'education'})
+            writer.write({'rr': 0.5, 'hit': False, 'category': 'health'})
+            writer.write({'rr': 0.0, 'hit': False, 'category': None})
+
+    assert len(summary) == 4
+    assert len(values_before) == 1, "values() is a copy, not a live view"
+    rr = summary.values('rr')
+    assert rr.dtype == np.float64 and math.isnan(rr[1])
+    assert np.nanmean(rr) == 0.5
+    assert list(summary.values('hit')) == [1.0, 0.0, 0.0, 0.0]
+    assert list(summary.labels('category')) == ['health', 'education', 'health', 'None']
+    assert [f['category'] for f in summary.failures] == ['education', 'health']
+
+    empty = SummaryColumns(numeric=['rr'], labels=['category'])
+    assert len(empty.values('rr')) == 0 and len(empty.labels('category')) == 0
+    print("✅ Summary columns gathered while writing")
+
+
+if __name__ == "__main__":
+    print("="*80)
+    print("RESULTS STREAM TESTS")
+    print("="*80)
+    test_round_trip()
+    test_failed_run_keeps_previous_file()
+    test_summary_columns()
+    print("\n✅ ALL RESULTS STREAM TESTS PASSED")
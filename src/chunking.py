@@ -1,7 +1,41 @@
 """Document chunking strategies"""
-from typing import List
+from functools import lru_cache
+from typing import Dict, List
 import re
 
+from preprocessing import clean_document, normalize_arabic
+
+# Encoder whose tokenizer and window the token strategy targets
+MODEL_NAME = 'paraphrase-multilingual-mpnet-base-v2'
+
+# SentenceTransformer truncates this model's input at 128 tokens
+MAX_SEQ_LENGTH = 128
+
+@lru_cache(maxsize=None)
+def get_tokenizer(model_name: str = MODEL_NAME):
+    """Load a tokenizer once per process (worker processes each get their own)"""
+    from corpus_encoder import load_tokenizer
+    return load_tokenizer(model_name)
+
+def truncation_report(chunks: List[str], tokenizer, max_seq_length: int = MAX_SEQ_LENGTH) -> Dict:
+    """
+    Count encoder tokens lost to truncation across chunks
+    
+    Returns:
+        {'chunks', 'tokens', 'truncated_chunks', 'truncated_tokens', 'truncated_fraction'}
+    """
+    lengths = [len(ids) for ids in tokenizer(chunks, add_special_tokens=True)['input_ids']] if chunks else []
+    overflow = [max(0, n - max_seq_length) for n in lengths]
+    total = sum(lengths)
+    
+    return {
+        'chunks': len(chunks),
+        'tokens': total,
+        'truncated_chunks': sum(1 for o in overflow if o),
+        'truncated_tokens': sum(overflow),
+        'truncated_fraction': sum(overflow) / total if total else 0.0
+    }
+
 def chunk_by_paragraph(text: str, min_chunk_size=300, max_chunk_size=800, overlap=100) -> List[str]:
     """
     Chunk text by paragraphs with size constraints
@@ -11,65 +45,87 @@ def chunk_by_paragraph(text: str, min_chunk_size=300, max_chunk_size=800, overla
     paragraphs = [p.strip() for p in paragraphs if len(p.strip()) > 50]
     
     chunks = []
-    current_chunk = ""
+    # Current chunk as a list of pieces plus its joined length, so growing it
+    # is O(1) instead of re-copying the whole string on every paragraph
+    parts = []
+    current_len = 0
     
     for para in paragraphs:
         # If adding this paragraph keeps us under max size
-        if len(current_chunk) + len(para) < max_chunk_size:
-            current_chunk += "\n\n" + para if current_chunk else para
+        if current_len + len(para) < max_chunk_size:
+            if parts:
+                parts.append("\n\n")
+                current_len += 2
+            parts.append(para)
+            current_len += len(para)
         else:
+            current_chunk = ''.join(parts)
+            
             # Save current chunk if it meets minimum
-            if len(current_chunk) >= min_chunk_size:
+            if current_len >= min_chunk_size:
                 chunks.append(current_chunk.strip())
                 
             # Start new chunk with overlap
             if overlap > 0 and current_chunk:
                 # Take last 'overlap' characters from previous chunk
                 overlap_text = current_chunk[-overlap:]
-                current_chunk = overlap_text + "\n\n" + para
+                parts = [overlap_text, "\n\n", para]
+                current_len = len(overlap_text) + 2 + len(para)
             else:
-                current_chunk = para
+                parts = [para]
+                current_len = len(para)
     
     # Add final chunk
-    if len(current_chunk) >= min_chunk_size:
-        chunks.append(current_chunk.strip())
+    if current_len >= min_chunk_size:
+        chunks.append(''.join(parts).strip())
     
     return chunks
 
-def chunk_document(filepath: str, chunk_size=512, overlap=128) -> List[str]:
+def chunk_text(text: str, chunk_size=512, overlap=128) -> List[str]:
+    """
+    Clean, normalize and chunk raw document text
+    """
+    # Clean document, then normalize Arabic (shared with preprocessing)
+    text = normalize_arabic(clean_document(text))
+    
+    # Chunk
+    return chunk_by_paragraph(text,
+                              min_chunk_size=chunk_size-100,
+                              max_chunk_size=chunk_size+100,
+                              overlap=overlap)
+
+def chunk_text_by_tokens(text: str, max_seq_length=MAX_SEQ_LENGTH, overlap_tokens=16,
+                         model_name=MODEL_NAME) -> List[str]:
+    """
+    Clean, normalize and chunk raw document text into encoder-window-sized chunks
+    """
+    text = normalize_arabic(clean_document(text))
+    
+    chunker = DocumentChunker(max_seq_length=max_seq_length, overlap_tokens=overlap_tokens,
+                              model_name=model_name)
+    return chunker.chunk_by_tokens(text)
+
+def chunk_document(filepath: str, chunk_size=512, overlap=128, strategy='chars',
+                   max_seq_length=MAX_SEQ_LENGTH, overlap_tokens=16) -> List[str]:
     """
     Load and chunk a single document
+    
+    strategy='chars' sizes chunks in characters (chunk_size/overlap);
+    strategy='tokens' sizes them in encoder tokens (max_seq_length/overlap_tokens).
     """
     with open(filepath, 'r', encoding='utf-8') as f:
         text = f.read()
     
-    # Clean document
-    text = re.sub(r'\n{3,}', '\n\n', text)
-    lines = text.split('\n')
-    lines = [l for l in lines if len(l.strip()) > 10]
-    text = '\n'.join(lines)
-    
-    # Normalize Arabic
-    text = re.sub(r'[\u064B-\u065F\u0670]', '', text)
-    text = re.sub(r'[إأآ]', 'ا', text)  # Normalize alef variants
-    text = re.sub(r'ى', 'ي', text)  # Normalize alef maksura
-    text = re.sub(r'ة', 'ه', text)  # Normalize taa marbuta
-    text = re.sub(r'\s+', ' ', text)
-    text = re.sub(r'[^\u0600-\u06FF\s\d\.\،\؛\؟]', '', text)
-    text = text.strip()
-    
-    # Chunk
-    chunks = chunk_by_paragraph(text,
-                                min_chunk_size=chunk_size-100,
-                                max_chunk_size=chunk_size+100,
-                                overlap=overlap)
-    
-    return chunks
+    if strategy == 'tokens':
+        return chunk_text_by_tokens(text, max_seq_length=max_seq_length, overlap_tokens=overlap_tokens)
+    return chunk_text(text, chunk_size=chunk_size, overlap=overlap)
 
 class DocumentChunker:
     """Handles document chunking with various strategies"""
     
-    def __init__(self, chunk_size: int = 600, overlap: int = 100, min_size: int = 200):
+    def __init__(self, chunk_size: int = 600, overlap: int = 100, min_size: int = 200,
+                 max_seq_length: int = MAX_SEQ_LENGTH, overlap_tokens: int = 16,
+                 model_name: str = MODEL_NAME):
         """
         Initialize chunker
         
@@ -77,10 +133,16 @@ class DocumentChunker:
             chunk_size: Target size for each chunk in characters
             overlap: Number of characters to overlap between chunks
             min_size: Minimum chunk size to keep
+            max_seq_length: Encoder window in tokens ('tokens' strategy)
+            overlap_tokens: Tokens to overlap between chunks ('tokens' strategy)
+            model_name: Encoder whose tokenizer measures chunks ('tokens' strategy)
         """
         self.chunk_size = chunk_size
         self.overlap = overlap
         self.min_size = min_size
+        self.max_seq_length = max_seq_length
+        self.overlap_tokens = overlap_tokens
+        self.model_name = model_name
     
     def chunk_by_paragraphs(self, text: str) -> List[str]:
         """Chunk text by paragraphs with size constraints"""
@@ -93,20 +155,71 @@ class DocumentChunker:
         sentences = [s.strip() for s in sentences if len(s.strip()) > 20]
         
         chunks = []
-        current_chunk = ""
+        parts = []
+        current_len = 0
         
         for sent in sentences:
-            if len(current_chunk) + len(sent) > self.chunk_size:
-                if len(current_chunk) >= self.min_size:
-                    chunks.append(current_chunk.strip())
-                    current_chunk = sent
+            if current_len + len(sent) > self.chunk_size:
+                if current_len >= self.min_size:
+                    chunks.append(''.join(parts).strip())
+                    parts = [sent]
+                    current_len = len(sent)
                 else:
-                    current_chunk += " " + sent
+                    parts.append(" " + sent)
+                    current_len += 1 + len(sent)
             else:
-                current_chunk += " " + sent if current_chunk else sent
+                piece = " " + sent if parts else sent
+                parts.append(piece)
+                current_len += len(piece)
+        
+        if current_len >= self.min_size:
+            chunks.append(''.join(parts).strip())
+        
+        return chunks
+    
+    def chunk_by_tokens(self, text: str) -> List[str]:
+        """
+        Chunk text so each chunk fills the encoder window exactly
+        
+        The text is tokenized once; windows of (max_seq_length - special
+        tokens) tokens are cut at word boundaries, each starting overlap_tokens
+        before the previous one ended. Nothing is lost to truncation.
+        """
+        tokenizer = get_tokenizer(self.model_name)
+        budget = self.max_seq_length - tokenizer.num_special_tokens_to_add(pair=False)
+        if budget <= self.overlap_tokens:
+            raise ValueError(f"overlap_tokens ({self.overlap_tokens}) must be below the "
+                             f"token budget ({budget})")
+        
+        offsets = tokenizer(text, add_special_tokens=False,
+                            return_offsets_mapping=True)['offset_mapping']
+        n = len(offsets)
+        if n == 0:
+            return []
         
-        if len(current_chunk) >= self.min_size:
-            chunks.append(current_chunk.strip())
+        # A token starts a word if whitespace separates it from the previous one
+        word_start = [i == 0 or offsets[i][0] > offsets[i - 1][1] for i in range(n)]
+        
+        chunks = []
+        start = 0
+        while start < n:
+            end = min(start + budget, n)
+            if end < n:
+                # Back off to a word boundary unless the word fills the window
+                cut = end
+                while cut > start + 1 and not word_start[cut]:
+                    cut -= 1
+                if cut > start + 1:
+                    end = cut
+            
+            chunks.append(text[offsets[start][0]:offsets[end - 1][1]].strip())
+            if end == n:
+                break
+            
+            next_start = max(start + 1, end - self.overlap_tokens)
+            while next_start < end and not word_start[next_start]:
+                next_start += 1
+            start = next_start
         
         return chunks
     
@@ -137,7 +250,7 @@ class DocumentChunker:
         
         Args:
             text: Document text
-            strategy: 'paragraphs', 'sentences', or 'sections'
+            strategy: 'paragraphs', 'sentences', 'sections', or 'tokens'
         
         Returns:
             List of text chunks
@@ -148,6 +261,8 @@ class DocumentChunker:
             return self.chunk_by_sentences(text)
         elif strategy == 'sections':
             return self.chunk_by_sections(text)
+        elif strategy == 'tokens':
+            return self.chunk_by_tokens(text)
         else:
             raise ValueError(f"Unknown strategy: {strategy}")
 
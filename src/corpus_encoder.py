@@ -0,0 +1,375 @@
+"""
+Corpus embedding with length-bucketed batches and optional encoder processes.
+
+Chunks are sorted by token length so each batch holds similar lengths and
+little compute is spent on padding. Batches can be spread over a pool of
+worker processes, each with its own model copy and a pinned torch thread
+count. Embeddings are always returned in the original chunk order.
+
+With an output path, rows are written batch by batch into a preallocated
+.npy memmap next to the target and a checkpoint records finished batches, so
+an interrupted run resumes where it stopped. The target file only appears
+once every batch is done.
+"""
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+MODEL_NAME = 'paraphrase-multilingual-mpnet-base-v2'
+
+# SentenceTransformer truncates inputs for this model at 128 tokens
+DEFAULT_MAX_SEQ_LENGTH = 128
+
+CHECKPOINT_VERSION = 1
+
+# Per-process model used by pool workers
+_worker_model = None
+
+
+class IncompleteEmbeddingsError(ValueError):
+    """Embedding artifact is partial, mid-rebuild, or doesn't match the chunks"""
+
+
+def partial_path(output_path: str) -> str:
+    return output_path + '.partial'
+
+
+def checkpoint_path(output_path: str) -> str:
+    return output_path + '.checkpoint.json'
+
+
+def load_embeddings(path: str, expected_rows: Optional[int] = None,
+                    mmap_mode: Optional[str] = None) -> np.ndarray:
+    """
+    Load an embedding matrix, refusing partial or out-of-date artifacts
+
+    Raises:
+        IncompleteEmbeddingsError: If the file is a partial write, a
+            checkpointed run into it hasn't finished, or rows don't match
+    """
+    if path.endswith('.partial'):
+        raise IncompleteEmbeddingsError(f"{path} is a partial embedding file")
+    if os.path.exists(checkpoint_path(path)):
+        raise IncompleteEmbeddingsError(
+            f"Embedding generation into {path} is incomplete "
+            f"(found {checkpoint_path(path)}); rerun generate_embeddings.py to resume"
+        )
+
+    embeddings = np.load(path, mmap_mode=mmap_mode)
+    if expected_rows is not None and embeddings.shape[0] != expected_rows:
+        raise IncompleteEmbeddingsError(
+            f"{path} has {embeddings.shape[0]} rows but {expected_rows} chunks were expected"
+        )
+    return embeddings
+
+
+def discard_checkpoint(output_path: str):
+    """Remove a partial file and checkpoint left by an interrupted run"""
+    for path in (partial_path(output_path), checkpoint_path(output_path)):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _to_ranges(batch_ids) -> List[List[int]]:
+    """Sorted ids -> [[start, end), ...]"""
+    ranges = []
+    for i in sorted(batch_ids):
+        if ranges and ranges[-1][1] == i:
+            ranges[-1][1] = i + 1
+        else:
+            ranges.append([i, i + 1])
+    return ranges
+
+
+def _from_ranges(ranges) -> set:
+    return {i for start, end in ranges for i in range(start, end)}
+
+
+class EmbeddingCheckpoint:
+    """Preallocated .npy memmap plus a record of which batches are written"""
+
+    def __init__(self, output_path: str, fingerprint: str, rows: int, checkpoint_every: int = 10):
+        self.output_path = output_path
+        self.fingerprint = fingerprint
+        self.rows = rows
+        self.checkpoint_every = checkpoint_every
+
+        self.completed = set()
+        self.array = None
+        self._pending = 0
+
+        state = self._read_state()
+        if state is not None and os.path.exists(partial_path(output_path)):
+            if state['fingerprint'] == fingerprint and state['rows'] == rows:
+                self.array = np.lib.format.open_memmap(partial_path(output_path), mode='r+')
+                self.completed = _from_ranges(state['completed'])
+            else:
+                print("⚠️ Checkpoint is for different chunks or settings; starting over")
+
+    def _read_state(self):
+        try:
+            with open(checkpoint_path(self.output_path), 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return state if state.get('version') == CHECKPOINT_VERSION else None
+
+    def _write_state(self):
+        state = {
+            'version': CHECKPOINT_VERSION,
+            'fingerprint': self.fingerprint,
+            'rows': self.rows,
+            'dim': self.array.shape[1] if self.array is not None else None,
+            'completed': _to_ranges(self.completed)
+        }
+        tmp_path = checkpoint_path(self.output_path) + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, checkpoint_path(self.output_path))
+
+    def write(self, batch_id: int, indices: np.ndarray, batch_embeddings: np.ndarray):
+        if self.array is None:
+            # The checkpoint goes down first so load_embeddings() refuses the
+            # target from the moment a partial file exists
+            self._write_state()
+            self.array = np.lib.format.open_memmap(partial_path(self.output_path), mode='w+',
+                                                   dtype='float32',
+                                                   shape=(self.rows, batch_embeddings.shape[1]))
+        self.array[indices] = batch_embeddings
+        self.completed.add(batch_id)
+
+        self._pending += 1
+        if self._pending >= self.checkpoint_every:
+            self.save()
+
+    def save(self):
+        """Flush rows to disk, then record them as done"""
+        if self.array is not None:
+            self.array.flush()
+        self._write_state()
+        self._pending = 0
+
+    def finalize(self) -> np.ndarray:
+        """Move the finished file into place and drop the checkpoint"""
+        self.array.flush()
+        del self.array
+        os.replace(partial_path(self.output_path), self.output_path)
+        os.remove(checkpoint_path(self.output_path))
+        return np.load(self.output_path, mmap_mode='r')
+
+
+def _fingerprint(texts: List[str], model_name: str, batch_size: int, bucketed: bool,
+                 max_seq_length: int) -> str:
+    """Identifies a run: resuming is only valid for the same chunks and batch plan"""
+    digest = hashlib.sha256()
+    digest.update(json.dumps([model_name, batch_size, bucketed, max_seq_length]).encode('utf-8'))
+    for text in texts:
+        digest.update(hashlib.sha256(text.encode('utf-8')).digest())
+    return digest.hexdigest()
+
+
+def load_tokenizer(model_name: str = MODEL_NAME):
+    """Tokenizer only (no weights), for length bucketing in the parent process"""
+    from transformers import AutoTokenizer
+
+    repo_id = model_name if '/' in model_name else f'sentence-transformers/{model_name}'
+    return AutoTokenizer.from_pretrained(repo_id)
+
+
+def token_lengths(tokenizer, texts: List[str], max_seq_length: int) -> np.ndarray:
+    """Token count per text (including special tokens), capped at max_seq_length"""
+    encoded = tokenizer(texts, add_special_tokens=True, truncation=True,
+                        max_length=max_seq_length)['input_ids']
+    return np.array([len(ids) for ids in encoded], dtype=np.int64)
+
+
+def make_batches(lengths: np.ndarray, batch_size: int, bucketed: bool = True) -> List[np.ndarray]:
+    """Split row indices into batches, sorted by length when bucketed"""
+    order = np.argsort(lengths, kind='stable') if bucketed else np.arange(len(lengths))
+    return [order[i:i + batch_size] for i in range(0, len(order), batch_size)]
+
+
+def padding_stats(lengths: np.ndarray, batches: List[np.ndarray]) -> Dict:
+    """Real vs padded tokens when each batch is padded to its longest member"""
+    real = int(lengths.sum())
+    padded = int(sum(len(b) * lengths[b].max() for b in batches if len(b)))
+    return {
+        'tokens': real,
+        'padded_tokens': padded,
+        'padding_waste': 1.0 - real / padded if padded else 0.0
+    }
+
+
+def _init_worker(model_name: str, threads: int):
+    """Pool initializer: pin thread counts before torch loads, then load the model"""
+    global _worker_model
+
+    for var in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS'):
+        os.environ[var] = str(threads)
+    os.environ['TOKENIZERS_PARALLELISM'] = 'false'
+
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    torch.set_num_threads(threads)
+    _worker_model = SentenceTransformer(model_name)
+
+
+def _encode_in_worker(batch: Tuple[int, np.ndarray, List[str]]):
+    batch_id, indices, texts = batch
+    embeddings = _worker_model.encode(texts, batch_size=len(texts), show_progress_bar=False)
+    return batch_id, indices, np.asarray(embeddings, dtype='float32')
+
+
+def encode_corpus(texts: List[str], model_name: str = MODEL_NAME, batch_size: int = 32,
+                  workers: int = 1, threads_per_worker: Optional[int] = None,
+                  bucketed: bool = True, model=None, tokenizer=None,
+                  max_seq_length: Optional[int] = None, progress: bool = True,
+                  output_path: Optional[str] = None, checkpoint_every: int = 10,
+                  store=None):
+    """
+    Encode a corpus in length buckets, optionally across worker processes
+
+    Args:
+        texts: Chunk texts
+        model_name: SentenceTransformer model to load
+        batch_size: Chunks per batch
+        workers: Encoder processes (1 = encode in this process)
+        threads_per_worker: torch threads per worker (default: cores / workers)
+        bucketed: Sort by token length before batching
+        model: Already-loaded SentenceTransformer (in-process mode only)
+        tokenizer: Tokenizer for length bucketing (default: the model's)
+        max_seq_length: Truncation length (default: the model's)
+        progress: Show a tqdm progress bar
+        output_path: Write a checkpointed .npy here (resumes an interrupted run)
+        checkpoint_every: Batches between checkpoint flushes
+        store: EmbeddingStore consulted per batch; only misses are encoded
+
+    Returns:
+        (embeddings in the original order, stats dict); with output_path the
+        embeddings are a read-only memmap of the finished file
+    """
+    from tqdm import tqdm
+
+    if workers <= 1 and model is None:
+        from sentence_transformers import SentenceTransformer
+        model = SentenceTransformer(model_name)
+
+    if model is not None:
+        tokenizer = tokenizer or model.tokenizer
+        max_seq_length = max_seq_length or model.max_seq_length
+    tokenizer = tokenizer or load_tokenizer(model_name)
+    max_seq_length = max_seq_length or DEFAULT_MAX_SEQ_LENGTH
+
+    lengths = token_lengths(tokenizer, texts, max_seq_length)
+    batches = make_batches(lengths, batch_size, bucketed=bucketed)
+    stats = padding_stats(lengths, batches)
+    stats['unbucketed_padding_waste'] = padding_stats(lengths, make_batches(lengths, batch_size, False))['padding_waste']
+
+    checkpoint = None
+    todo = list(enumerate(batches))
+    if output_path:
+        fingerprint = _fingerprint(texts, model_name, batch_size, bucketed, max_seq_length)
+        checkpoint = EmbeddingCheckpoint(output_path, fingerprint, len(texts), checkpoint_every)
+        todo = [(b, indices) for b, indices in todo if b not in checkpoint.completed]
+        if checkpoint.completed:
+            print(f"↩️  Resuming: {len(checkpoint.completed)}/{len(batches)} batches already written")
+
+    embeddings = None
+    start = time.perf_counter()
+
+    def place(batch_id, indices, batch_embeddings):
+        nonlocal embeddings
+        if checkpoint is not None:
+            checkpoint.write(batch_id, indices, batch_embeddings)
+            return
+        if embeddings is None:
+            embeddings = np.empty((len(texts), batch_embeddings.shape[1]), dtype='float32')
+        embeddings[indices] = batch_embeddings
+
+    encoded_rows = []
+
+    def lookup(indices):
+        """Stored vectors for a batch (None = miss) and the distinct texts to encode"""
+        batch_texts = [texts[i] for i in indices]
+        if store is None:
+            vectors, missing = [None] * len(indices), list(range(len(indices)))
+        else:
+            vectors, missing = store.get_many(batch_texts)
+        encoded_rows.extend(indices[missing])
+        return vectors, missing, list(dict.fromkeys(batch_texts[i] for i in missing))
+
+    def merge(indices, vectors, missing, miss_texts, encoded):
+        encoded = np.asarray(encoded, dtype='float32')
+        if store is not None:
+            store.put_many(miss_texts, encoded)
+        by_text = dict(zip(miss_texts, encoded))
+        for i in missing:
+            vectors[i] = by_text[texts[indices[i]]]
+        return np.vstack(vectors)
+
+    bar = tqdm(total=len(texts), initial=len(texts) - sum(len(i) for _, i in todo),
+               desc="Encoding", disable=not progress)
+    if workers <= 1:
+        for batch_id, indices in todo:
+            vectors, missing, miss_texts = lookup(indices)
+            encoded = []
+            if miss_texts:
+                encoded = model.encode(miss_texts, batch_size=len(miss_texts), show_progress_bar=False)
+            place(batch_id, indices, merge(indices, vectors, missing, miss_texts, encoded))
+            bar.update(len(indices))
+    else:
+        import multiprocessing
+
+        threads = threads_per_worker or max(1, (os.cpu_count() or 1) // workers)
+        # Longest batches first so no worker is left with a long tail at the end
+        jobs = sorted(todo, key=lambda job: -int(lengths[job[1]].max()) * len(job[1]))
+
+        # spawn: workers must not inherit a parent torch thread pool
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                 initializer=_init_worker, initargs=(model_name, threads)) as executor:
+            futures, pending = [], {}
+            for batch_id, indices in jobs:
+                vectors, missing, miss_texts = lookup(indices)
+                if not miss_texts:
+                    place(batch_id, indices, np.vstack(vectors))
+                    bar.update(len(indices))
+                    continue
+                pending[batch_id] = (indices, vectors, missing, miss_texts)
+                futures.append(executor.submit(_encode_in_worker, (batch_id, indices[missing], miss_texts)))
+            for future in as_completed(futures):
+                batch_id, _, encoded = future.result()
+                indices, vectors, missing, miss_texts = pending.pop(batch_id)
+                place(batch_id, indices, merge(indices, vectors, missing, miss_texts, encoded))
+                bar.update(len(indices))
+        stats['threads_per_worker'] = threads
+    bar.close()
+
+    seconds = time.perf_counter() - start
+    if checkpoint is not None and checkpoint.array is not None:
+        checkpoint.save()
+        embeddings = checkpoint.finalize()
+    if embeddings is None:
+        embeddings = np.zeros((0, 0), dtype='float32')
+
+    # Throughput counts only what the model encoded in this run
+    encoded_tokens = int(lengths[encoded_rows].sum()) if encoded_rows else 0
+    encoded_chunks = len(encoded_rows)
+    stats.update({
+        'chunks': len(texts),
+        'batches': len(batches),
+        'resumed_batches': len(batches) - len(todo),
+        'store_hits': sum(len(i) for _, i in todo) - encoded_chunks,
+        'encoded_chunks': encoded_chunks,
+        'workers': max(1, workers),
+        'seconds': seconds,
+        'tokens_per_sec': encoded_tokens / seconds if seconds > 0 else 0.0,
+        'chunks_per_sec': encoded_chunks / seconds if seconds > 0 else 0.0
+    })
+    return embeddings, stats
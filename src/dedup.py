@@ -0,0 +1,160 @@
+"""
+Near-duplicate chunk detection with MinHash and LSH banding.
+
+Chunks are shingled into word n-grams of their normalized text, summarized
+by MinHash signatures, and bucketed band by band; only chunks sharing a
+bucket are compared exactly. Near-duplicates are clustered and the first
+chunk of each cluster (in corpus order) is kept as canonical.
+"""
+import zlib
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from preprocessing import normalize_arabic
+
+# Prime just above 2**32; with multipliers below 2**31, a*h + b fits in uint64
+_PRIME = np.uint64(4294967311)
+
+
+def shingles(text: str, size: int = 3) -> set:
+    """Word n-grams of the normalized text (the whole text if it is shorter)"""
+    words = normalize_arabic(text).split()
+    if len(words) <= size:
+        return {' '.join(words)} if words else set()
+    return {' '.join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def jaccard(a: set, b: set) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def choose_bands(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """(bands, rows) whose LSH S-curve threshold (1/b)^(1/r) is closest to threshold"""
+    options = [(b, num_perm // b) for b in range(1, num_perm + 1) if num_perm % b == 0]
+    return min(options, key=lambda br: abs((1.0 / br[0]) ** (1.0 / br[1]) - threshold))
+
+
+class _UnionFind:
+    def __init__(self, n):
+        self.parent = list(range(n))
+
+    def find(self, x):
+        while self.parent[x] != x:
+            self.parent[x] = self.parent[self.parent[x]]
+            x = self.parent[x]
+        return x
+
+    def union(self, a, b):
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            # Lower index wins so the canonical member is the earliest chunk
+            self.parent[max(ra, rb)] = min(ra, rb)
+
+
+class MinHashDeduplicator:
+    """Clusters near-duplicate texts by estimated Jaccard similarity of shingles"""
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 128, shingle_size: int = 3, seed: int = 1):
+        """
+        Initialize deduplicator
+
+        Args:
+            threshold: Minimum shingle Jaccard similarity to count as a duplicate
+            num_perm: MinHash signature length
+            shingle_size: Words per shingle
+            seed: Seed for the hash permutations (fixed for reproducible builds)
+        """
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.bands, self.rows = choose_bands(num_perm, threshold)
+
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, 2 ** 31, size=num_perm).astype(np.uint64)
+        self._b = rng.randint(0, 2 ** 31, size=num_perm).astype(np.uint64)
+
+    def signature(self, shingle_set: set) -> np.ndarray:
+        """MinHash signature of a shingle set"""
+        if not shingle_set:
+            return np.full(self.num_perm, _PRIME, dtype=np.uint64)
+        # crc32 is stable across processes, unlike hash()
+        hashes = np.array([zlib.crc32(s.encode('utf-8')) for s in shingle_set], dtype=np.uint64)
+        return ((self._a[:, None] * hashes[None, :] + self._b[:, None]) % _PRIME).min(axis=1)
+
+    def find_duplicates(self, texts: List[str]) -> Dict:
+        """
+        Cluster near-duplicate texts
+
+        Returns:
+            {'canonical': canonical index per text (itself if canonical),
+             'similarity': Jaccard similarity to its canonical per text}
+
+        Clusters are transitive, so a member can sit below threshold with
+        respect to the canonical chunk while matching another member.
+        """
+        shingle_sets = [shingles(t, self.shingle_size) for t in texts]
+        signatures = [self.signature(s) for s in shingle_sets]
+
+        clusters = _UnionFind(len(texts))
+        checked = set()
+
+        # Texts sharing a band bucket are candidates. Each is compared against
+        # the bucket's cluster representatives rather than every member, so a
+        # block of identical boilerplate costs O(n) comparisons, not O(n^2).
+        for band in range(self.bands):
+            buckets = {}
+            lo, hi = band * self.rows, (band + 1) * self.rows
+            for i, sig in enumerate(signatures):
+                buckets.setdefault(sig[lo:hi].tobytes(), []).append(i)
+
+            for members in buckets.values():
+                representatives = []
+                for m in members:
+                    for r in representatives:
+                        if clusters.find(r) == clusters.find(m):
+                            break
+                        if (r, m) in checked:
+                            continue
+                        checked.add((r, m))
+                        # Exact Jaccard drops LSH false positives
+                        if jaccard(shingle_sets[r], shingle_sets[m]) >= self.threshold:
+                            clusters.union(r, m)
+                            break
+                    else:
+                        representatives.append(m)
+
+        canonical = [clusters.find(i) for i in range(len(texts))]
+        similarity = [1.0 if c == i else jaccard(shingle_sets[i], shingle_sets[c])
+                      for i, c in enumerate(canonical)]
+        return {'canonical': canonical, 'similarity': similarity}
+
+
+def dedup_report(canonical: List[int], categories: List[str] = None) -> Dict:
+    """Duplicate counts and ratios, overall and per category"""
+    total = len(canonical)
+    duplicates = sum(1 for i, c in enumerate(canonical) if c != i)
+    cluster_sizes = np.bincount(canonical, minlength=total) if total else np.zeros(0, dtype=int)
+
+    report = {
+        'chunks': total,
+        'unique': total - duplicates,
+        'duplicates': duplicates,
+        'dedup_ratio': duplicates / total if total else 0.0,
+        'clusters_with_duplicates': int((cluster_sizes > 1).sum()),
+        'largest_cluster': int(cluster_sizes.max()) if total else 0
+    }
+
+    if categories is not None:
+        per_category = {}
+        for i, (c, cat) in enumerate(zip(canonical, categories)):
+            stats = per_category.setdefault(cat, {'chunks': 0, 'duplicates': 0})
+            stats['chunks'] += 1
+            stats['duplicates'] += int(c != i)
+        for stats in per_category.values():
+            stats['dedup_ratio'] = stats['duplicates'] / stats['chunks']
+        report['per_category'] = per_category
+
+    return report
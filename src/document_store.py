@@ -0,0 +1,121 @@
+"""Process-wide cache of source documents and their translations"""
+import os
+import sys
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional
+
+
+class DocumentStore:
+    """
+    Memory-bounded LRU cache for full source documents and translated copies.
+
+    Shared by all sessions in the process. Every lookup compares the file's
+    (mtime, size) with the cached signature, so edited files are re-read and
+    their stale translations dropped.
+    """
+
+    def __init__(self, data_dir: str = 'data', max_bytes: int = 64 * 1024 * 1024):
+        """
+        Initialize document store
+
+        Args:
+            data_dir: Root directory containing {category}/{source_file}
+            max_bytes: Memory budget for cached documents and translations
+        """
+        self.data_dir = Path(data_dir)
+        self.max_bytes = max_bytes
+
+        self._entries = OrderedDict()  # key -> (signature, text, nbytes)
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def _path(self, category: str, source_file: str) -> Path:
+        return self.data_dir / category / source_file
+
+    @staticmethod
+    def _signature(path: Path):
+        stat = os.stat(path)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _lookup(self, key, signature) -> Optional[str]:
+        """Return a fresh cached entry (and mark it recently used), or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == signature:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return entry[1]
+
+            if entry is not None:
+                # File changed since it was cached
+                self._total_bytes -= entry[2]
+                del self._entries[key]
+            self._misses += 1
+            return None
+
+    def _store(self, key, signature, text: str):
+        nbytes = sys.getsizeof(text)
+        if nbytes > self.max_bytes:
+            return
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._total_bytes -= old[2]
+
+            self._entries[key] = (signature, text, nbytes)
+            self._total_bytes += nbytes
+
+            while self._total_bytes > self.max_bytes:
+                _, (_, _, evicted_bytes) = self._entries.popitem(last=False)
+                self._total_bytes -= evicted_bytes
+                self._evictions += 1
+
+    def get(self, category: str, source_file: str) -> str:
+        """Return the full document text, reading from disk only on a miss"""
+        path = self._path(category, source_file)
+        signature = self._signature(path)
+        key = ('doc', category, source_file)
+
+        text = self._lookup(key, signature)
+        if text is None:
+            with open(path, 'r', encoding='utf-8') as f:
+                text = f.read()
+            self._store(key, signature, text)
+
+        return text
+
+    def get_translation(self, category: str, source_file: str, language: str) -> Optional[str]:
+        """Return a cached translation of the current file version, if any"""
+        signature = self._signature(self._path(category, source_file))
+        return self._lookup(('translation', category, source_file, language), signature)
+
+    def put_translation(self, category: str, source_file: str, language: str, text: str):
+        """Cache a translation for all sessions"""
+        signature = self._signature(self._path(category, source_file))
+        self._store(('translation', category, source_file, language), signature, text)
+
+    def preload(self) -> int:
+        """Read all documents under data_dir into the cache (LRU-evicting past the budget)"""
+        loaded = 0
+        for path in sorted(self.data_dir.glob('*/*.txt')):
+            self.get(path.parent.name, path.name)
+            loaded += 1
+        return loaded
+
+    def get_stats(self) -> Dict:
+        """Get cache statistics"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self._hits,
+                'misses': self._misses,
+                'evictions': self._evictions
+            }
@@ -0,0 +1,176 @@
+"""
+Content-addressed embedding store.
+
+Vectors are kept in a local SQLite file keyed by (model id, SHA-256 of the
+whitespace-normalized text), so identical text is encoded once per model no
+matter which script, experiment or rebuild asks for it. CachedEncoder wraps a
+model and sends only cache misses to it.
+"""
+import hashlib
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+DEFAULT_STORE_PATH = 'index/embedding_store.sqlite'
+
+# SQLite's default limit on bound parameters is 999
+_LOOKUP_BATCH = 900
+
+# encode() options that never change the vectors
+_NEUTRAL_KWARGS = ('batch_size', 'show_progress_bar', 'device')
+
+
+def text_key(text: str) -> bytes:
+    """Hash of the text with runs of whitespace collapsed and ends stripped"""
+    return hashlib.sha256(' '.join(text.split()).encode('utf-8')).digest()
+
+
+class EmbeddingStore:
+    """SQLite-backed map from (model id, text hash) to a float32 vector"""
+
+    def __init__(self, model_id: str, path: str = DEFAULT_STORE_PATH):
+        """
+        Open (or create) an embedding store
+
+        Args:
+            model_id: Identifies the encoder; vectors never mix across models
+            path: SQLite file, shared safely between processes
+        """
+        self.model_id = model_id
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS embeddings ('
+            ' model TEXT NOT NULL, key BLOB NOT NULL, vector BLOB NOT NULL,'
+            ' PRIMARY KEY (model, key))'
+        )
+        self._conn.commit()
+
+    def _model_key(self, variant: str) -> str:
+        return f'{self.model_id}|{variant}' if variant else self.model_id
+
+    def get_many(self, texts: List[str],
+                 variant: str = '') -> Tuple[List[Optional[np.ndarray]], List[int]]:
+        """
+        Look up texts
+
+        Args:
+            texts: Texts to look up
+            variant: Encode options the vectors were computed with ('' = defaults)
+
+        Returns:
+            (vectors with None for misses, indices of the misses)
+        """
+        model_key = self._model_key(variant)
+        keys = [text_key(t) for t in texts]
+        found = {}
+
+        with self._lock:
+            unique = list(dict.fromkeys(keys))
+            for i in range(0, len(unique), _LOOKUP_BATCH):
+                part = unique[i:i + _LOOKUP_BATCH]
+                rows = self._conn.execute(
+                    f'SELECT key, vector FROM embeddings WHERE model = ? '
+                    f'AND key IN ({",".join("?" * len(part))})',
+                    [model_key, *part]
+                ).fetchall()
+                found.update((key, np.frombuffer(vector, dtype='float32')) for key, vector in rows)
+
+        vectors = [found.get(key) for key in keys]
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+        return vectors, missing
+
+    def put_many(self, texts: List[str], vectors: np.ndarray, variant: str = ''):
+        """Store vectors for texts (existing entries are kept)"""
+        vectors = np.asarray(vectors, dtype='float32')
+        model_key = self._model_key(variant)
+        rows = [(model_key, text_key(t), v.tobytes()) for t, v in zip(texts, vectors)]
+        with self._lock:
+            self._conn.executemany(
+                'INSERT OR IGNORE INTO embeddings (model, key, vector) VALUES (?, ?, ?)', rows
+            )
+            self._conn.commit()
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            entries = self._conn.execute(
+                'SELECT COUNT(*) FROM embeddings WHERE model = ?', [self.model_id]
+            ).fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            'model': self.model_id,
+            'entries': entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class CachedEncoder:
+    """Drop-in for SentenceTransformer.encode that consults an EmbeddingStore first"""
+
+    def __init__(self, model, store: EmbeddingStore, persist_misses: bool = True):
+        """
+        Args:
+            model: SentenceTransformer (or compatible encoder)
+            store: Where vectors are looked up
+            persist_misses: Write newly encoded vectors to the store. The app
+                passes False so user queries are looked up but never stored.
+        """
+        self.model = model
+        self.store = store
+        self.persist_misses = persist_misses
+
+    @staticmethod
+    def _variant(kwargs: Dict) -> str:
+        """Store variant for the encode options, rejecting options it can't key on"""
+        unsupported = sorted(k for k in kwargs if k not in _NEUTRAL_KWARGS + ('normalize_embeddings',))
+        if unsupported:
+            raise TypeError(f"CachedEncoder.encode does not support {', '.join(unsupported)}")
+        return 'normalized' if kwargs.get('normalize_embeddings') else ''
+
+    def encode(self, sentences: Union[str, List[str]], **kwargs) -> np.ndarray:
+        """
+        Encode like SentenceTransformer.encode; only cache misses reach the model
+
+        A single string returns one vector, a list returns a (n, d) array.
+        """
+        variant = self._variant(kwargs)
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if not texts:
+            return self.model.encode(texts, **kwargs)
+
+        vectors, missing = self.store.get_many(texts, variant)
+        if missing:
+            # Encode each distinct missing text once
+            miss_texts = list(dict.fromkeys(texts[i] for i in missing))
+            encoded = np.asarray(self.model.encode(miss_texts, **kwargs), dtype='float32')
+            if self.persist_misses:
+                self.store.put_many(miss_texts, encoded, variant)
+
+            by_text = dict(zip(miss_texts, encoded))
+            for i in missing:
+                vectors[i] = by_text[texts[i]]
+
+        result = np.vstack(vectors).astype('float32')
+        return result[0] if single else result
+
+    def __getattr__(self, name):
+        # tokenizer, max_seq_length, get_sentence_embedding_dimension, ...
+        if name == 'model':
+            raise AttributeError(name)
+        return getattr(self.model, name)
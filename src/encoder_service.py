@@ -0,0 +1,152 @@
+"""Micro-batching encoder service for concurrent query encoding"""
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+from queue import Queue, Empty
+from typing import List, Dict, Union
+
+import numpy as np
+
+# encode() options that don't change the vectors
+_IGNORED_KWARGS = ('batch_size', 'show_progress_bar', 'device', 'convert_to_numpy')
+
+
+class BatchingEncoder:
+    """
+    Wraps a SentenceTransformer and encodes concurrent requests in shared batches.
+
+    Callers submit single texts; a background thread collects them until either
+    `max_batch_size` texts are queued or `max_wait_ms` has passed since the first
+    one arrived, then runs one forward pass and resolves each caller's future.
+    """
+
+    def __init__(self, model, max_batch_size: int = 32, max_wait_ms: float = 5.0):
+        """
+        Initialize encoder service
+
+        Args:
+            model: Loaded SentenceTransformer (anything with .encode(list))
+            max_batch_size: Flush as soon as this many texts are queued
+            max_wait_ms: Maximum time the first queued text waits for company
+        """
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._queue = Queue()
+        self._stats_lock = threading.Lock()
+        self._batch_sizes = Counter()
+        self._queue_depths = Counter()
+        self._total_requests = 0
+        self._total_batches = 0
+        self._closed = False
+
+        self._worker = threading.Thread(target=self._run, name="batching-encoder", daemon=True)
+        self._worker.start()
+
+    def submit(self, text: str) -> Future:
+        """Queue a text for encoding and return a future for its vector"""
+        if self._closed:
+            raise RuntimeError("BatchingEncoder is closed")
+
+        future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def encode(self, sentences: Union[str, List[str]], timeout: float = None, **kwargs) -> np.ndarray:
+        """
+        Encode one text (returns a vector) or a list of texts (returns a matrix).
+
+        Accepting a list keeps the call sites written for SentenceTransformer
+        (`model.encode([query])[0]`) working unchanged. Options that don't change
+        the vectors (batch_size, show_progress_bar, ...) are accepted and ignored;
+        batches are formed and encoded by the worker thread.
+        """
+        unsupported = sorted(k for k in kwargs if k not in _IGNORED_KWARGS)
+        if unsupported:
+            raise TypeError(f"BatchingEncoder.encode does not support {', '.join(unsupported)}")
+
+        if isinstance(sentences, str):
+            return self.submit(sentences).result(timeout=timeout)
+
+        futures = [self.submit(s) for s in sentences]
+        if not futures:
+            return np.empty((0, self.model.get_sentence_embedding_dimension()), dtype='float32')
+        return np.vstack([f.result(timeout=timeout) for f in futures])
+
+    def _collect_batch(self):
+        """Block for the first request, then gather more until size or time limit"""
+        item = self._queue.get()
+        if item is None:
+            return None
+
+        batch = [item]
+        deadline = time.monotonic() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except Empty:
+                break
+            if item is None:
+                # Shutdown requested: finish this batch, then stop
+                self._queue.put(None)
+                break
+            batch.append(item)
+
+        return batch
+
+    def _run(self):
+        """Worker loop: collect a batch, run one forward pass, resolve futures"""
+        while True:
+            batch = self._collect_batch()
+            if batch is None:
+                break
+
+            # Skip requests whose callers already gave up
+            batch = [(text, future) for text, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            with self._stats_lock:
+                self._batch_sizes[len(batch)] += 1
+                self._queue_depths[self._queue.qsize()] += 1
+                self._total_requests += len(batch)
+                self._total_batches += 1
+
+            try:
+                vectors = self.model.encode([text for text, _ in batch], show_progress_bar=False)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            for (_, future), vector in zip(batch, vectors):
+                future.set_result(vector)
+
+    def get_stats(self) -> Dict:
+        """Get batching statistics for tuning batch size against latency"""
+        with self._stats_lock:
+            avg_batch = self._total_requests / self._total_batches if self._total_batches else 0.0
+            return {
+                'queue_depth': self._queue.qsize(),
+                'total_requests': self._total_requests,
+                'total_batches': self._total_batches,
+                'avg_batch_size': avg_batch,
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000.0,
+                'batch_size_histogram': dict(sorted(self._batch_sizes.items())),
+                'queue_depth_histogram': dict(sorted(self._queue_depths.items()))
+            }
+
+    def close(self):
+        """Stop accepting requests and wait for queued ones to finish"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._worker.join()
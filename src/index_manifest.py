@@ -0,0 +1,94 @@
+"""Content-hash manifest linking source files to their chunk and embedding rows"""
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional
+
+# 2: chunking settings beyond chunk_size/overlap are recorded (see chunking_options)
+MANIFEST_VERSION = 2
+
+
+def file_sha256(filepath: str) -> str:
+    """Hash a source file's bytes"""
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunking_options(chunk_size: int = 512, overlap: int = 128, strategy: str = 'chars',
+                     max_seq_length: int = 128, overlap_tokens: int = 16,
+                     dedup: bool = False) -> Dict:
+    """Every setting that changes which chunks (and so which rows) a build produces"""
+    return {
+        'chunk_size': chunk_size,
+        'overlap': overlap,
+        'strategy': strategy,
+        'max_seq_length': max_seq_length,
+        'overlap_tokens': overlap_tokens,
+        'dedup': dedup
+    }
+
+
+def new_manifest(model_name: str, chunking: Dict) -> Dict:
+    """Empty manifest for a given build configuration (chunking from chunking_options)"""
+    return {
+        'version': MANIFEST_VERSION,
+        'model': model_name,
+        'chunking': dict(chunking),
+        'total_rows': 0,
+        'files': {}
+    }
+
+
+def load_manifest(path: str) -> Optional[Dict]:
+    """Load a manifest, or None if missing or from an older format"""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('version') != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def save_manifest(path: str, manifest: Dict):
+    """Write manifest atomically (it is the last artifact written in a build)"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def is_compatible(manifest: Optional[Dict], model_name: str, chunking: Dict) -> bool:
+    """True if existing artifacts were built with the same model and chunking"""
+    return (manifest is not None
+            and manifest['model'] == model_name
+            and manifest['chunking'] == chunking)
+
+
+def plan_rebuild(manifest: Optional[Dict], current_hashes: Dict[str, str]) -> Dict[str, List[str]]:
+    """
+    Compare current source files with the manifest
+
+    Args:
+        manifest: Previous manifest (None means everything is new)
+        current_hashes: {filepath: sha256} for files now in data/
+
+    Returns:
+        {'added', 'changed', 'removed', 'unchanged'} lists of file paths
+    """
+    previous = manifest['files'] if manifest else {}
+
+    plan = {'added': [], 'changed': [], 'removed': [], 'unchanged': []}
+    for filepath, sha in current_hashes.items():
+        if filepath not in previous:
+            plan['added'].append(filepath)
+        elif previous[filepath]['sha256'] != sha:
+            plan['changed'].append(filepath)
+        else:
+            plan['unchanged'].append(filepath)
+
+    plan['removed'] = [f for f in previous if f not in current_hashes]
+    return plan
@@ -0,0 +1,262 @@
+"""
+Versioned index snapshots with an atomic "current" pointer.
+
+Layout:
+    index/snapshots/<version>/{embeddings.npy, corpus_chunks.json, corpus_meta.json}
+    index/snapshots/CURRENT      one line: the active version
+
+A snapshot directory is fully written under a temporary name and renamed into
+place before CURRENT is switched with os.replace, so readers only ever see a
+complete snapshot. HotSwapRetriever watches CURRENT, loads the new version next
+to the old one and swaps the reference; in-flight searches finish on the old
+retriever.
+"""
+import json
+import os
+import shutil
+import threading
+import time
+from typing import Dict, List, Optional
+
+SNAPSHOT_ROOT = 'index/snapshots'
+CURRENT_FILE = 'CURRENT'
+SNAPSHOT_FILES = ('embeddings.npy', 'corpus_chunks.json', 'corpus_meta.json')
+
+
+def snapshot_paths(snapshot_dir: str) -> List[str]:
+    """Artifact paths in RetrieverSystem argument order"""
+    return [os.path.join(snapshot_dir, name) for name in SNAPSHOT_FILES]
+
+
+def validate_snapshot(snapshot_dir: str):
+    """
+    Check that a snapshot's artifacts line up row for row
+
+    Raises:
+        ValueError: If metadata or embedding rows don't match the chunks
+            (IncompleteEmbeddingsError for the embeddings)
+    """
+    from corpus_encoder import load_embeddings
+
+    embeddings_path, chunks_path, metadata_path = snapshot_paths(snapshot_dir)
+    with open(chunks_path, 'r', encoding='utf-8') as f:
+        n_chunks = len(json.load(f))
+    with open(metadata_path, 'r', encoding='utf-8') as f:
+        n_metadata = len(json.load(f))
+    if n_metadata != n_chunks:
+        raise ValueError(f"{metadata_path} has {n_metadata} entries but {n_chunks} chunks were expected")
+    load_embeddings(embeddings_path, expected_rows=n_chunks, mmap_mode='r')
+
+
+def read_current(root: str = SNAPSHOT_ROOT) -> Optional[str]:
+    """Active snapshot version, or None if nothing has been published"""
+    try:
+        with open(os.path.join(root, CURRENT_FILE), 'r', encoding='utf-8') as f:
+            version = f.read().strip()
+    except OSError:
+        return None
+    if not version or not os.path.isdir(os.path.join(root, version)):
+        return None
+    return version
+
+
+def _timestamp_version() -> str:
+    """UTC timestamp with microseconds, e.g. 20250101-120000-123456"""
+    now = time.time()
+    return time.strftime('%Y%m%d-%H%M%S', time.gmtime(now)) + f'-{int(now % 1 * 1e6):06d}'
+
+
+def _reserve_tmp_dir(root: str, version: Optional[str]):
+    """
+    Claim a snapshot name by creating its .tmp directory exclusively
+
+    An explicit version must be unused; a generated one gets a -N suffix if
+    another publisher claimed the same timestamp.
+    """
+    os.makedirs(root, exist_ok=True)
+    base = version or _timestamp_version()
+    for attempt in range(1000):
+        candidate = base if attempt == 0 else f'{base}-{attempt}'
+        final_dir = os.path.join(root, candidate)
+        if os.path.exists(final_dir):
+            if version:
+                raise FileExistsError(f"Snapshot {version} already exists")
+            continue
+        try:
+            os.mkdir(final_dir + '.tmp')
+        except FileExistsError:
+            if version:
+                raise FileExistsError(f"Snapshot {version} is being published") from None
+            continue
+        return candidate, final_dir
+    raise FileExistsError(f"No free snapshot name for {base}")
+
+
+def publish_snapshot(source_dir: str = 'index', root: str = SNAPSHOT_ROOT,
+                     version: str = None) -> str:
+    """
+    Copy the built artifacts into a new snapshot and make it current
+
+    Args:
+        source_dir: Directory holding the freshly built artifacts
+        root: Snapshot root directory
+        version: Snapshot name (default: UTC timestamp with microseconds)
+
+    Returns:
+        The published version
+
+    Raises:
+        ValueError: If the artifacts don't line up (nothing is published)
+    """
+    version, final_dir = _reserve_tmp_dir(root, version)
+
+    tmp_dir = final_dir + '.tmp'
+    try:
+        for name in SNAPSHOT_FILES:
+            shutil.copy2(os.path.join(source_dir, name), os.path.join(tmp_dir, name))
+        # A broken build must never become CURRENT: restarts would fail to load it
+        validate_snapshot(tmp_dir)
+        os.rename(tmp_dir, final_dir)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    # Switch the pointer last; os.replace is atomic on POSIX and Windows
+    tmp_pointer = os.path.join(root, f'{CURRENT_FILE}.{version}.tmp')
+    with open(tmp_pointer, 'w', encoding='utf-8') as f:
+        f.write(version + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_pointer, os.path.join(root, CURRENT_FILE))
+
+    return version
+
+
+def list_snapshots(root: str = SNAPSHOT_ROOT) -> List[str]:
+    """Published snapshot versions, oldest first (by publish time, then name)"""
+    versions = []
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        if os.path.isdir(path) and not name.endswith('.tmp'):
+            # rename() doesn't touch the directory's own mtime: it is the time
+            # the last artifact was copied in, i.e. just before publishing
+            versions.append((os.stat(path).st_mtime_ns, name))
+    return [name for _, name in sorted(versions)]
+
+
+def prune_snapshots(root: str = SNAPSHOT_ROOT, keep: int = 3) -> List[str]:
+    """Delete all but the newest `keep` snapshots (never the current one)"""
+    current = read_current(root)
+    versions = list_snapshots(root)
+
+    removed = []
+    for version in versions[:-keep] if keep > 0 else versions:
+        if version != current:
+            shutil.rmtree(os.path.join(root, version))
+            removed.append(version)
+    return removed
+
+
+class HotSwapRetriever:
+    """RetrieverSystem proxy that follows the current snapshot without downtime"""
+
+    def __init__(self, root: str = SNAPSHOT_ROOT, fallback_dir: str = 'index'):
+        """
+        Initialize hot-swap retriever
+
+        Args:
+            root: Snapshot root directory
+            fallback_dir: Artifacts to serve when no snapshot has been published
+        """
+        self.root = root
+        self.fallback_dir = fallback_dir
+
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.swaps = 0
+        self.last_error = None
+
+        self.version, self._retriever = self._load_initial(read_current(root))
+
+    def _load_initial(self, version: Optional[str]):
+        """Load the current snapshot, else the newest one that loads, else fallback_dir"""
+        if version is None:
+            return self._load(None)
+
+        candidates = [version] + [v for v in reversed(list_snapshots(self.root)) if v != version]
+        for candidate in candidates:
+            try:
+                return self._load(candidate)
+            except Exception as e:
+                if self.last_error is None:
+                    self.last_error = f"{candidate}: {e}"
+                print(f"⚠️ Failed to load index snapshot {candidate}: {e}")
+        return self._load(None)
+
+    def _load(self, version: Optional[str]):
+        from retrieval import RetrieverSystem
+
+        snapshot_dir = os.path.join(self.root, version) if version else self.fallback_dir
+        return version, RetrieverSystem(*snapshot_paths(snapshot_dir))
+
+    @property
+    def retriever(self):
+        return self._retriever
+
+    def check_for_update(self) -> bool:
+        """Load and swap in the current snapshot if it changed; True if swapped"""
+        with self._reload_lock:
+            version = read_current(self.root)
+            if version is None or version == self.version:
+                return False
+
+            try:
+                # Built next to the old retriever, which keeps serving meanwhile
+                version, retriever = self._load(version)
+            except Exception as e:
+                self.last_error = f"{version}: {e}"
+                print(f"⚠️ Failed to load index snapshot {version}: {e}")
+                return False
+
+            # Single reference assignment: each search sees one version or the other
+            self._retriever = retriever
+            self.version = version
+            self.swaps += 1
+            self.last_error = None
+
+        print(f"✅ Switched to index snapshot {version}")
+        return True
+
+    def start(self, poll_interval: float = 5.0):
+        """Poll the CURRENT pointer in a background thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._watch, args=(poll_interval,),
+                                            name="index-snapshot-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def _watch(self, poll_interval: float):
+        while not self._stop.wait(poll_interval):
+            self.check_for_update()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def search(self, query_embedding, k: int = 10, query_text: str = None) -> List[Dict]:
+        return self._retriever.search(query_embedding, k=k, query_text=query_text)
+
+    def get_stats(self) -> Dict:
+        stats = self._retriever.get_stats()
+        stats['snapshot_version'] = self.version
+        stats['snapshot_swaps'] = self.swaps
+        return stats
+
+    def __getattr__(self, name):
+        # Everything else (chunks, metadata, add_documents, ...) goes to the live retriever
+        if name == '_retriever':
+            raise AttributeError(name)
+        return getattr(self._retriever, name)
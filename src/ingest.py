@@ -0,0 +1,131 @@
+"""
+Streaming ingest pipeline: directory walk → documents → chunks → embeddings.
+
+Every stage is a generator, so only one document and one embedding batch are
+held in memory at a time regardless of corpus size. Used by
+`process_all_documents.py --stream` and `generate_embeddings.py --stream`.
+"""
+import json
+import os
+import textwrap
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from preprocessing import ArabicPreprocessor
+from chunking import chunk_text, chunk_text_by_tokens, MAX_SEQ_LENGTH
+
+
+def iter_source_files(data_dir: str = 'data',
+                      categories: Optional[List[str]] = None) -> Iterator[Tuple[str, Path]]:
+    """
+    Yield (category, filepath) for every .txt file under data_dir
+
+    Args:
+        categories: Category directories in build order (default: all, sorted)
+    """
+    data_dir = Path(data_dir)
+    if categories is None:
+        categories = sorted(d.name for d in data_dir.iterdir()
+                            if d.is_dir() and d.name != 'archive_backup')
+    for category in categories:
+        for filepath in sorted((data_dir / category).glob('*.txt')):
+            yield category, filepath
+
+
+def iter_chunk_records(data_dir: str = 'data', chunk_size: int = 512, overlap: int = 128,
+                       categories: Optional[List[str]] = None, strategy: str = 'chars',
+                       max_seq_length: int = MAX_SEQ_LENGTH,
+                       overlap_tokens: int = 16) -> Iterator[Dict]:
+    """
+    Lazily yield one record per chunk from a directory walk
+
+    Chunking options match chunk_document. 'source_file' is the bare file name,
+    as in corpus_meta.json; DocumentStore finds it under data/<category>/.
+
+    Yields:
+        {'chunk', 'category', 'source_file', 'filepath', 'chunk_id', 'chunk_length'}
+    """
+    preprocessor = ArabicPreprocessor()
+
+    for category, filepath in iter_source_files(data_dir, categories):
+        text = preprocessor.load_document(filepath)
+        if strategy == 'tokens':
+            chunks = chunk_text_by_tokens(text, max_seq_length=max_seq_length,
+                                          overlap_tokens=overlap_tokens)
+        else:
+            chunks = chunk_text(text, chunk_size=chunk_size, overlap=overlap)
+
+        for i, chunk in enumerate(chunks):
+            yield {
+                'chunk': chunk,
+                'category': category,
+                'source_file': filepath.name,
+                'filepath': str(filepath),
+                'chunk_id': i,
+                'chunk_length': len(chunk)
+            }
+
+
+def iter_batches(records: Iterable[Dict], batch_size: int = 32) -> Iterator[List[Dict]]:
+    """Group a record stream into lists of at most batch_size"""
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def iter_embedded_batches(model, records: Iterable[Dict],
+                          batch_size: int = 32) -> Iterator[Tuple[List[Dict], np.ndarray]]:
+    """
+    Encode a record stream batch by batch
+
+    Yields:
+        (records, embeddings) with embeddings[i] belonging to records[i]
+    """
+    for batch in iter_batches(records, batch_size):
+        embeddings = model.encode([r['chunk'] for r in batch], show_progress_bar=False)
+        yield batch, np.asarray(embeddings, dtype='float32')
+
+
+class JsonArrayWriter:
+    """
+    Writes a JSON array one item at a time; the file appears atomically on close
+
+    The output is byte-identical to json.dump(items, f, ensure_ascii=False, indent=2).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.count = 0
+        self._tmp_path = path + '.tmp'
+        self._file = open(self._tmp_path, 'w', encoding='utf-8')
+        self._file.write('[')
+
+    def append(self, item):
+        self._file.write(',\n' if self.count else '\n')
+        self._file.write(textwrap.indent(json.dumps(item, ensure_ascii=False, indent=2), '  '))
+        self.count += 1
+
+    def close(self):
+        if self._file.closed:
+            return
+        self._file.write('\n]' if self.count else ']')
+        self._file.close()
+        os.replace(self._tmp_path, self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            # Keep the previous complete file rather than a truncated one
+            self._file.close()
+            os.remove(self._tmp_path)
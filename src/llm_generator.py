@@ -1,64 +1,23 @@
 """LLM-based answer generation using Google Gemini"""
 import os
-from google import generativeai as genai
-from dotenv import load_dotenv
 from typing import List, Dict
 
-load_dotenv()
-
-class AnswerGenerator:
-    """Generate answers using Google Gemini with automatic fallback"""
-    
-    def __init__(self, model_names: List[str] = None):
-        """Initialize Gemini with multiple model fallbacks"""
-        api_key = os.getenv('GEMINI_API_KEY')
-        
-        if not api_key:
-            raise ValueError("GEMINI_API_KEY not found in .env file")
-        
-        genai.configure(api_key=api_key)
-        
-        # Default models to try in order (free tier models, newest first)
-        if model_names is None:
-            self.model_names = [
-                "gemini-2.5-flash",          # Newest and fastest (WORKS)
-                "gemini-2.5-flash-lite",     # Lighter version (WORKS)
-                "gemini-flash-latest",       # Latest stable alias (WORKS)
-                "gemini-flash-lite-latest"   # Lightest fallback (WORKS)
-            ]
-        else:
-            self.model_names = model_names
-        
-        self.models = [genai.GenerativeModel(name) for name in self.model_names]
-        print(f"✅ Gemini models initialized with fallback: {', '.join(self.model_names)}")
+def build_prompt(query: str, contexts: List[Dict], return_language: str = 'ar') -> str:
+    """Gemini prompt for a question and its retrieved contexts (top 3 are used)"""
+    # Prepare context string based on return language
+    context_str = ""
+    if return_language == 'ar':
+        for i, ctx in enumerate(contexts[:3], 1):  # Top 3
+            context_str += f"\n\n[مصدر {i}]\n{ctx['chunk']}\n"
+            context_str += f"الفئة: {ctx['metadata']['category']}\n"
+    else:
+        for i, ctx in enumerate(contexts[:3], 1):  # Top 3
+            context_str += f"\n\n[Source {i}]\n{ctx['chunk']}\n"
+            context_str += f"Category: {ctx['metadata']['category']}\n"
     
-    def generate_answer(self, query: str, contexts: List[Dict], language: str = 'ar', return_language: str = 'ar') -> Dict:
-        """
-        Generate answer from retrieved contexts
-        
-        Args:
-            query: User question
-            contexts: List of retrieved chunks with metadata
-            language: Input language ('ar' or 'en')
-            return_language: Output language ('ar' or 'en')
-        
-        Returns:
-            Dictionary with query, answer, and sources
-        """
-        # Prepare context string based on return language
-        context_str = ""
-        if return_language == 'ar':
-            for i, ctx in enumerate(contexts[:3], 1):  # Top 3
-                context_str += f"\n\n[مصدر {i}]\n{ctx['chunk']}\n"
-                context_str += f"الفئة: {ctx['metadata']['category']}\n"
-        else:
-            for i, ctx in enumerate(contexts[:3], 1):  # Top 3
-                context_str += f"\n\n[Source {i}]\n{ctx['chunk']}\n"
-                context_str += f"Category: {ctx['metadata']['category']}\n"
-        
-        # Construct prompt based on return language
-        if return_language == 'ar':
-            prompt = f"""أنت مساعد ذكي متخصص في الإجابة على أسئلة حول الخدمات الحكومية في قطر.
+    # Construct prompt based on return language
+    if return_language == 'ar':
+        prompt = f"""أنت مساعد ذكي متخصص في الإجابة على أسئلة حول الخدمات الحكومية في قطر.
 
 استخدم المعلومات التالية للإجابة على السؤال. إذا لم تجد إجابة في المعلومات المقدمة، قل ذلك بوضوح.
 
@@ -74,9 +33,9 @@ class AnswerGenerator:
 4. إذا كانت المعلومات غير كافية، اذكر ذلك
 
 الإجابة:"""
-        
-        else:  # English
-            prompt = f"""You are an AI assistant specialized in answering questions about government services in Qatar.
+    
+    else:  # English
+        prompt = f"""You are an AI assistant specialized in answering questions about government services in Qatar.
 
 Use the following information to answer the question. If you cannot find the answer in the provided information, say so clearly.
 
@@ -92,24 +51,64 @@ Instructions:
 4. If information is insufficient, state that
 
 Answer:"""
+    
+    return prompt
+
+
+class AnswerGenerator:
+    """Generate answers using Google Gemini with automatic fallback"""
+    
+    def __init__(self, model_names: List[str] = None):
+        """Initialize Gemini with multiple model fallbacks"""
+        # Imported here so modules that never call Gemini don't pay for it
+        from google import generativeai as genai
+        from dotenv import load_dotenv
+        
+        load_dotenv()
+        self.genai = genai
         
-        # Call Gemini API with fallback
-        answer = None
+        api_key = os.getenv('GEMINI_API_KEY')
+        
+        if not api_key:
+            raise ValueError("GEMINI_API_KEY not found in .env file")
+        
+        genai.configure(api_key=api_key)
+        
+        # Default models to try in order (free tier models, newest first)
+        if model_names is None:
+            self.model_names = [
+                "gemini-2.5-flash",          # Newest and fastest (WORKS)
+                "gemini-2.5-flash-lite",     # Lighter version (WORKS)
+                "gemini-flash-latest",       # Latest stable alias (WORKS)
+                "gemini-flash-lite-latest"   # Lightest fallback (WORKS)
+            ]
+        else:
+            self.model_names = model_names
+        
+        self.models = [genai.GenerativeModel(name) for name in self.model_names]
+        print(f"✅ Gemini models initialized with fallback: {', '.join(self.model_names)}")
+    
+    def complete(self, prompt: str) -> str:
+        """
+        Run a prompt through the models in fallback order
+        
+        Raises:
+            The last model's exception if every model fails
+        """
         last_error = None
         
         for i, model in enumerate(self.models):
             try:
                 response = model.generate_content(
                     prompt,
-                    generation_config=genai.types.GenerationConfig(
+                    generation_config=self.genai.types.GenerationConfig(
                         temperature=0.3,  # Lower = more factual
                         max_output_tokens=500
                     )
                 )
                 
-                answer = response.text
                 print(f"✅ Successfully used model: {self.model_names[i]}")
-                break  # Success, exit loop
+                return response.text
             
             except Exception as e:
                 last_error = e
@@ -117,8 +116,27 @@ Answer:"""
                 # Try next model
                 continue
         
-        # If all models failed
-        if answer is None:
+        raise last_error or RuntimeError("No Gemini models configured")
+    
+    def generate_answer(self, query: str, contexts: List[Dict], language: str = 'ar', return_language: str = 'ar') -> Dict:
+        """
+        Generate answer from retrieved contexts
+        
+        Args:
+            query: User question
+            contexts: List of retrieved chunks with metadata
+            language: Input language ('ar' or 'en')
+            return_language: Output language ('ar' or 'en')
+        
+        Returns:
+            Dictionary with query, answer, and sources
+        """
+        prompt = build_prompt(query, contexts, return_language)
+        
+        try:
+            answer = self.complete(prompt)
+        except Exception as last_error:
+            # All models failed
             if return_language == 'ar':
                 answer = f"عذراً، حدث خطأ في توليد الإجابة: {str(last_error)}"
             else:
@@ -0,0 +1,269 @@
+"""
+Resident model/index server shared by multiple app worker processes.
+
+One process loads the encoder, embeddings and FAISS index once and serves
+encode/search requests over a local Unix socket. Workers use the
+RemoteEncoder / RemoteRetriever proxies, which only hold a socket, so adding
+workers barely adds memory.
+
+Requests are pickled, so only the server's owner may connect: the socket lives
+in a private 0700 directory and every connection must pass the authkey
+handshake. The key comes from ARAGOV_SERVER_AUTHKEY or, when unset, from an
+`authkey` file (0600) the server generates next to the socket.
+
+Usage:
+    python src/model_server.py --socket /tmp/aragov-$(id -u)/model.sock
+    ARAGOV_MODEL_SERVER=/tmp/aragov-$(id -u)/model.sock streamlit run app.py
+"""
+import argparse
+import os
+import secrets
+import stat
+import tempfile
+import threading
+from multiprocessing.connection import Listener, Client
+from typing import List, Dict, Union
+
+import numpy as np
+
+DEFAULT_SOCKET = os.path.join(tempfile.gettempdir(), f'aragov-{os.getuid()}', 'model.sock')
+
+# Idle connections each worker keeps open for reuse
+MAX_IDLE_CONNECTIONS = 8
+
+
+def _private_dir(address: str) -> str:
+    """Create (or verify) the 0700 directory holding the socket and key file"""
+    directory = os.path.dirname(os.path.abspath(address))
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+
+    # Refuse a directory someone else could have prepared (or a symlink to one)
+    info = os.lstat(directory)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid():
+        raise PermissionError(f"{directory} is not a directory owned by this user")
+    if stat.S_IMODE(info.st_mode) != 0o700:
+        os.chmod(directory, 0o700)
+    return directory
+
+
+def _authkey(address: str, create: bool = False) -> bytes:
+    """
+    Shared secret for the socket
+
+    ARAGOV_SERVER_AUTHKEY wins; otherwise the key is read from the `authkey`
+    file next to the socket, which the server generates (create=True).
+    """
+    key = os.getenv('ARAGOV_SERVER_AUTHKEY')
+    if key:
+        return key.encode('utf-8')
+
+    path = os.path.join(os.path.dirname(os.path.abspath(address)), 'authkey')
+    if create and not os.path.exists(path):
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(secrets.token_hex(32).encode('ascii'))
+
+    try:
+        with open(path, 'rb') as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        raise FileNotFoundError(
+            f"No authkey at {path}; start the model server first or set ARAGOV_SERVER_AUTHKEY"
+        ) from None
+
+
+class ModelServer:
+    """Owns the encoder and retriever and answers requests from worker processes"""
+
+    # Only these methods are callable over the socket
+    METHODS = ('ping', 'encode', 'search', 'version', 'get_stats', 'get_encoder_stats')
+
+    def __init__(self, encoder, retriever, address: str = DEFAULT_SOCKET):
+        """
+        Initialize server
+
+        Args:
+            encoder: Object with .encode(list) (e.g. BatchingEncoder)
+            retriever: RetrieverSystem instance
+            address: Unix socket path to listen on
+        """
+        self.encoder = encoder
+        self.retriever = retriever
+        self.address = address
+
+    def ping(self) -> str:
+        return 'pong'
+
+    def encode(self, sentences: List[str]) -> np.ndarray:
+        return np.asarray(self.encoder.encode(list(sentences)), dtype='float32')
+
+    def search(self, query_embedding, k: int = 10, query_text: str = None) -> List[Dict]:
+        return self.retriever.search(np.asarray(query_embedding), k=k, query_text=query_text)
+
+    def version(self):
+        # HotSwapRetriever exposes the snapshot version; plain retrievers never change
+        return getattr(self.retriever, 'version', None)
+
+    def get_stats(self) -> Dict:
+        return self.retriever.get_stats()
+
+    def get_encoder_stats(self) -> Dict:
+        return self.encoder.get_stats() if hasattr(self.encoder, 'get_stats') else {}
+
+    def _handle(self, conn):
+        """Serve one worker connection until it closes"""
+        with conn:
+            while True:
+                try:
+                    method, args, kwargs = conn.recv()
+                except (EOFError, OSError):
+                    break
+
+                if method not in self.METHODS:
+                    conn.send(('error', f"Unknown method: {method}"))
+                    continue
+
+                try:
+                    result = getattr(self, method)(*args, **kwargs)
+                    conn.send(('ok', result))
+                except Exception as e:
+                    conn.send(('error', f"{type(e).__name__}: {e}"))
+
+    def serve_forever(self):
+        """Accept worker connections, one thread per connection"""
+        _private_dir(self.address)
+        authkey = _authkey(self.address, create=True)
+        if os.path.exists(self.address):
+            os.unlink(self.address)
+
+        with Listener(self.address, family='AF_UNIX', authkey=authkey) as listener:
+            print(f"✅ Model server listening on {self.address}")
+            while True:
+                conn = listener.accept()
+                threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+
+class ServerConnection:
+    """
+    Pool of request/response channels to a ModelServer
+
+    Each call borrows an idle connection or opens a new one, so concurrent
+    callers reach the server in parallel (and its BatchingEncoder can group
+    them). A connection that breaks is dropped and the call retried once on a
+    fresh one, so a restarted server is picked up transparently.
+    """
+
+    def __init__(self, address: str = DEFAULT_SOCKET, max_idle: int = MAX_IDLE_CONNECTIONS):
+        self.address = address
+        self.max_idle = max_idle
+        self._authkey = _authkey(address)
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def _acquire(self):
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return Client(self.address, family='AF_UNIX', authkey=self._authkey)
+
+    def _release(self, conn):
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def call(self, method: str, *args, **kwargs):
+        """Send one request and wait for its reply"""
+        for attempt in range(2):
+            conn = self._acquire()
+            try:
+                conn.send((method, args, kwargs))
+                status, payload = conn.recv()
+            except (EOFError, BrokenPipeError, ConnectionResetError):
+                conn.close()
+                # The server went away: its other pooled connections are dead too
+                self.close()
+                if attempt:
+                    raise
+                continue
+            self._release(conn)
+            break
+
+        if status != 'ok':
+            raise RuntimeError(f"Model server error: {payload}")
+        return payload
+
+    def close(self):
+        """Close all idle connections"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+class RemoteEncoder:
+    """Drop-in for SentenceTransformer.encode backed by a ModelServer"""
+
+    def __init__(self, connection: ServerConnection):
+        self.connection = connection
+
+    def encode(self, sentences: Union[str, List[str]], **kwargs) -> np.ndarray:
+        if isinstance(sentences, str):
+            return self.connection.call('encode', [sentences])[0]
+        return self.connection.call('encode', list(sentences))
+
+    def get_stats(self) -> Dict:
+        return self.connection.call('get_encoder_stats')
+
+
+class RemoteRetriever:
+    """Drop-in for RetrieverSystem.search/get_stats backed by a ModelServer"""
+
+    def __init__(self, connection: ServerConnection):
+        self.connection = connection
+
+    @property
+    def version(self):
+        """Snapshot version served right now (see QueryWarmupCache)"""
+        return self.connection.call('version')
+
+    def search(self, query_embedding: np.ndarray, k: int = 10, query_text: str = None) -> List[Dict]:
+        return self.connection.call('search', np.asarray(query_embedding, dtype='float32'),
+                                    k=k, query_text=query_text)
+
+    def get_stats(self) -> Dict:
+        return self.connection.call('get_stats')
+
+
+def connect(address: str = DEFAULT_SOCKET):
+    """Connect to a running server and return (encoder, retriever) proxies"""
+    connection = ServerConnection(address)
+    connection.call('ping')
+    return RemoteEncoder(connection), RemoteRetriever(connection)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve the encoder and index to app workers')
+    parser.add_argument('--socket', default=DEFAULT_SOCKET, help='Unix socket path')
+    parser.add_argument('--model', default='paraphrase-multilingual-mpnet-base-v2')
+    parser.add_argument('--index-dir', default='index')
+    args = parser.parse_args()
+
+    from sentence_transformers import SentenceTransformer
+    from index_snapshots import HotSwapRetriever
+    from encoder_service import BatchingEncoder
+    from embedding_store import EmbeddingStore, CachedEncoder
+
+    print("📥 Loading encoder and index...")
+    store = EmbeddingStore(args.model, os.path.join(args.index_dir, 'embedding_store.sqlite'))
+    # Queries are looked up in the store but never written to it
+    encoder = BatchingEncoder(CachedEncoder(SentenceTransformer(args.model), store, persist_misses=False))
+    retriever = HotSwapRetriever(os.path.join(args.index_dir, 'snapshots'), fallback_dir=args.index_dir)
+    retriever.start()
+
+    ModelServer(encoder, retriever, args.socket).serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,23 @@
 """Text preprocessing utilities for Arabic documents"""
 import re
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Iterator
+
+# Precompiled patterns shared by normalize_arabic and chunking
+_DIACRITICS_RE = re.compile(r'[\u064B-\u065F\u0670]+')
+_NON_ARABIC_RE = re.compile(r'[^\u0600-\u06FF\s\d\.\،\؛\؟]+')
+
+# Single-character substitutions (str.replace is far cheaper than a regex pass
+# or str.translate for these): alef variants, alef maqsura, taa marbuta
+_CHAR_REPLACEMENTS = (
+    ('إ', 'ا'),
+    ('أ', 'ا'),
+    ('آ', 'ا'),
+    ('ى', 'ي'),
+    ('ة', 'ه'),
+)
+
+_MULTI_NEWLINE_RE = re.compile(r'\n{3,}')
 
 def normalize_arabic(text: str) -> str:
     """
@@ -11,22 +27,17 @@ def normalize_arabic(text: str) -> str:
         return ""
     
     # Remove diacritics (tashkeel)
-    text = re.sub(r'[\u064B-\u065F\u0670]', '', text)
-    
-    # Normalize alef variants (إ، أ، آ → ا)
-    text = re.sub(r'[إأآا]', 'ا', text)
-    
-    # Normalize yaa/alef maqsura
-    text = re.sub(r'ى', 'ي', text)
+    text = _DIACRITICS_RE.sub('', text)
     
-    # Normalize taa marbuta
-    text = re.sub(r'ة', 'ه', text)
+    # Normalize alef variants, alef maqsura and taa marbuta
+    for old, new in _CHAR_REPLACEMENTS:
+        text = text.replace(old, new)
     
-    # Remove extra whitespace
-    text = re.sub(r'\s+', ' ', text)
+    # Remove extra whitespace (str.split() uses the same whitespace set as \s)
+    text = ' '.join(text.split())
     
     # Remove non-Arabic, non-digit, non-space chars
-    text = re.sub(r'[^\u0600-\u06FF\s\d\.\،\؛\؟]', '', text)
+    text = _NON_ARABIC_RE.sub('', text)
     
     return text.strip()
 
@@ -38,7 +49,7 @@ def clean_document(text: str) -> str:
         return ""
     
     # Remove multiple newlines
-    text = re.sub(r'\n{3,}', '\n\n', text)
+    text = _MULTI_NEWLINE_RE.sub('\n\n', text)
     
     # Remove lines with only symbols
     lines = text.split('\n')
@@ -78,27 +89,27 @@ class ArabicPreprocessor:
                 return parts[data_idx + 1]
         return 'unknown'
     
-    def load_all_documents(self, data_dir: Path) -> List[Dict]:
-        """Load all documents from data directory"""
-        documents = []
-        
-        for category_dir in sorted(data_dir.iterdir()):
+    def iter_documents(self, data_dir: Path) -> Iterator[Dict]:
+        """Lazily yield documents from data directory, one file at a time"""
+        for category_dir in sorted(Path(data_dir).iterdir()):
             if not category_dir.is_dir() or category_dir.name == 'archive_backup':
                 continue
             
             category = category_dir.name
             
-            for filepath in category_dir.glob("*.txt"):
+            for filepath in sorted(category_dir.glob("*.txt")):
                 text = self.load_document(filepath)
                 if text:
-                    documents.append({
+                    yield {
                         'text': text,
                         'category': category,
                         'filename': filepath.name,
                         'filepath': str(filepath)
-                    })
-        
-        return documents
+                    }
+    
+    def load_all_documents(self, data_dir: Path) -> List[Dict]:
+        """Load all documents from data directory"""
+        return list(self.iter_documents(data_dir))
 
 # Test it
 if __name__ == "__main__":
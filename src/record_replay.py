@@ -0,0 +1,208 @@
+"""
+Record/replay fixtures for the network-bound services.
+
+A Cassette is a gzip-compressed JSON file of request -> response pairs. The
+wrappers below stand in for TranslationService and AnswerGenerator:
+
+    record  call the live service and store every successful response
+    replay  serve stored responses only; a request never seen raises ReplayMiss
+    auto    replay what is stored, record the rest
+
+In replay mode neither Google Translate nor Gemini is imported or contacted,
+so evaluations run offline and deterministically. Replayed calls can sleep
+for a fixed or the originally recorded latency to keep load tests realistic.
+"""
+import atexit
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Union
+
+from llm_generator import AnswerGenerator
+from translator import TranslationService
+
+FIXTURES_DIR = 'experiments/fixtures'
+TRANSLATOR_CASSETTE = os.path.join(FIXTURES_DIR, 'translator.json.gz')
+GENERATOR_CASSETTE = os.path.join(FIXTURES_DIR, 'generator.json.gz')
+MODES = ('record', 'replay', 'auto')
+
+
+def mode_from_env():
+    """
+    (mode, latency) from ARAGOV_RECORD_MODE and ARAGOV_REPLAY_LATENCY
+
+    mode is None when record/replay is off. Latency is seconds per replayed
+    call or 'recorded' to reproduce the original timings.
+    """
+    mode = os.getenv('ARAGOV_RECORD_MODE') or None
+    latency = os.getenv('ARAGOV_REPLAY_LATENCY') or None
+    if latency and latency != 'recorded':
+        latency = float(latency)
+    return mode, latency
+
+
+class ReplayMiss(KeyError):
+    """A replay-only cassette has no response for the request"""
+
+
+class Cassette:
+    """Thread-safe request -> response store persisted as gzip JSON"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.entries = {}
+
+        if os.path.exists(path):
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                self.entries = json.load(f)['entries']
+
+        atexit.register(self.save)
+
+    @staticmethod
+    def key(service: str, method: str, args: List) -> str:
+        payload = json.dumps([service, method, args], ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            return self.entries.get(key)
+
+    def put(self, key: str, entry: Dict):
+        with self._lock:
+            self.entries[key] = entry
+            self._dirty = True
+
+    def save(self):
+        """Write the cassette if anything was recorded (atomic replace)"""
+        with self._lock:
+            if not self._dirty:
+                return
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = self.path + '.tmp'
+            # mtime=0 keeps the file byte-identical for identical content
+            with open(tmp_path, 'wb') as raw, \
+                 gzip.GzipFile(fileobj=raw, mode='wb', mtime=0) as f:
+                f.write(json.dumps({'version': 1, 'entries': self.entries},
+                                   ensure_ascii=False, sort_keys=True).encode('utf-8'))
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class CallRecorder:
+    """Routes one service's calls through a cassette according to the mode"""
+
+    def __init__(self, cassette: Cassette, service: str, mode: str = 'replay',
+                 latency: Union[None, float, str] = None):
+        """
+        Args:
+            cassette: Where responses are stored
+            service: Namespace for the keys ('translator', 'generator', ...)
+            mode: 'record', 'replay' or 'auto'
+            latency: Replay delay: None (none), seconds, or 'recorded'
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown record/replay mode {mode!r}; expected one of {MODES}")
+        self.cassette = cassette
+        self.service = service
+        self.mode = mode
+        self.latency = latency
+        self.replayed = 0
+        self.recorded = 0
+
+    def call(self, method: str, args: List, live: Callable, should_record: Callable = None):
+        """
+        Replay or record one call
+
+        Args:
+            method: Method name, part of the key
+            args: JSON-serializable arguments, part of the key
+            live: Zero-argument callable that performs the real call
+            should_record: Predicate on the response; False keeps failures out of the cassette
+        """
+        key = Cassette.key(self.service, method, args)
+
+        if self.mode != 'record':
+            entry = self.cassette.get(key)
+            if entry is not None:
+                self._sleep(entry.get('latency', 0.0))
+                self.replayed += 1
+                return entry['response']
+            if self.mode == 'replay':
+                raise ReplayMiss(f"No recorded {self.service}.{method} response for {args!r:.120}")
+
+        start = time.perf_counter()
+        response = live()
+        elapsed = time.perf_counter() - start
+
+        if should_record is None or should_record(response):
+            self.cassette.put(key, {'method': method, 'args': args,
+                                    'response': response, 'latency': round(elapsed, 4)})
+            self.recorded += 1
+        return response
+
+    def _sleep(self, recorded_latency: float):
+        if self.latency == 'recorded':
+            time.sleep(recorded_latency)
+        elif self.latency:
+            time.sleep(float(self.latency))
+
+    def get_stats(self) -> Dict:
+        return {'mode': self.mode, 'replayed': self.replayed, 'recorded': self.recorded,
+                'entries': len(self.cassette)}
+
+
+class RecordReplayTranslator(TranslationService):
+    """TranslationService whose Google Translate calls go through a cassette"""
+
+    def __init__(self, cassette: Cassette = None, mode: str = 'replay',
+                 latency: Union[None, float, str] = None):
+        super().__init__()
+        if cassette is None:
+            cassette = Cassette(TRANSLATOR_CASSETTE)
+        self.recorder = CallRecorder(cassette, 'translator', mode, latency)
+
+    def translate_to_arabic(self, text):
+        # TranslationService returns the input unchanged on failure; don't record that
+        return self.recorder.call('translate_to_arabic', [text],
+                                  lambda: super(RecordReplayTranslator, self).translate_to_arabic(text),
+                                  should_record=lambda result: bool(result) and result != text)
+
+    def translate_to_english(self, text):
+        return self.recorder.call('translate_to_english', [text],
+                                  lambda: super(RecordReplayTranslator, self).translate_to_english(text),
+                                  should_record=lambda result: bool(result) and result != text)
+
+    def save(self):
+        self.recorder.cassette.save()
+
+
+class RecordReplayAnswerGenerator(AnswerGenerator):
+    """AnswerGenerator whose Gemini calls go through a cassette"""
+
+    def __init__(self, cassette: Cassette = None, mode: str = 'replay',
+                 latency: Union[None, float, str] = None, model_names: List[str] = None):
+        if cassette is None:
+            cassette = Cassette(GENERATOR_CASSETTE)
+        self.recorder = CallRecorder(cassette, 'generator', mode, latency)
+        if mode == 'replay':
+            # Replay never reaches Gemini, so no API key or client is needed
+            self.model_names = model_names or []
+            self.models = []
+        else:
+            super().__init__(model_names)
+
+    def complete(self, prompt: str) -> str:
+        # Failed calls raise and are never recorded
+        return self.recorder.call('complete', [prompt],
+                                  lambda: super(RecordReplayAnswerGenerator, self).complete(prompt))
+
+    def save(self):
+        self.recorder.cassette.save()
@@ -1,48 +1,160 @@
 """Retrieval system using FAISS"""
-import faiss
 import numpy as np
 import json
+import threading
+from collections import Counter
 from pathlib import Path
 from typing import List, Dict
 
+def _extract_title(chunk: str) -> str:
+    """Service title is the first line of a chunk"""
+    lines = chunk.split('\n')
+    return lines[0].strip() if lines else ""
+
+class _IndexSnapshot:
+    """
+    Immutable view of the corpus used by a single search.
+    
+    add_documents / remove_documents build a new snapshot and swap the
+    reference, so a search that already grabbed one never sees a half-applied
+    update. Removed rows stay in place as tombstones (alive=False) until
+    compact() drops them.
+    """
+    
+    def __init__(self, embeddings, chunks, metadata, titles, ids, alive,
+                 category_masks, category_counts, document_rows):
+        self.embeddings = embeddings          # (N, d) normalized float32
+        self.chunks = chunks                  # N chunk texts
+        self.metadata = metadata              # N metadata dicts
+        self.titles = titles                  # N titles for title matching
+        self.ids = ids                        # (N,) int64 ids in the FAISS IndexIDMap
+        self.alive = alive                    # (N,) bool, False = tombstone
+        self.category_masks = category_masks  # category -> (N,) bool
+        self.category_counts = category_counts  # category -> live chunks
+        self.document_rows = document_rows    # source_file -> live row indices
+    
+    @classmethod
+    def build(cls, embeddings, chunks, metadata, ids):
+        categories = np.array([m['category'] for m in metadata], dtype=object)
+        document_rows = {}
+        for i, meta in enumerate(metadata):
+            document_rows.setdefault(meta['source_file'], []).append(i)
+        
+        return cls(
+            embeddings, list(chunks), list(metadata),
+            [_extract_title(c) for c in chunks],
+            ids, np.ones(len(chunks), dtype=bool),
+            {cat: categories == cat for cat in set(categories)},
+            Counter(m['category'] for m in metadata),
+            document_rows
+        )
+    
+    def extended(self, embeddings, chunks, metadata, ids):
+        """New snapshot with rows appended"""
+        n_old, n_new = len(self.chunks), len(chunks)
+        new_categories = np.array([m['category'] for m in metadata], dtype=object)
+        
+        category_masks = {}
+        for cat in set(self.category_masks) | set(new_categories):
+            old_mask = self.category_masks.get(cat, np.zeros(n_old, dtype=bool))
+            category_masks[cat] = np.concatenate([old_mask, new_categories == cat])
+        
+        document_rows = {src: list(rows) for src, rows in self.document_rows.items()}
+        for i, meta in enumerate(metadata, start=n_old):
+            document_rows.setdefault(meta['source_file'], []).append(i)
+        
+        category_counts = self.category_counts.copy()
+        category_counts.update(m['category'] for m in metadata)
+        
+        return _IndexSnapshot(
+            np.vstack([self.embeddings, embeddings]),
+            self.chunks + list(chunks),
+            self.metadata + list(metadata),
+            self.titles + [_extract_title(c) for c in chunks],
+            np.concatenate([self.ids, ids]),
+            np.concatenate([self.alive, np.ones(n_new, dtype=bool)]),
+            category_masks, category_counts, document_rows
+        )
+    
+    def without(self, rows):
+        """New snapshot with the given rows tombstoned"""
+        alive = self.alive.copy()
+        alive[rows] = False
+        
+        removed = set(rows)
+        document_rows = {}
+        for src, src_rows in self.document_rows.items():
+            kept = [r for r in src_rows if r not in removed]
+            if kept:
+                document_rows[src] = kept
+        
+        category_counts = self.category_counts.copy()
+        category_counts.subtract(self.metadata[r]['category'] for r in rows)
+        
+        return _IndexSnapshot(
+            self.embeddings, self.chunks, self.metadata, self.titles, self.ids,
+            alive, self.category_masks, +category_counts, document_rows
+        )
+
 class RetrieverSystem:
     """FAISS-based retrieval system with keyword boosting"""
     
+    # Fusion weights when query text is given: semantic similarity, title
+    # match, and the additive keyword bonus (boost - 1)
+    SEMANTIC_WEIGHT = 0.50
+    TITLE_WEIGHT = 0.20
+    KEYWORD_WEIGHT = 0.3
+    
     def __init__(self, embeddings_path: str, chunks_path: str, metadata_path: str):
         """Initialize retriever with data"""
-        # Load data
-        self.embeddings = np.load(embeddings_path).astype('float32')
+        import faiss
+        
+        from corpus_encoder import load_embeddings
         
+        # Load data
         with open(chunks_path, 'r', encoding='utf-8') as f:
-            self.chunks = json.load(f)
+            chunks = json.load(f)
+        
+        # Refuses partial or mid-rebuild embedding files
+        embeddings = load_embeddings(embeddings_path, expected_rows=len(chunks)).astype('float32')
         
         with open(metadata_path, 'r', encoding='utf-8') as f:
-            self.metadata = json.load(f)
+            metadata = json.load(f)
         
         # Normalize embeddings for cosine similarity
-        faiss.normalize_L2(self.embeddings)
+        faiss.normalize_L2(embeddings)
+        
+        # Build ID-mapped index so documents can be added/removed later
+        d = embeddings.shape[1]
+        ids = np.arange(len(chunks), dtype='int64')
+        self.index = faiss.IndexIDMap(faiss.IndexFlatIP(d))  # Inner product
+        self.index.add_with_ids(embeddings, ids)
+        self._next_id = len(chunks)
         
-        # Build index
-        d = self.embeddings.shape[1]
-        self.index = faiss.IndexFlatIP(d)  # Inner product
-        self.index.add(self.embeddings)
+        # Writers serialize on this lock; readers just grab the current snapshot
+        self._write_lock = threading.Lock()
+        self._snapshot = _IndexSnapshot.build(embeddings, chunks, metadata, ids)
         
         # Build keyword map for boosting
         self.keyword_map = self._build_keyword_map()
         
-        # Extract titles for title matching
-        self.titles = self._extract_titles()
-        
         print(f"✅ Index built with {self.index.ntotal} vectors")
     
-    def _extract_titles(self):
-        """Extract service titles from chunks"""
-        titles = []
-        for chunk in self.chunks:
-            lines = chunk.split('\n')
-            title = lines[0] if lines else ""
-            titles.append(title.strip())
-        return titles
+    @property
+    def embeddings(self):
+        return self._snapshot.embeddings
+    
+    @property
+    def chunks(self):
+        return self._snapshot.chunks
+    
+    @property
+    def metadata(self):
+        return self._snapshot.metadata
+    
+    @property
+    def titles(self):
+        return self._snapshot.titles
     
     def _title_similarity(self, query: str, title: str) -> float:
         """Calculate title similarity score"""
@@ -158,12 +270,13 @@ class RetrieverSystem:
             'museum': 'culture',
         }
     
-    def _direct_filename_match(self, query: str):
+    def _direct_filename_match(self, query: str, snapshot: _IndexSnapshot = None):
         """Check for direct filename pattern matches
         
         Returns:
             int: Index of matching document, or None if no match
         """
+        snapshot = snapshot or self._snapshot
         query_lower = query.lower()
         
         # Direct mappings for specific queries
@@ -179,90 +292,181 @@ class RetrieverSystem:
         
         for pattern, filename_part in direct_patterns.items():
             if pattern in query_lower:
-                for i, meta in enumerate(self.metadata):
-                    if filename_part in meta['source_file'].lower():
+                for i, meta in enumerate(snapshot.metadata):
+                    if snapshot.alive[i] and filename_part in meta['source_file'].lower():
                         return i
         
         return None
     
-    def search(self, query_embedding: np.ndarray, k: int = 10, query_text: str = None) -> List[Dict]:
+    def score_components(self, query_embedding: np.ndarray, query_text: str = None,
+                         snapshot: _IndexSnapshot = None) -> Dict[str, np.ndarray]:
         """
-        Search for k most similar chunks with title matching
-        
-        Args:
-            query_embedding: Query vector
-            k: Number of results to return
-            query_text: Original query text for keyword boosting and title matching (optional)
+        Per-chunk scores that search() fuses
         
         Returns:
-            List of results with scores and metadata
+            {'semantic': cosine similarity} plus, when query_text is given,
+            {'title': title match in [0, 1], 'keyword': keyword bonus (boost - 1)}
         """
+        import faiss
+        
         # Normalize query
         query_embedding = query_embedding.astype('float32').reshape(1, -1)
         faiss.normalize_L2(query_embedding)
         
+        snapshot = snapshot or self._snapshot
+        
         # Get all similarities
         from sklearn.metrics.pairwise import cosine_similarity
-        semantic_scores = cosine_similarity(query_embedding, self.embeddings)[0]
+        components = {'semantic': cosine_similarity(query_embedding, snapshot.embeddings)[0]}
         
         # If query text provided, enhance with title matching
         if query_text:
             # Check for direct filename match first
-            direct_match_idx = self._direct_filename_match(query_text)
+            direct_match_idx = self._direct_filename_match(query_text, snapshot)
             
             # Title matching scores
-            title_scores = np.array([
+            components['title'] = np.array([
                 self._title_similarity(query_text, title) 
-                for title in self.titles
+                for title in snapshot.titles
             ])
             
             # Keyword boosting
-            keyword_boost = np.ones(len(self.chunks))
+            keyword_boost = np.ones(len(snapshot.chunks))
             query_lower = query_text.lower()
             
             # Check for multi-word phrases first (more specific)
             for keyword, target_cat in sorted(self.keyword_map.items(), key=lambda x: -len(x[0])):
                 if keyword.lower() in query_lower:
-                    for i, meta in enumerate(self.metadata):
-                        if meta['category'] == target_cat:
-                            # Apply boost
-                            keyword_boost[i] = max(keyword_boost[i], 2.0)
+                    mask = snapshot.category_masks.get(target_cat)
+                    if mask is not None:
+                        # Apply boost
+                        keyword_boost[mask] = np.maximum(keyword_boost[mask], 2.0)
             
             # If direct match found, boost it heavily
             if direct_match_idx is not None:
                 keyword_boost[direct_match_idx] = 10.0  # Very strong boost
             
-            # Combined scoring with additive keyword boost
-            # - Semantic similarity (50%)
-            # - Title match (20%)
-            # - Keyword boost (30% - additive, not multiplicative)
-            keyword_bonus = (keyword_boost - 1.0) * 0.3  # Convert boost to bonus
+            # Additive, not multiplicative: the boost becomes a bonus
+            components['keyword'] = keyword_boost - 1.0
+        
+        return components
+    
+    def search(self, query_embedding: np.ndarray, k: int = 10, query_text: str = None) -> List[Dict]:
+        """
+        Search for k most similar chunks with title matching
+        
+        Args:
+            query_embedding: Query vector
+            k: Number of results to return
+            query_text: Original query text for keyword boosting and title matching (optional)
+        
+        Returns:
+            List of results with scores and metadata
+        """
+        # One consistent view of the corpus for the whole search
+        snapshot = self._snapshot
+        components = self.score_components(query_embedding, query_text, snapshot)
+        
+        if query_text:
+            # Combined scoring: semantic (50%), title match (20%), keyword bonus (30%)
             final_scores = (
-                0.50 * semantic_scores +
-                0.20 * title_scores +
-                keyword_bonus
+                self.SEMANTIC_WEIGHT * components['semantic'] +
+                self.TITLE_WEIGHT * components['title'] +
+                components['keyword'] * self.KEYWORD_WEIGHT
             )
         else:
             # No query text, use semantic only
-            final_scores = semantic_scores
+            final_scores = components['semantic']
+        
+        # Tombstoned rows can never be returned
+        if not snapshot.alive.all():
+            final_scores = np.where(snapshot.alive, final_scores, -np.inf)
+            k = min(k, int(snapshot.alive.sum()))
         
         # Get top k
-        top_indices = np.argsort(final_scores)[-k:][::-1]
+        top_indices = np.argsort(final_scores)[-k:][::-1] if k > 0 else []
         
         # Prepare results
         results = []
         for i, idx in enumerate(top_indices, 1):
             results.append({
                 'rank': i,
+                'id': int(snapshot.ids[idx]),  # stable across add/remove/compact
                 'score': float(final_scores[idx]),
-                'chunk': self.chunks[idx],
-                'metadata': self.metadata[idx]
+                'chunk': snapshot.chunks[idx],
+                'metadata': snapshot.metadata[idx]
             })
         
         return results
     
+    def add_documents(self, chunks: List[str], metadata: List[Dict], embeddings: np.ndarray) -> List[int]:
+        """
+        Add chunks to the live index
+        
+        Args:
+            chunks: Chunk texts
+            metadata: One dict per chunk (needs 'category' and 'source_file')
+            embeddings: (len(chunks), d) chunk embeddings
+        
+        Returns:
+            FAISS ids assigned to the new chunks
+        """
+        import faiss
+        
+        if len(chunks) != len(metadata):
+            raise ValueError(f"Got {len(chunks)} chunks but {len(metadata)} metadata entries")
+        
+        embeddings = np.array(embeddings, dtype='float32').reshape(len(chunks), -1)
+        if embeddings.shape[1] != self.index.d:
+            raise ValueError(f"Embedding dim {embeddings.shape[1]} != index dim {self.index.d}")
+        faiss.normalize_L2(embeddings)
+        
+        with self._write_lock:
+            ids = np.arange(self._next_id, self._next_id + len(chunks), dtype='int64')
+            self._next_id += len(chunks)
+            
+            self.index.add_with_ids(embeddings, ids)
+            self._snapshot = self._snapshot.extended(embeddings, chunks, metadata, ids)
+        
+        return ids.tolist()
+    
+    def remove_documents(self, source_files: List[str]) -> int:
+        """
+        Remove every chunk of the given source documents from the live index
+        
+        Returns:
+            Number of chunks removed
+        """
+        with self._write_lock:
+            snapshot = self._snapshot
+            # A file listed twice must not be tombstoned (and counted) twice
+            rows = sorted({r for src in set(source_files) for r in snapshot.document_rows.get(src, [])})
+            if not rows:
+                return 0
+            
+            self.index.remove_ids(snapshot.ids[rows])
+            self._snapshot = snapshot.without(rows)
+        
+        return len(rows)
+    
+    def compact(self):
+        """Drop tombstoned rows from memory (ids are kept)"""
+        with self._write_lock:
+            snapshot = self._snapshot
+            if snapshot.alive.all():
+                return
+            
+            keep = np.flatnonzero(snapshot.alive)
+            self._snapshot = _IndexSnapshot.build(
+                snapshot.embeddings[keep],
+                [snapshot.chunks[i] for i in keep],
+                [snapshot.metadata[i] for i in keep],
+                snapshot.ids[keep]
+            )
+    
     def save_index(self, path: str):
         """Save FAISS index to disk"""
+        import faiss
         faiss.write_index(self.index, path)
         print(f"✅ Index saved to {path}")
     
@@ -270,19 +474,26 @@ class RetrieverSystem:
     def load_index(cls, index_path: str, embeddings_path: str, 
                    chunks_path: str, metadata_path: str):
         """Load pre-built index"""
+        import faiss
         retriever = cls(embeddings_path, chunks_path, metadata_path)
-        retriever.index = faiss.read_index(index_path)
+        index = faiss.read_index(index_path)
+        
+        # Older saved indexes are plain IndexFlatIP; keep the ID-mapped one
+        # built from the same embeddings so add/remove keep working
+        if isinstance(index, faiss.IndexIDMap) and index.ntotal == len(retriever.chunks):
+            retriever.index = index
         print(f"✅ Loaded index with {retriever.index.ntotal} vectors")
         return retriever
     
     def get_stats(self) -> Dict:
         """Get retrieval system statistics"""
-        from collections import Counter
-        categories = Counter(m['category'] for m in self.metadata)
+        snapshot = self._snapshot
+        live_chunks = int(snapshot.alive.sum())
         
         return {
-            'total_chunks': len(self.chunks),
-            'total_documents': len(set(m['source_file'] for m in self.metadata)),
-            'categories': dict(categories),
-            'embedding_dim': self.embeddings.shape[1]
+            'total_chunks': live_chunks,
+            'total_documents': len(snapshot.document_rows),
+            'categories': dict(snapshot.category_counts),
+            'embedding_dim': snapshot.embeddings.shape[1],
+            'tombstones': len(snapshot.chunks) - live_chunks
         }
@@ -0,0 +1,117 @@
+"""Startup-time profiler: import, model load, index load and first-query warmup"""
+import importlib
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import List, Dict
+
+# Heavy third-party dependencies, in the order the app pulls them in
+HEAVY_MODULES = [
+    'numpy',
+    'faiss',
+    'torch',
+    'sentence_transformers',
+    'deep_translator',
+    'google.generativeai',
+    'streamlit',
+]
+
+# Project modules (should be near-free now that heavy imports are lazy)
+PROJECT_MODULES = ['retrieval', 'index_snapshots', 'translator', 'llm_generator', 'encoder_service']
+
+
+def _time_import(name: str) -> Dict:
+    """Import a module and record how long it took"""
+    start = time.perf_counter()
+    try:
+        importlib.import_module(name)
+        status = 'ok'
+    except ImportError as e:
+        status = f'not installed ({e.name})'
+    return {'stage': f'import {name}', 'seconds': time.perf_counter() - start, 'status': status}
+
+
+def profile_startup(model_name: str = 'paraphrase-multilingual-mpnet-base-v2',
+                    index_dir: str = 'index',
+                    warmup_query: str = 'كيف أحصل على رخصة قيادة في قطر؟') -> List[Dict]:
+    """
+    Time each startup stage in a fresh interpreter
+
+    The stages run in a child process, so modules the caller has already
+    imported don't hide their import cost.
+
+    Returns:
+        List of {'stage', 'seconds', 'status'} records in execution order
+    """
+    proc = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--json', model_name, index_dir, warmup_query],
+        capture_output=True, text=True, encoding='utf-8'
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Startup profile failed:\n{proc.stderr[-2000:]}")
+    # Libraries may print while loading; the report is the last line
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def _profile_stages(model_name: str, index_dir: str, warmup_query: str) -> List[Dict]:
+    """Run and time the stages in this interpreter (the child side of profile_startup)"""
+    stages = [_time_import(name) for name in HEAVY_MODULES + PROJECT_MODULES]
+
+    from sentence_transformers import SentenceTransformer
+    from encoder_service import BatchingEncoder
+    from embedding_store import EmbeddingStore, CachedEncoder
+    from index_snapshots import HotSwapRetriever
+
+    # Same encoder and retriever setup as app.py
+    start = time.perf_counter()
+    model = BatchingEncoder(
+        CachedEncoder(SentenceTransformer(model_name),
+                      EmbeddingStore(model_name, os.path.join(index_dir, 'embedding_store.sqlite')),
+                      persist_misses=False),
+        max_batch_size=32, max_wait_ms=5.0
+    )
+    stages.append({'stage': 'model load', 'seconds': time.perf_counter() - start, 'status': 'ok'})
+
+    start = time.perf_counter()
+    retriever = HotSwapRetriever(os.path.join(index_dir, 'snapshots'), fallback_dir=index_dir)
+    stages.append({'stage': f'index load ({retriever.version or index_dir})',
+                   'seconds': time.perf_counter() - start, 'status': 'ok'})
+
+    # First query pays for lazy allocations; the second shows steady state
+    for label in ('first query', 'second query'):
+        start = time.perf_counter()
+        query_emb = model.encode([warmup_query])[0]
+        retriever.search(query_emb, k=5, query_text=warmup_query)
+        stages.append({'stage': label, 'seconds': time.perf_counter() - start, 'status': 'ok'})
+
+    model.close()
+    return stages
+
+
+def print_report(stages: List[Dict]):
+    """Print a startup breakdown table"""
+    total = sum(s['seconds'] for s in stages if s['stage'] != 'second query')
+
+    print("=" * 60)
+    print("⏱️  Startup Profile")
+    print("=" * 60)
+    print(f"{'Stage':<36} {'Time (s)':>10} {'Share':>8}")
+    print("-" * 60)
+    for s in stages:
+        share = s['seconds'] / total if total and s['stage'] != 'second query' else 0.0
+        line = f"{s['stage']:<36} {s['seconds']:>10.3f} {share:>7.1%}"
+        if s['status'] != 'ok':
+            line += f"  [{s['status']}]"
+        print(line)
+    print("-" * 60)
+    print(f"{'Total to first answer':<36} {total:>10.3f}")
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    if len(sys.argv) == 5 and sys.argv[1] == '--json':
+        print(json.dumps(_profile_stages(*sys.argv[2:])))
+    else:
+        print_report(profile_startup())
@@ -0,0 +1,152 @@
+"""
+Synthetic corpora for scaling tests.
+
+Chunks are cut from the real data/ documents (service title on the first line,
+a random window of the normalized body after it) and get random embeddings
+with a controlled cluster structure: every chunk belongs to one cluster, and
+its vector is the cluster center plus Gaussian noise. Artifacts are streamed to
+disk in the layout RetrieverSystem loads, so corpora far larger than memory
+can be generated.
+"""
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+
+from preprocessing import normalize_arabic
+
+DEFAULT_DIM = 768
+
+
+def load_templates(data_dir: str = 'data') -> List[Dict]:
+    """Title, category, source file and normalized body of every data/ document"""
+    templates = []
+    for category_dir in sorted(Path(data_dir).iterdir()):
+        if not category_dir.is_dir() or category_dir.name == 'archive_backup':
+            continue
+        for filepath in sorted(category_dir.glob('*.txt')):
+            text = filepath.read_text(encoding='utf-8')
+            first_line = text.split('\n', 1)[0]
+            templates.append({
+                'category': category_dir.name,
+                'source_file': filepath.name,
+                'title': normalize_arabic(first_line.lstrip('#').strip()),
+                'body': normalize_arabic(text)
+            })
+    return templates
+
+
+def cluster_centers(n_clusters: int, dim: int = DEFAULT_DIM, seed: int = 0) -> np.ndarray:
+    """Random unit vectors, one per cluster"""
+    centers = np.random.RandomState(seed).randn(n_clusters, dim).astype('float32')
+    return centers / np.linalg.norm(centers, axis=1, keepdims=True)
+
+
+def noisy_vectors(centers: np.ndarray, clusters: np.ndarray, noise: float,
+                  rng: np.random.RandomState) -> np.ndarray:
+    """
+    Unit vectors scattered around their cluster centers
+
+    Expected cosine similarity to the center is about 1 / sqrt(1 + noise^2).
+    """
+    dim = centers.shape[1]
+    vectors = centers[clusters] + rng.randn(len(clusters), dim).astype('float32') * (noise / np.sqrt(dim))
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def iter_chunks(clusters: np.ndarray, templates: List[Dict], chunk_chars: int,
+                rng: np.random.RandomState, start: int = 0) -> Iterator[Tuple[str, Dict]]:
+    """(text, metadata) per chunk; cluster c draws from template c % len(templates)"""
+    for offset, cluster in enumerate(clusters):
+        i = start + offset
+        template = templates[cluster % len(templates)]
+        body = template['body']
+        pos = rng.randint(0, max(1, len(body) - chunk_chars))
+        text = f"{template['title']}\n{body[pos:pos + chunk_chars]}"
+        yield text, {
+            'category': template['category'],
+            'source_file': f"synthetic_{i // 8:07d}_{template['source_file']}",
+            'title': template['title'],
+            'cluster': int(cluster)
+        }
+
+
+def generate_corpus(output_dir: str, n_chunks: int, dim: int = DEFAULT_DIM,
+                    n_clusters: int = None, noise: float = 0.5, chunk_chars: int = 600,
+                    data_dir: str = 'data', seed: int = 0, block_size: int = 50_000) -> Dict:
+    """
+    Write embeddings.npy, corpus_chunks.json and corpus_meta.json for a synthetic corpus
+
+    Args:
+        output_dir: Destination directory (created if missing)
+        n_chunks: Number of chunks
+        dim: Embedding dimension
+        n_clusters: Clusters in the embedding space (default: one per template)
+        noise: Spread of chunk vectors around their center
+        chunk_chars: Characters of body text per chunk
+        data_dir: Source of the text templates
+        seed: Seed for templates windows, clusters and noise
+        block_size: Chunks generated per block (bounds memory use)
+
+    Returns:
+        Generation stats (chunks, clusters, bytes on disk)
+    """
+    templates = load_templates(data_dir)
+    if not templates:
+        raise ValueError(f"No documents found under {data_dir}")
+
+    n_clusters = n_clusters or len(templates)
+    centers = cluster_centers(n_clusters, dim, seed)
+    rng = np.random.RandomState(seed + 1)
+
+    os.makedirs(output_dir, exist_ok=True)
+    paths = {name: os.path.join(output_dir, name)
+             for name in ('embeddings.npy', 'corpus_chunks.json', 'corpus_meta.json')}
+
+    embeddings = np.lib.format.open_memmap(paths['embeddings.npy'], mode='w+',
+                                           dtype='float32', shape=(n_chunks, dim))
+    with open(paths['corpus_chunks.json'], 'w', encoding='utf-8') as chunks_file, \
+         open(paths['corpus_meta.json'], 'w', encoding='utf-8') as meta_file:
+        chunks_file.write('[')
+        meta_file.write('[')
+
+        for start in range(0, n_chunks, block_size):
+            clusters = rng.randint(0, n_clusters, size=min(block_size, n_chunks - start))
+            embeddings[start:start + len(clusters)] = noisy_vectors(centers, clusters, noise, rng)
+
+            for i, (text, meta) in enumerate(iter_chunks(clusters, templates, chunk_chars, rng, start)):
+                separator = ',' if start + i else ''
+                chunks_file.write(separator + json.dumps(text, ensure_ascii=False))
+                meta_file.write(separator + json.dumps(meta, ensure_ascii=False))
+
+        chunks_file.write(']')
+        meta_file.write(']')
+
+    embeddings.flush()
+    del embeddings
+
+    return {
+        'chunks': n_chunks,
+        'clusters': n_clusters,
+        'dim': dim,
+        'noise': noise,
+        'bytes': {name: os.path.getsize(path) for name, path in paths.items()}
+    }
+
+
+def synthetic_queries(n_queries: int, n_clusters: int, templates: List[Dict],
+                      dim: int = DEFAULT_DIM, noise: float = 0.5,
+                      seed: int = 0) -> Tuple[np.ndarray, List[str], np.ndarray]:
+    """
+    Query vectors, query texts and gold clusters matching generate_corpus(seed=seed)
+
+    Query texts are the template titles, so title matching and keyword
+    boosting run on realistic input.
+    """
+    centers = cluster_centers(n_clusters, dim, seed)
+    rng = np.random.RandomState(seed + 2)
+    clusters = rng.randint(0, n_clusters, size=n_queries)
+    texts = [templates[c % len(templates)]['title'] for c in clusters]
+    return noisy_vectors(centers, clusters, noise, rng), texts, clusters
@@ -3,7 +3,6 @@ Translation Service for Bilingual RAG System
 Handles Arabic-English translation for queries and answers.
 """
 
-from deep_translator import GoogleTranslator
 import re
 
 
@@ -46,6 +45,8 @@ class TranslationService:
         Returns:
             Arabic translation
         """
+        from deep_translator import GoogleTranslator
+        
         try:
             result = GoogleTranslator(source='en', target='ar').translate(text)
             return result
@@ -63,6 +64,8 @@ class TranslationService:
         Returns:
             English translation
         """
+        from deep_translator import GoogleTranslator
+        
         try:
             result = GoogleTranslator(source='ar', target='en').translate(text)
             return result
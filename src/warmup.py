@@ -0,0 +1,193 @@
+"""Startup warmup: settle the encoder and precompute results for known queries"""
+import json
+import os
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import List, Dict, Optional
+
+# Results are cached at the largest k the UI offers and sliced per request
+MAX_CACHED_K = 10
+
+# Answers only use the top 3 contexts, so they are valid for any k >= 3
+ANSWER_CONTEXTS = 3
+
+# The log rotates to <path>.1 at this size, so at most twice this is kept (and read)
+QUERY_LOG_MAX_BYTES = 1024 * 1024
+
+
+def log_query(log_path: str, query: str, max_bytes: int = QUERY_LOG_MAX_BYTES):
+    """Append a submitted query to the JSONL query log, rotating it when full"""
+    path = Path(log_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        if path.stat().st_size >= max_bytes:
+            os.replace(path, str(path) + '.1')
+    except FileNotFoundError:
+        pass
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps({'query': query, 'time': time.time()}, ensure_ascii=False) + '\n')
+
+
+def top_logged_queries(log_path: str, n: int = 20) -> List[str]:
+    """Return the n most frequent queries from the query log and its rotated predecessor"""
+    counts = Counter()
+    for path in (Path(str(log_path) + '.1'), Path(log_path)):
+        if not path.exists():
+            continue
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    counts[json.loads(line)['query'].strip()] += 1
+                except (ValueError, KeyError):
+                    continue
+
+    return [q for q, _ in counts.most_common(n) if q]
+
+
+class QueryWarmupCache:
+    """
+    Precomputes retrieval results (and optionally answers) in the background
+
+    Entries are tagged with the index version they were computed against. When
+    the retriever switches snapshots, stale entries stop being served and the
+    same queries are warmed again against the new version.
+    """
+
+    def __init__(self, model, retriever, translator, generator=None):
+        """
+        Initialize warmup cache
+
+        Args:
+            model: Encoder with .encode(list)
+            retriever: RetrieverSystem (or compatible proxy)
+            translator: TranslationService for English queries
+            generator: AnswerGenerator; answers are only precomputed if given
+        """
+        self.model = model
+        self.retriever = retriever
+        self.translator = translator
+        self.generator = generator
+
+        self._cache = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._queries = []
+        self._warmed_version = None
+        self.stats = {
+            'dummy_pass_seconds': None,
+            'warmup_seconds': None,
+            'queries_total': 0,
+            'queries_cached': 0,
+            'errors': 0,
+            'rewarms': 0,
+            'done': False
+        }
+
+    def start(self, queries: List[str]):
+        """Run the dummy forward pass now and precompute queries in the background"""
+        start = time.time()
+        self.model.encode(["تهيئة"])
+        self.stats['dummy_pass_seconds'] = time.time() - start
+
+        # Deduplicate while keeping priority order
+        self._queries = list(dict.fromkeys(q.strip() for q in queries if q and q.strip()))
+        self.stats['queries_total'] = len(self._queries)
+
+        self._start_thread(self._index_version(), start)
+        return self
+
+    def _start_thread(self, index_version, start: float):
+        self._warmed_version = index_version
+        self._thread = threading.Thread(target=self._run, args=(self._queries, start),
+                                        name="query-warmup", daemon=True)
+        self._thread.start()
+
+    def _rewarm_if_swapped(self, index_version):
+        """Warm the queries again once the retriever has moved to a new version"""
+        with self._lock:
+            if index_version == self._warmed_version or (self._thread and self._thread.is_alive()):
+                return
+            self.stats['rewarms'] += 1
+            self.stats['queries_cached'] = 0
+            self.stats['done'] = False
+            self._start_thread(index_version, time.time())
+
+    def _run(self, queries: List[str], start: float):
+        for query in queries:
+            try:
+                self._cache_query(query)
+            except Exception as e:
+                self.stats['errors'] += 1
+                print(f"⚠️ Warmup failed for '{query[:40]}': {e}")
+
+        self.stats['warmup_seconds'] = time.time() - start
+        self.stats['done'] = True
+        print(f"✅ Warmup cached {self.stats['queries_cached']} queries "
+              f"in {self.stats['warmup_seconds']:.1f}s")
+
+    def _index_version(self):
+        # HotSwapRetriever exposes the snapshot version; plain retrievers never change
+        return getattr(self.retriever, 'version', None)
+
+    def _lookup(self, query: str) -> Optional[Dict]:
+        index_version = self._index_version()
+        self._rewarm_if_swapped(index_version)
+
+        with self._lock:
+            entry = self._cache.get(query.strip())
+
+        # Results from a previous index snapshot are stale
+        if entry is None or entry['index_version'] != index_version:
+            return None
+        return entry
+
+    def _cache_query(self, query: str):
+        index_version = self._index_version()
+        translation_result = self.translator.process_query(query)
+        arabic_query = translation_result['arabic_query']
+
+        query_emb = self.model.encode([arabic_query])[0]
+        results = self.retriever.search(query_emb, k=MAX_CACHED_K, query_text=arabic_query)
+
+        entry = {
+            'index_version': index_version,
+            'translation_result': translation_result,
+            'results': results,
+            'answers': {}
+        }
+
+        if self.generator is not None:
+            return_lang = translation_result['query_language']
+            entry['answers'][return_lang] = self.generator.generate_answer(
+                arabic_query, results, language='ar', return_language=return_lang
+            )
+
+        with self._lock:
+            self._cache[query] = entry
+            self.stats['queries_cached'] += 1
+
+    def get(self, query: str, k: int) -> Optional[Dict]:
+        """Return cached translation and top-k results for a query, if warmed"""
+        if k > MAX_CACHED_K:
+            return None
+
+        entry = self._lookup(query)
+        if entry is None:
+            return None
+
+        return {
+            'translation_result': entry['translation_result'],
+            'results': entry['results'][:k]
+        }
+
+    def get_answer(self, query: str, k: int, return_language: str) -> Optional[Dict]:
+        """Return a precomputed answer if it was built from the same contexts"""
+        if k < ANSWER_CONTEXTS:
+            return None
+
+        entry = self._lookup(query)
+        if entry is None:
+            return None
+        return entry['answers'].get(return_language)